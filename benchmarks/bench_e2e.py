@@ -0,0 +1,534 @@
+"""End-to-end load test: the real monitor against many fake Claude Code sessions.
+
+Builds a throwaway HOME with one project directory per session and puts
+stub executables first on PATH:
+
+  claude       as a writer, appends session log lines at a given pace and
+               holds the log open like Claude Code does (--stubborn of the
+               limited ones ignore SIGTERM); as relaunched by the monitor,
+               records its arguments, directory and API key
+  notify-send  records each notification (osascript too, for macOS)
+  pgrep, lsof  answer from the writers' own registry (used without /proc)
+
+Then runs `python -m claude_fallback.monitor` with auto_restart on, starts
+--sessions writer processes, and has --limits of them write a usage-limit
+event partway through. Lines are synthetic (benchmarks/synth.py), written
+at --rate-kb per session, or replayed from recorded session logs
+(--replay), either at --rate-kb or at their recorded pace sped up
+--speed times.
+
+Reports the bytes written and read, the monitor's CPU use, and end-to-end
+latency from each limit line being written to its detection (from the
+event journal), the first notification, the old claude being stopped and
+the new one being started, and each restart's downtime as the monitor
+measured it. Restarts run in parallel, so their latency shouldn't grow
+with --limits.
+
+Usage:
+    python benchmarks/bench_e2e.py [--sessions 50] [--rate-kb 1024] [--duration 20]
+                                   [--limits 5] [--stubborn 0] [--restart-timeout 2]
+                                   [--replay LOG ...] [--speed 10]
+
+Exits non-zero if a limit is missed, a session without one is flagged, no
+notification is sent, or a limited session isn't resumed (claude --resume
+<session>) in its own directory with the API key.
+"""
+
+import argparse
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+BENCHMARKS = Path(__file__).resolve().parent
+SRC = BENCHMARKS.parent / "src"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(BENCHMARKS))
+
+from synth import generate_lines  # noqa: E402
+
+from claude_fallback.control import ControlError, request  # noqa: E402
+from claude_fallback.detector import parse_event_time  # noqa: E402
+from claude_fallback.journal import Journal  # noqa: E402
+from claude_fallback.procscan import encode_project_dir  # noqa: E402
+
+API_KEY = "sk-ant-harness-key"
+
+# Environment of the stubs: where to record what they saw, and the writer's spec
+RUN_DIR_ENV = "HARNESS_RUN_DIR"
+SPEC_ENV = "HARNESS_SPEC"
+
+# How often writers wake up to write what is due
+WRITE_TICK = 0.02
+
+STUBS = {
+    "claude": "stub_claude",
+    "notify-send": "stub_notify",
+    "osascript": "stub_notify",
+    "pgrep": "stub_pgrep",
+    "lsof": "stub_lsof",
+}
+
+
+# Stub executables -----------------------------------------------------------
+
+
+def _record(path: Path, record: Dict[str, Any]) -> None:
+    """Append a JSON line with one write, so concurrent stubs don't interleave."""
+    fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+    try:
+        os.write(fd, (json.dumps(record) + "\n").encode())
+    finally:
+        os.close(fd)
+
+
+def stub_claude() -> None:
+    run = Path(os.environ[RUN_DIR_ENV])
+    spec = os.environ.get(SPEC_ENV)
+    if spec is None:
+        # Started by the monitor's auto-restart
+        _record(
+            run / "launches.jsonl",
+            {
+                "t": time.time(),
+                "pid": os.getpid(),
+                "cwd": os.getcwd(),
+                "args": sys.argv[1:],
+                "api_key": os.environ.get("ANTHROPIC_API_KEY"),
+            },
+        )
+        return
+    _write_session(json.loads(Path(spec).read_text()), run)
+
+
+def _paced(
+    lines: List[bytes], offsets: Optional[List[float]], spec: dict
+) -> Iterator[Tuple[float, bytes]]:
+    """Yield (seconds after start it is due, line), cycling through lines forever."""
+    i = spec["start"] % len(lines)
+    if offsets is None:
+        rate = spec["rate"]
+        written = 0
+        while True:
+            yield written / rate, lines[i]
+            written += len(lines[i])
+            i = (i + 1) % len(lines)
+    # Recorded pace: each pass through the log takes its recorded span
+    span = offsets[-1] - offsets[0] + 1.0
+    base = -offsets[i]
+    while True:
+        yield (base + offsets[i]) / spec["speed"], lines[i]
+        i += 1
+        if i == len(lines):
+            i = 0
+            base += span
+
+
+def _write_session(spec: dict, run: Path) -> None:
+    result: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "cwd": os.getcwd(),
+        "log": spec["log"],
+        "bytes": 0,
+        "limit_t": None,
+        "term_t": None,
+    }
+    registry = run / "pids" / str(os.getpid())
+    registry.write_text(os.getcwd())
+
+    def save() -> None:
+        Path(spec["result"]).write_text(json.dumps(result))
+
+    def terminate(signum: int, frame: Any) -> None:
+        if result["term_t"] is None:
+            result["term_t"] = time.time()
+        if spec["stubborn"]:
+            save()  # Before the SIGKILL that is bound to follow
+            return
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    lines = Path(spec["source"]).read_bytes().splitlines(keepends=True)
+    offsets = json.loads(Path(spec["offsets"]).read_text()) if spec["offsets"] else None
+    limit_at = spec["limit_at"]
+    try:
+        with open(spec["log"], "ab") as f:
+            start = time.time()
+            schedule = _paced(lines, offsets, spec)
+            due, line = next(schedule)
+            while True:
+                elapsed = time.time() - start
+                if elapsed >= spec["duration"]:
+                    break
+                if limit_at is not None and elapsed >= limit_at:
+                    f.write(_limit_line())
+                    f.flush()
+                    result["limit_t"] = time.time()
+                    limit_at = None
+                    save()
+                batch = []
+                while due <= elapsed:
+                    batch.append(line)
+                    due, line = next(schedule)
+                if batch:
+                    data = b"".join(batch)
+                    f.write(data)
+                    f.flush()
+                    result["bytes"] += len(data)
+                time.sleep(WRITE_TICK)
+            # A session that hit its limit stays open until the monitor restarts it
+            if result["limit_t"] is not None:
+                time.sleep(spec["hold"])
+    finally:
+        registry.unlink()
+        save()
+
+
+def _limit_line() -> bytes:
+    event = {
+        "type": "error",
+        "uuid": os.urandom(16).hex(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+        "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"},
+    }
+    return json.dumps(event).encode() + b"\n"
+
+
+def stub_notify() -> None:
+    run = Path(os.environ[RUN_DIR_ENV])
+    _record(run / "notifications.jsonl", {"t": time.time(), "args": sys.argv[1:]})
+
+
+def stub_pgrep() -> None:
+    """pgrep [-U uid] -f claude: the live writers."""
+    pids = [
+        pid
+        for pid in os.listdir(Path(os.environ[RUN_DIR_ENV]) / "pids")
+        if Path(f"/proc/{pid}").exists() or not Path("/proc").exists()
+    ]
+    print("\n".join(pids))
+    sys.exit(0 if pids else 1)
+
+
+def stub_lsof() -> None:
+    """lsof -a -p PID -d cwd -Fn: a writer's working directory."""
+    pid = sys.argv[sys.argv.index("-p") + 1]
+    try:
+        cwd = (Path(os.environ[RUN_DIR_ENV]) / "pids" / pid).read_text()
+    except OSError:
+        sys.exit(1)
+    print(f"p{pid}\nn{cwd}")
+
+
+def install_stubs(bin_dir: Path) -> None:
+    bin_dir.mkdir()
+    for name, func in STUBS.items():
+        path = bin_dir / name
+        path.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {str(BENCHMARKS)!r})\n"
+            "import bench_e2e\n"
+            f"bench_e2e.{func}()\n"
+        )
+        path.chmod(0o755)
+
+
+# Harness ----------------------------------------------------------------------
+
+
+def write_sources(run: Path, args: argparse.Namespace) -> List[Tuple[Path, Optional[Path]]]:
+    """Line sources for the writers: (lines file, recorded offsets file or None)."""
+    if not args.replay:
+        source = run / "synthetic.jsonl"
+        source.write_bytes(b"".join(generate_lines(seed=args.seed, count=4000, limit_rate=0)))
+        return [(source, None)]
+
+    sources = []
+    for i, replay in enumerate(args.replay):
+        lines = Path(replay).read_bytes().splitlines(keepends=True)
+        source = run / f"replay-{i}.jsonl"
+        source.write_bytes(b"".join(lines))
+        offsets_file = None
+        if args.speed:
+            offsets, last = [], None
+            for line in lines:
+                try:
+                    t = parse_event_time(json.loads(line).get("timestamp"))
+                except (ValueError, AttributeError):
+                    t = None
+                last = t if t is not None else last
+                offsets.append(last)
+            first = next((t for t in offsets if t is not None), 0.0)
+            offsets = [first if t is None else t for t in offsets]
+            offsets_file = run / f"replay-{i}.offsets.json"
+            offsets_file.write_text(json.dumps([t - first for t in offsets]))
+        sources.append((source, offsets_file))
+    return sources
+
+
+def start_monitor(home: Path, run: Path, env: Dict[str, str]) -> subprocess.Popen:
+    with open(run / "monitor.log", "wb") as out:
+        monitor = subprocess.Popen(
+            [sys.executable, "-m", "claude_fallback.monitor"],
+            env=env,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+        )
+    deadline = time.time() + 10
+    while not (home / ".claude_fallback.sock").exists():
+        if monitor.poll() is not None or time.time() > deadline:
+            print((run / "monitor.log").read_text())
+            raise SystemExit("FAIL: the monitor didn't start")
+        time.sleep(0.05)
+    return monitor
+
+
+def stop_monitor(monitor: subprocess.Popen) -> float:
+    """Stop the monitor and return the CPU seconds it used."""
+    monitor.send_signal(signal.SIGTERM)
+    _pid, _status, usage = os.wait4(monitor.pid, 0)
+    monitor.returncode = 0
+    return usage.ru_utime + usage.ru_stime
+
+
+def read_records(path: Path) -> List[dict]:
+    try:
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    except FileNotFoundError:
+        return []
+
+
+def percentiles(values: List[float]) -> str:
+    """p50, p95 and max in columns of 10."""
+    if not values:
+        return f"{'-':>10}" * 3
+    values = sorted(values)
+    picks = (values[len(values) // 2], values[int(len(values) * 0.95)], values[-1])
+    return "".join(f"{v * 1000:>8.0f}ms" for v in picks)
+
+
+def monitor_stats(home: Path) -> Dict[str, Any]:
+    try:
+        return request("stats", path=home / ".claude_fallback.sock", timeout=5)
+    except ControlError:
+        return {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--rate-kb", type=float, default=1024, help="Per-session write rate")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of writing")
+    parser.add_argument("--limits", type=int, default=5, help="Sessions that hit a limit")
+    parser.add_argument(
+        "--stubborn", type=int, default=0, help="Limited sessions that ignore SIGTERM"
+    )
+    parser.add_argument(
+        "--restart-timeout", type=float, default=2.0, help="The monitor's restart_timeout"
+    )
+    parser.add_argument("--replay", nargs="+", metavar="LOG", help="Recorded session logs")
+    parser.add_argument(
+        "--speed", type=float, help="Replay at the recorded pace, this many times faster"
+    )
+    parser.add_argument(
+        "--grace", type=float, default=30.0, help="Seconds to wait for detections and restarts"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.speed and not args.replay:
+        parser.error("--speed needs --replay")
+    if args.stubborn > args.limits:
+        parser.error("--stubborn can't be more than --limits")
+
+    rng = random.Random(args.seed)
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        home, run, bin_dir = root / "home", root / "run", root / "bin"
+        for path in (home / ".claude" / "projects", run / "pids", run / "specs", run / "results"):
+            path.mkdir(parents=True)
+        install_stubs(bin_dir)
+        sources = write_sources(run, args)
+
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith(("CLAUDE_FALLBACK_", "ANTHROPIC_"))
+        }
+        env.update(
+            HOME=str(home),
+            PATH=f"{bin_dir}{os.pathsep}{env.get('PATH', '')}",
+            PYTHONPATH=str(SRC),
+            CLAUDE_FALLBACK_API_KEY=API_KEY,
+            CLAUDE_FALLBACK_AUTO_RESTART="1",
+            CLAUDE_FALLBACK_MAX_OPEN_LOGS=str(max(32, args.sessions)),
+            CLAUDE_FALLBACK_RESTART_TIMEOUT=str(args.restart_timeout),
+        )
+        env[RUN_DIR_ENV] = str(run)
+        monitor = start_monitor(home, run, env)
+
+        limited = set(rng.sample(range(args.sessions), min(args.limits, args.sessions)))
+        stubborn = set(sorted(limited)[: args.stubborn])
+        writers = []
+        started = time.time()
+        for i in range(args.sessions):
+            cwd = root / "work" / f"project-{i:03d}"
+            cwd.mkdir(parents=True)
+            sessions = home / ".claude" / "projects" / encode_project_dir(str(cwd)) / "sessions"
+            sessions.mkdir(parents=True)
+            source, offsets = sources[i % len(sources)]
+            spec = {
+                "log": str(sessions / f"{i:08x}-{rng.getrandbits(48):012x}.jsonl"),
+                "source": str(source),
+                "offsets": str(offsets) if offsets else None,
+                "start": rng.randrange(1 << 30),
+                "rate": args.rate_kb * 1024,
+                "speed": args.speed,
+                "duration": args.duration,
+                "limit_at": rng.uniform(0.2, 0.6) * args.duration if i in limited else None,
+                "hold": args.grace,
+                "stubborn": i in stubborn,
+                "result": str(run / "results" / f"{i}.json"),
+            }
+            spec_path = run / "specs" / f"{i}.json"
+            spec_path.write_text(json.dumps(spec))
+            writers.append(
+                subprocess.Popen(["claude"], cwd=cwd, env=dict(env, **{SPEC_ENV: str(spec_path)}))
+            )
+
+        # Writing, then until every limited session was relaunched (or the grace period ends)
+        deadline = started + args.duration + args.grace
+        while time.time() < deadline:
+            # Polling every writer also reaps the ones the monitor stopped
+            running = [w.poll() is None for w in writers]
+            writing = any(r for i, r in enumerate(running) if i not in limited)
+            if not writing and len(read_records(run / "launches.jsonl")) >= len(limited):
+                break
+            time.sleep(0.2)
+        elapsed = time.time() - started
+        stats = monitor_stats(home)
+        cpu = stop_monitor(monitor)
+        for writer in writers:
+            if writer.poll() is None:
+                writer.kill()
+            writer.wait()
+
+        results = {}
+        for i in range(args.sessions):
+            try:
+                results[i] = json.loads((run / "results" / f"{i}.json").read_text())
+            except (OSError, ValueError):
+                print(f"FAIL: writer {i} left no result")
+                ok = False
+        by_session = {Path(r["log"]).stem: r for r in results.values()}
+        journal = Journal(home)
+        detections = list(journal.read(kinds=["detection"]))
+        restarts = list(journal.read(kinds=["restart"]))
+        launches = read_records(run / "launches.jsonl")
+        notifications = read_records(run / "notifications.jsonl")
+        watcher = next(
+            (
+                line.split()[1]
+                for line in (run / "monitor.log").read_text().splitlines()
+                if line.startswith("Using ")
+            ),
+            "?",
+        )
+
+        written = sum(r["bytes"] for r in results.values())
+        limit_times = {
+            session: r["limit_t"] for session, r in by_session.items() if r["limit_t"]
+        }
+        detect_latency, stop_latency, launch_latency, downtime = [], [], [], []
+        killed = 0
+        detected = set()
+        for event in detections:
+            session = event.get("session")
+            if session not in limit_times and not args.replay:
+                print(f"FAIL: {session} flagged without a usage limit ({event.get('reason')})")
+                ok = False
+            elif session in limit_times and session not in detected:
+                detected.add(session)
+                detect_latency.append(event["t"] - limit_times[session])
+        missed = set(limit_times) - detected
+        if missed:
+            print(f"FAIL: {len(missed)} usage limit(s) not detected: {', '.join(sorted(missed))}")
+            ok = False
+        if limit_times and not notifications:
+            print("FAIL: no notification sent")
+            ok = False
+
+        for session, limit_t in limit_times.items():
+            result = by_session[session]
+            events = [e for e in restarts if e.get("session") == session]
+            for event in events:
+                if event.get("downtime") is not None:
+                    downtime.append(event["downtime"])
+                    killed += bool(event.get("killed"))
+            launch = next(
+                (
+                    launch
+                    for launch in launches
+                    if launch["args"] == ["--resume", session] and launch["t"] >= limit_t
+                ),
+                None,
+            )
+            if result["term_t"] is not None:
+                stop_latency.append(result["term_t"] - limit_t)
+            if launch is None or launch["cwd"] != result["cwd"] or launch["api_key"] != API_KEY:
+                outcomes = [e.get("outcome") for e in events]
+                print(f"FAIL: {session} not resumed with the API key (outcomes: {outcomes})")
+                ok = False
+                continue
+            launch_latency.append(launch["t"] - limit_t)
+
+        read_mb = stats.get("bytes_read", 0) / 1e6
+        print(
+            f"{args.sessions} sessions"
+            + (f" replayed at {args.speed:g}x" if args.speed else f" x {args.rate_kb:.0f} KiB/s")
+            + f" for {args.duration:.0f}s, {len(limited)} with a usage limit"
+            + (f" ({len(stubborn)} ignoring SIGTERM)" if stubborn else "")
+            + f", {watcher} watcher"
+        )
+        print(
+            f"written      {written / 1e6:.1f} MB ({written / 1e6 / args.duration:.1f} MB/s), "
+            f"monitor read {read_mb:.1f} MB"
+        )
+        print(
+            f"monitor CPU  {cpu:.1f}s over {elapsed:.1f}s = {cpu / elapsed * 100:.0f}% of one core"
+            + (f" ({cpu / read_mb * 1000:.1f} ms per MB read)" if read_mb else "")
+        )
+        heading = "latency from the limit line being written"
+        print(f"\n{heading:<42}{'p50':>10}{'p95':>10}{'max':>10}")
+        print(f"  {'detected (journal)':<40}{percentiles(detect_latency)}")
+        if notifications and limit_times:
+            first = min(n["t"] for n in notifications) - min(limit_times.values())
+            print(f"  {'first notification':<40}{first * 1000:>8.0f}ms")
+        print(f"  {'old claude stopped':<40}{percentiles(stop_latency)}")
+        print(f"  {'new claude started':<40}{percentiles(launch_latency)}")
+        print(f"{'restart downtime (journal)':<42}{percentiles(downtime)}")
+        print(
+            f"\nrestarts     {len(launch_latency)}/{len(limit_times)} resumed in the session's "
+            f"directory with the API key, {killed} after SIGKILL"
+        )
+        print(f"notify-send  {len(notifications)} call(s) (identical notifications are coalesced)")
+
+        errors = home / ".claude_fallback_error.log"
+        if errors.exists():
+            print("\nErrors logged:\n" + errors.read_text()[-2000:])
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark: checking huge events by field extraction vs full decoding.
+
+Builds events whose payload is 256 KiB to 4 MiB of source code (this
+repo's own, repeated), either as tool output the rules never read or as
+assistant text they do, and times UsageLimitDetector.check_event with
+full decoding and with extraction (max_decode_bytes), along with the peak
+memory traced during the call.
+
+Also checks that extraction is faithful: every synthetic session log line
+is forced through the extractor and must produce the same detection as
+decoding it in full.
+
+Usage:
+    python benchmarks/bench_extract.py [--sizes 256,1024,4096] [--events 5000]
+
+Exits non-zero on any disagreement.
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import generate_lines  # noqa: E402
+
+from claude_fallback.detector import ENVELOPE_PATHS, UsageLimitDetector  # noqa: E402
+from claude_fallback.extract import FieldExtractor  # noqa: E402
+
+NO_LIMIT = 1 << 62
+
+
+def source_text(size: int) -> str:
+    code = "".join(p.read_text() for p in sorted((ROOT / "src").rglob("*.py")))
+    return (code * (size // len(code) + 1))[:size]
+
+
+def huge_events(size: int) -> Tuple[bytes, bytes]:
+    text = source_text(size)
+    tool_output = {
+        "type": "user",
+        "timestamp": "2025-01-31T09:00:00.000Z",
+        "message": {
+            "role": "user",
+            "content": [{"type": "tool_result", "tool_use_id": "toolu_1", "content": text}],
+        },
+    }
+    assistant_text = {
+        "type": "assistant",
+        "timestamp": "2025-01-31T09:00:00.000Z",
+        "message": {"content": [{"type": "text", "text": "Usage limit reached. " + text}]},
+    }
+    return json.dumps(tool_output).encode(), json.dumps(assistant_text).encode()
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Tuple[float, int, Any]:
+    """Best time in ms, peak traced KiB and the result of func()."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    # Timed separately: tracing slows Python code down a lot
+    tracemalloc.start()
+    func()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak // 1024, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--sizes", default="256,1024,4096", help="Payload sizes in KiB")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--max-decode-bytes", type=int, default=256 * 1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ok = True
+    full = UsageLimitDetector(max_decode_bytes=NO_LIMIT)
+    extracting = UsageLimitDetector(max_decode_bytes=args.max_decode_bytes)
+    print(f"JSON backend: {full.json_backend.name}\n")
+    print(f"{'payload':>8} {'event':<12} {'full decode':>22} {'extraction':>22}")
+    for kib in (int(n) for n in args.sizes.split(",")):
+        for name, line in zip(("tool output", "text"), huge_events(kib * 1024)):
+            full_ms, full_kib, full_result = measure(
+                lambda: full.check_event(line), args.repeat
+            )
+            ms, peak_kib, result = measure(lambda: extracting.check_event(line), args.repeat)
+            if getattr(full_result, "reason", None) != getattr(result, "reason", None):
+                print(f"FAIL: {name} detection differs")
+                ok = False
+            print(
+                f"{kib:>5}KiB {name:<12} {full_ms:>7.1f} ms {full_kib:>7} KiB "
+                f"{ms:>7.1f} ms {peak_kib:>7} KiB"
+            )
+
+    lines = generate_lines(seed=13, count=args.events, limit_rate=0.02)
+    extractor = FieldExtractor(full.rules.paths() + ENVELOPE_PATHS)
+    reference = UsageLimitDetector(json_backend="json")
+    reference._loads = extractor.extract
+    reference._prefilter = False
+    mismatches = sum(
+        1 for line in lines if reference.check_event(line) != full.check_event(line)
+    )
+    detections = sum(1 for line in lines if full.check_event(line))
+    print(
+        f"\n{len(lines)} synthetic lines, {detections} detections: "
+        f"{mismatches} differ when extracted"
+    )
+    ok = ok and not mismatches
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Scaling of fleet mode from 1 to hundreds of users.
+
+For each fleet size, creates that many fake home directories (each with a
+few synthetic session logs) in a temp dir, starts an in-process
+FleetMonitor over them and reports:
+
+  setup     time until every user is being served
+  idle CPU  fleet CPU use while nothing is written
+  latency   time from appending a usage-limit line to a random user's log
+            until that user's monitor handles it (p50 / p95 / max)
+  RSS       resident memory of this process after setup
+  threads   live threads (main + workers)
+
+Runs as the current user, so nothing is chowned and no privileges are
+dropped. Limit handling is replaced by a probe, so no notifications are
+sent and no state is written.
+
+Usage:
+    python benchmarks/bench_fleet.py [--users 1,10,50,100,500] [--workers 4]
+                                     [--watcher auto|polling] [--samples 20]
+
+With --watcher polling, the first write after an idle stretch waits for
+the backed-off poll (up to poll_max_interval, 30s by default).
+
+Exits non-zero if any detection was missed.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from synth import LIMIT_EVENTS, write_session_tree  # noqa: E402
+
+
+def limit_line() -> bytes:
+    """A limit event with its own uuid, so the monitor doesn't drop it as a repeat."""
+    event = dict(LIMIT_EVENTS[0], uuid=str(uuid.uuid4()))
+    return (json.dumps(event) + "\n").encode()
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Peak rather than current outside Linux (kilobytes on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def build_homes(root: Path, users: int, logs_per_user: int) -> Dict[Path, List[Path]]:
+    homes = {}
+    for i in range(users):
+        home = root / f"user-{i:04d}"
+        homes[home] = write_session_tree(
+            home / ".claude" / "projects", logs_per_user, events_per_file=20, seed=i
+        )
+    return homes
+
+
+def run_size(root: Path, users: int, args: argparse.Namespace) -> Dict[str, float]:
+    from claude_fallback.fleet import FleetMonitor
+
+    homes = build_homes(root, users, args.logs_per_user)
+    fleet = FleetMonitor(
+        [str(root / "user-*")], workers=args.workers, watcher=args.watcher
+    )
+
+    detected = threading.Event()
+
+    def probe(detection, log, on_handled) -> None:
+        detected.set()
+
+    start = time.perf_counter()
+    fleet.start()
+    for monitor in fleet.monitors.values():
+        monitor._handle_limit_detected = probe
+    while sum(len(shard.monitors) for shard in fleet.shards) < users:
+        time.sleep(0.005)
+    setup = time.perf_counter() - start
+    # Let the initial full scans finish before measuring
+    time.sleep(1.0)
+
+    cpu, wall = time.process_time(), time.perf_counter()
+    time.sleep(args.idle)
+    idle_cpu = (time.process_time() - cpu) / (time.perf_counter() - wall) * 100
+
+    rng = random.Random(users)
+    latencies = []
+    missed = 0
+    for _ in range(args.samples):
+        log = rng.choice(homes[rng.choice(list(homes))])
+        detected.clear()
+        written = time.perf_counter()
+        with open(log, "ab") as f:
+            f.write(limit_line())
+        if detected.wait(args.timeout):
+            latencies.append(time.perf_counter() - written)
+        else:
+            missed += 1
+
+    memory = rss_mb()
+    threads = threading.active_count()
+    watchers = sorted({shard.watcher.name for shard in fleet.shards})
+    fleet.stop()
+    fleet.join()
+
+    latencies.sort()
+    return {
+        "setup": setup,
+        "idle_cpu": idle_cpu,
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "max": latencies[-1] if latencies else 0.0,
+        "missed": missed,
+        "rss": memory,
+        "threads": threads,
+        "watcher": "/".join(watchers),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--users", default="1,10,50,100,500")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--watcher", default="auto", choices=("auto", "inotify", "polling"))
+    parser.add_argument("--logs-per-user", type=int, default=3)
+    parser.add_argument("--samples", type=int, default=20, help="Detections to time per size")
+    parser.add_argument("--idle", type=float, default=3.0, help="Seconds to sample idle CPU")
+    parser.add_argument(
+        "--timeout", type=float, default=35.0, help="Max wait per detection (> poll_max_interval)"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'users':>6} {'setup':>8} {'idle CPU':>9} {'p50':>8} {'p95':>8} {'max':>8} "
+        f"{'missed':>7} {'RSS':>8} {'threads':>8}  watcher"
+    )
+    missed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        # Module-level paths (error log, state files) derive from HOME at
+        # import time, so point it at the scratch dir before importing
+        os.environ["HOME"] = tmp
+        for users in (int(n) for n in args.users.split(",")):
+            root = Path(tmp) / f"fleet-{users}"
+            # Silence the per-session "Monitoring session" lines
+            with contextlib.redirect_stdout(io.StringIO()):
+                r = run_size(root, users, args)
+            missed += r["missed"]
+            print(
+                f"{users:>6} {r['setup']:>7.2f}s {r['idle_cpu']:>8.1f}% "
+                f"{r['p50'] * 1000:>6.1f}ms {r['p95'] * 1000:>6.1f}ms "
+                f"{r['max'] * 1000:>6.1f}ms {r['missed']:>7} {r['rss']:>6.1f}MB "
+                f"{r['threads']:>8}  {r['watcher']}",
+                flush=True,
+            )
+        errors = Path(tmp) / ".claude_fallback_error.log"
+        if errors.exists():
+            print("\nErrors logged:\n" + errors.read_text()[-2000:])
+
+    if missed:
+        print(f"\nFAIL: {missed} detection(s) missed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Microbenchmarks for the monitor's hot paths, with JSON baselines.
+
+Measures UsageLimitDetector.check_event, LogMonitor._check_for_updates and
+LogMonitor.find_latest_log across data sizes and file counts, using
+synthetic session logs from synth.py.
+
+Usage:
+    python benchmarks/bench_hotpaths.py --save baseline.json
+    python benchmarks/bench_hotpaths.py --compare baseline.json [--threshold 0.2]
+
+With --compare, exits non-zero if any benchmark is slower than the baseline
+by more than the threshold (a fraction, default 0.2 = 20%).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import generate_lines, write_session_tree  # noqa: E402
+
+from claude_fallback.config import Config  # noqa: E402
+from claude_fallback.detector import UsageLimitDetector  # noqa: E402
+from claude_fallback.index import SessionIndex  # noqa: E402
+from claude_fallback.monitor import LogMonitor  # noqa: E402
+
+Result = Dict[str, float]
+
+
+def measure(func: Callable[[], None], repeat: int, setup: Callable[[], None] = None) -> float:
+    """Return the median wall time of func over repeat runs."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_check_event(events: int, repeat: int) -> Result:
+    lines = generate_lines(seed=1, count=events, limit_rate=0.001)
+    total = sum(len(line) for line in lines)
+    detector = UsageLimitDetector()
+
+    def run() -> None:
+        for line in lines:
+            detector.check_event(line)
+
+    median = measure(run, repeat)
+    return {"median_s": median, "mb_s": total / median / 1e6, "lines": len(lines)}
+
+
+def make_monitor(root: Path) -> LogMonitor:
+    """Build a LogMonitor pointed at a synthetic tree, with side effects disabled."""
+    monitor = LogMonitor(Config(api_key="sk-ant-benchmark"))
+    monitor.base_path = root
+    monitor.index = SessionIndex(root)
+    monitor._handle_limit_detected = lambda detection, log, on_handled: None
+    return monitor
+
+
+def bench_check_for_updates(root: Path, num_files: int, repeat: int) -> Result:
+    monitor = make_monitor(root)
+    logs = sorted(root.glob("*/sessions/*.jsonl"))[:num_files]
+    for log in logs:
+        monitor.tailer.track(log, 0, os.stat(log).st_ino)
+    total = sum(os.path.getsize(log) for log in logs)
+
+    def rewind() -> None:
+        for tracked in monitor.tailer:
+            tracked.offset = 0
+
+    median = measure(monitor._check_for_updates, repeat, setup=rewind)
+    monitor.tailer.close()
+    return {"median_s": median, "mb_s": total / median / 1e6, "files": len(logs)}
+
+
+def bench_find_latest_log(root: Path, repeat: int) -> Result:
+    monitor = make_monitor(root)
+    monitor.find_latest_log()  # Initial index build
+    median = measure(monitor.find_latest_log, repeat)
+    return {"median_s": median, "files": len(monitor.index)}
+
+
+def run_all(args: argparse.Namespace) -> Dict[str, Result]:
+    results: Dict[str, Result] = {}
+
+    for events in (1000, 10000):
+        name = f"check_event/{events}_events"
+        results[name] = bench_check_event(events, args.repeat)
+        print(f"{name:<36} {results[name]['mb_s']:>9.1f} MB/s")
+
+    for num_files in (10, 100, 1000):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            write_session_tree(root, num_files, events_per_file=20)
+
+            name = f"check_for_updates/{num_files}_files"
+            results[name] = bench_check_for_updates(root, num_files, args.repeat)
+            print(f"{name:<36} {results[name]['mb_s']:>9.1f} MB/s")
+
+            name = f"find_latest_log/{num_files}_files"
+            results[name] = bench_find_latest_log(root, args.repeat)
+            print(f"{name:<36} {results[name]['median_s'] * 1000:>9.3f} ms/tick")
+
+    return results
+
+
+def compare(results: Dict[str, Result], baseline_path: Path, threshold: float) -> bool:
+    """Print a comparison table and return True if nothing regressed."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    ok = True
+    print(f"\n{'benchmark':<36} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["median_s"], result["median_s"]
+        change = after / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:<36} {before * 1000:>8.2f}ms {after * 1000:>8.2f}ms {change:>+7.0%}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="Write results as a JSON baseline")
+    parser.add_argument("--compare", type=Path, help="Compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run_all(args)
+
+    if args.save:
+        data = {
+            "meta": {
+                "created": datetime.now().isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        with open(args.save, "w") as f:
+            json.dump(data, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: cost of finding the latest session log vs. number of logs.
+
+Compares the old recursive glob + getmtime scan against SessionIndex.
+
+Usage:
+    python benchmarks/bench_index.py [--sizes 1000,5000,20000] [--ticks 20]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from claude_fallback.index import SessionIndex  # noqa: E402
+
+FILES_PER_PROJECT = 50
+
+
+def build_tree(root: Path, num_files: int) -> None:
+    """Create num_files empty session logs spread across projects."""
+    old = time.time() - 3600
+    for i in range(num_files):
+        sessions = root / f"project-{i // FILES_PER_PROJECT}" / "sessions"
+        sessions.mkdir(parents=True, exist_ok=True)
+        log = sessions / f"session-{i}.jsonl"
+        log.touch()
+        os.utime(log, (old, old))
+    # Let directory mtimes settle past the racy window
+    time.sleep(1.1)
+
+
+def glob_tick(root: Path) -> None:
+    """The original find_latest_log implementation."""
+    pattern = str(root / "**" / "sessions" / "*.jsonl")
+    log_files = glob.glob(pattern, recursive=True)
+    if log_files:
+        max(log_files, key=os.path.getmtime)
+
+
+def time_ticks(func, ticks: int) -> float:
+    """Return the mean duration of func in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(ticks):
+        func()
+    return (time.perf_counter() - start) / ticks * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,5000,20000")
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'glob ms/tick':>14} {'index ms/tick':>14} {'speedup':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            build_tree(root, size)
+
+            index = SessionIndex(root)
+            index.refresh()  # Initial build is a full walk, like glob
+
+            glob_ms = time_ticks(lambda: glob_tick(root), args.ticks)
+            index_ms = time_ticks(lambda: (index.refresh(), index.latest()), args.ticks)
+            print(f"{size:>8} {glob_ms:>14.2f} {index_ms:>14.2f} {glob_ms / index_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
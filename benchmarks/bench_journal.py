@@ -0,0 +1,103 @@
+"""Benchmark: event journal append cost and time-range reads.
+
+Appends --records events to a journal in a temp directory, with a small
+segment size so that it rolls over into many segments, and reports the
+append latency (p50/p99) for the first and last tenth of the records:
+appends should cost the same however large the journal has grown.
+
+Then reads the newest 1% of the events (history --since) through the time
+index and by scanning every segment, and checks that both return the same
+events, and that reading everything returns each event once, in order.
+
+Usage:
+    python benchmarks/bench_journal.py [--records 200000] [--segment-kb 256]
+
+Exits non-zero if the last appends are over 3x slower than the first, or on
+any missing, duplicated or out-of-order event.
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from claude_fallback.journal import Journal  # noqa: E402
+
+
+def percentiles(samples: List[float]) -> Tuple[float, float]:
+    """p50 and p99 in microseconds."""
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2] * 1e6, ordered[len(ordered) * 99 // 100] * 1e6
+
+
+def timed(func: Callable[[], List[dict]]) -> Tuple[float, List[dict]]:
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--segment-kb", type=int, default=256)
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = Journal(Path(tmp), segment_bytes=args.segment_kb * 1024)
+        latencies = []
+        marks = []
+        for seq in range(args.records):
+            if seq % (args.records // 100 or 1) == 0:
+                marks.append(time.time())
+            kind = ("detection", "restart", "switch", "error")[seq % 4]
+            start = time.perf_counter()
+            written = journal.append(
+                kind, seq=seq, session="3f2a9c1e-session", details="Usage limit reached"
+            )
+            latencies.append(time.perf_counter() - start)
+            if not written:
+                print(f"FAIL: append {seq} failed")
+                sys.exit(1)
+
+        tenth = len(latencies) // 10
+        first, last = percentiles(latencies[:tenth]), percentiles(latencies[-tenth:])
+        size = sum(path.stat().st_size for path in journal.segments())
+        print(
+            f"{args.records} appends, {len(journal.segments())} segments, "
+            f"{size / 1e6:.1f} MB ({statistics.mean(latencies) * 1e6:.1f} us/append)"
+        )
+        print(f"  first 10%: p50 {first[0]:6.1f} us  p99 {first[1]:6.1f} us")
+        print(f"  last 10%:  p50 {last[0]:6.1f} us  p99 {last[1]:6.1f} us")
+        if last[0] > 3 * first[0]:
+            print("FAIL: appends slow down as the journal grows")
+            ok = False
+
+        since = marks[-1]
+        indexed_ms, indexed = timed(lambda: list(journal.read(since=since)))
+        full_ms, everything = timed(lambda: list(journal.read()))
+        scanned = [event for event in everything if event["t"] >= since]
+        print(
+            f"\nnewest 1% ({len(indexed)} events): index {indexed_ms:.1f} ms, "
+            f"full scan {full_ms:.0f} ms"
+        )
+        if indexed != scanned:
+            print("FAIL: the indexed read differs from a full scan")
+            ok = False
+        if [event["seq"] for event in everything] != list(range(args.records)):
+            print("FAIL: events missing, duplicated or out of order")
+            ok = False
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
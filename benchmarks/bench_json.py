@@ -0,0 +1,141 @@
+"""Benchmark: JSON backends for decoding session log lines.
+
+For every installed backend (see claude_fallback.jsonutil), reports:
+
+  bytes      decode MB/s straight from the raw lines
+  str        decode MB/s from lines already decoded to text
+  check      UsageLimitDetector.check_event MB/s with the prefilter off,
+             i.e. decoding every line
+  prefilter  check_event MB/s with the prefilter on (the monitor's path)
+
+and checks parity against the standard library: every synthetic line plus
+a set of edge cases (NaN, BOM, lone surrogates, invalid UTF-8, truncated
+lines, ...) must decode to the same value, fail on the same lines, and give
+identical detections.
+
+Usage:
+    python benchmarks/bench_json.py [--events 5000] [--limit-rate 0.01]
+
+Install orjson and/or msgspec to compare them. Exits non-zero on any
+parity difference.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import generate_lines  # noqa: E402
+
+from claude_fallback.detector import UsageLimitDetector  # noqa: E402
+from claude_fallback.jsonutil import BACKENDS, available_backends, get_backend  # noqa: E402
+
+EDGE_LINES = [
+    b'{"type": "error", "error": {"type": "rate_limit_error", "message": NaN}}',
+    b'{"type": "error", "value": Infinity, "error": {"message": "Rate limit reached"}}',
+    b'\xef\xbb\xbf{"type": "error", "error": {"message": "usage limit reached"}}',
+    b'{"type": "assistant", "message": {"content": [{"text": "\\ud800 usage limit"}]}}',
+    b'{"type": "error", "big": 1e400, "error": {"message": "rate limit"}}',
+    b'{"type": "error", "error": {"message": "rate limit \xff\xfe"}}',
+    b'{"type": "error", "error": {"message": "rate limit',
+    b'{"type": "error", "error": {"message": "overloaded"}} trailing',
+    b'{"type": "error", "type": "assistant", "message": {"stop_reason": "rate_limit"}}',
+    '{"type": "error", "error": {"message": "Límite: usage limit reached ✓"}}'.encode(),
+    b"",
+    b"[]",
+    b'"rate limit"',
+    b"null",
+]
+
+
+def decoded(loads: Callable[[Union[str, bytes]], Any], line: Union[str, bytes]) -> str:
+    """Decode a line to a comparable form (repr keeps NaN equal to itself)."""
+    try:
+        return repr(loads(line))
+    except ValueError:
+        return "<error>"
+
+
+def mb_per_s(func: Callable[[Any], Any], lines: List[Any], total_bytes: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    return total_bytes / best / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--limit-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = generate_lines(seed=11, count=args.events, limit_rate=args.limit_rate)
+    texts = [line.decode("utf-8") for line in lines]
+    total_bytes = sum(len(line) for line in lines)
+    parity_lines = lines + EDGE_LINES
+    parity_texts = texts + [line.decode("utf-8", "replace") for line in EDGE_LINES]
+
+    reference = UsageLimitDetector(json_backend="json")
+    expected_values = [decoded(json.loads, line) for line in parity_lines]
+    expected_text_values = [decoded(json.loads, line) for line in parity_texts]
+    expected_detections = [reference.check_event(line) for line in parity_lines]
+
+    backends = available_backends()
+    missing = [name for name in BACKENDS[1:] if name not in backends]
+    print(f"{len(lines)} synthetic lines ({total_bytes / 1e6:.1f} MB)")
+    print(f"auto picks: {get_backend().name}")
+    if missing:
+        print(f"not installed: {', '.join(missing)}")
+    print(f"\n{'backend':>8} {'bytes':>10} {'str':>10} {'check':>10} {'prefilter':>10}  parity")
+
+    ok = True
+    for name in backends:
+        detector = UsageLimitDetector(json_backend=name)
+        loads = detector.json_backend.loads
+
+        values = sum(
+            1 for line, want in zip(parity_lines, expected_values) if decoded(loads, line) != want
+        )
+        text_values = sum(
+            1
+            for line, want in zip(parity_texts, expected_text_values)
+            if decoded(loads, line) != want
+        )
+        detections = sum(
+            1
+            for line, want in zip(parity_lines, expected_detections)
+            if detector.check_event(line) != want
+        )
+        if values or text_values or detections:
+            parity = f"FAIL ({values} bytes, {text_values} str, {detections} detections differ)"
+            ok = False
+        else:
+            parity = "ok"
+
+        bytes_rate = mb_per_s(loads, lines, total_bytes, args.repeat)
+        str_rate = mb_per_s(loads, texts, total_bytes, args.repeat)
+        prefilter_rate = mb_per_s(detector.check_event, lines, total_bytes, args.repeat)
+        detector._prefilter = False
+        check_rate = mb_per_s(detector.check_event, lines, total_bytes, args.repeat)
+        print(
+            f"{name:>8} {bytes_rate:>5.0f} MB/s {str_rate:>5.0f} MB/s {check_rate:>5.0f} MB/s "
+            f"{prefilter_rate:>5.0f} MB/s  {parity}"
+        )
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Check that a slow notification daemon never blocks the caller of Notifier.notify.
+
+Puts a fake notify-send that sleeps for --delay seconds first on PATH, then
+sends a burst of notifications (with duplicates) through a background
+Notifier and reports how long the notify() calls took, how many deliveries
+were coalesced or dropped, and whether the per-delivery timeout held.
+
+Usage:
+    python benchmarks/bench_notifier.py [--delay 3] [--count 100]
+
+Exits non-zero if any notify() call took longer than --budget milliseconds.
+"""
+
+import argparse
+import os
+import stat
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from claude_fallback.notifier import Notifier  # noqa: E402
+
+
+def install_fake_notify_send(bin_dir: Path, delay: float) -> None:
+    script = bin_dir / "notify-send"
+    script.write_text(f"#!/bin/sh\nsleep {delay}\n")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--delay", type=float, default=3.0, help="Fake notify-send delay")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Per-delivery timeout")
+    parser.add_argument("--count", type=int, default=100, help="Notifications to send")
+    parser.add_argument("--distinct", type=int, default=10, help="Distinct messages")
+    parser.add_argument("--backlog", type=int, default=4)
+    parser.add_argument("--budget", type=float, default=5.0, help="Max ms per notify() call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        install_fake_notify_send(Path(tmp), args.delay)
+        os.environ["PATH"] = tmp + os.pathsep + os.environ.get("PATH", "")
+
+        notifier = Notifier(
+            enable_sound=False, background=True, timeout=args.timeout, max_backlog=args.backlog
+        )
+        notifier.system = "Linux"
+        # Keep the terminal fallback quiet; count timed-out deliveries instead
+        timeouts = []
+        notifier._notify_fallback = lambda title, message: timeouts.append(title)
+
+        worst = 0.0
+        start = time.perf_counter()
+        for i in range(args.count):
+            call_start = time.perf_counter()
+            notifier.notify(f"Limit {i % args.distinct}", "Usage limit reached")
+            worst = max(worst, time.perf_counter() - call_start)
+        total = time.perf_counter() - start
+
+        close_start = time.perf_counter()
+        notifier.close()
+        drained = time.perf_counter() - close_start
+
+    print(f"notify() calls:     {args.count} in {total * 1000:.2f} ms")
+    print(f"slowest call:       {worst * 1000:.3f} ms (budget {args.budget} ms)")
+    print(f"coalesced:          {notifier.coalesced}")
+    print(f"dropped (backlog):  {notifier.dropped}")
+    print(f"delivered:          {notifier.delivered}")
+    print(f"timed out:          {len(timeouts)}")
+    print(f"drain time:         {drained:.2f} s "
+          f"(<= {notifier.delivered} x {args.timeout:g} s timeout)")
+
+    if worst * 1000 > args.budget:
+        print("FAIL: notify() blocked the caller")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark: UsageLimitDetector throughput with and without the byte prefilter.
+
+Also verifies that the prefilter never drops a true positive: every line is
+checked both ways and the detections must be identical.
+
+Usage:
+    python benchmarks/bench_prefilter.py [--events 5000] [--limit-rate 0.01]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import generate_lines  # noqa: E402
+
+from claude_fallback.detector import UsageLimitDetector  # noqa: E402
+
+
+def throughput(detector: UsageLimitDetector, lines, total_bytes: int, repeat: int) -> float:
+    """Return MB/s for running check_event over every line."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            detector.check_event(line)
+        best = min(best, time.perf_counter() - start)
+    return total_bytes / best / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--limit-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    lines = generate_lines(seed=42, count=args.events, limit_rate=args.limit_rate)
+    text_lines = [line.decode() for line in lines]
+    total_bytes = sum(len(line) for line in lines)
+
+    filtered = UsageLimitDetector()
+    unfiltered = UsageLimitDetector()
+    unfiltered.might_match = lambda line: True
+
+    # Correctness: the prefilter must not change any result
+    expected = [unfiltered.check_event(line) for line in lines]
+    for name, sample in (("bytes", lines), ("text", text_lines)):
+        got = [filtered.check_event(line) for line in sample]
+        if got != expected:
+            mismatches = sum(1 for a, b in zip(got, expected) if a != b)
+            sys.exit(f"FAIL: prefilter changed {mismatches} results on {name} input")
+    detections = sum(1 for d in expected if d)
+    passed = sum(1 for line in lines if filtered.might_match(line))
+    print(f"{len(lines)} lines, {total_bytes / 1e6:.1f} MB, {detections} detections")
+    print(f"prefilter passes {passed} lines ({passed / len(lines):.2%}), no detections lost\n")
+
+    print(f"{'mode':<22} {'MB/s':>10}")
+    base = throughput(unfiltered, lines, total_bytes, args.repeat)
+    print(f"{'decode every line':<22} {base:>10.1f}")
+    for name, sample in (("prefilter (bytes)", lines), ("prefilter (text)", text_lines)):
+        rate = throughput(filtered, sample, total_bytes, args.repeat)
+        print(f"{name:<22} {rate:>10.1f}  ({rate / base:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark: detection cost as the number of rules grows.
+
+Generates N synthetic rules (substring, exact-value and a few regex rules
+spread over several fields, followed by the built-in rules) and measures,
+for each N:
+
+  compiled   RuleSet.match per decoded event (one matcher per field)
+  naive      the same rules checked one by one, like the old nested any()
+  check      UsageLimitDetector.check_event on raw lines, prefilter included
+
+Events are synthetic session log lines plus events crafted to hit random
+rules. Every event is checked both ways and the matching rule must agree.
+
+Usage:
+    python benchmarks/bench_rules.py [--rules 1,10,100,1000] [--events 5000]
+
+Exits non-zero on any disagreement, or if the compiled per-event cost at
+the largest N exceeds --max-growth times the cost at the smallest.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth import generate_lines  # noqa: E402
+
+from claude_fallback.detector import UsageLimitDetector  # noqa: E402
+from claude_fallback.rules import Rule, RuleSet, default_rules, resolve  # noqa: E402
+
+FIELDS = ["error.message", "error.type", "message.content[].text", "message.stop_reason"]
+SYLLABLES = "ka zu mi ro te shi na vo pe lu qa xi".split()
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_rules(count: int, seed: int = 0) -> List[Rule]:
+    """Synthetic rules in front of the built-in ones."""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        field = FIELDS[i % len(FIELDS)]
+        if field == "message.stop_reason":
+            rules.append(Rule(f"r{i}", [field], equals=[f"{word(rng)}_{i}"]))
+        elif i % 25 == 7:
+            token = word(rng)
+            rules.append(
+                Rule(f"r{i}", [field], regex=[rf"{token} \d+ ?\w+"], requires=[token])
+            )
+        else:
+            phrases = [f"{word(rng)} {word(rng)} {i}" for _ in range(3)]
+            rules.append(Rule(f"r{i}", [field], contains=phrases, action="notify"))
+    return rules + default_rules()
+
+
+def crafted_event(rule: Rule, rng: random.Random) -> dict:
+    """An event that the given rule matches."""
+    path = rule.fields[0]
+    if rule.equals:
+        value = rule.equals[0]
+    elif rule.regex:
+        value = f"... {rule.requires[0]} {rng.randint(1, 99)} units ..."
+    else:
+        value = f"Error: {rng.choice(rule.contains).upper()} (code {rng.randint(1, 999)})"
+    event: Any = value
+    for part in reversed(path):
+        event = [event] if part == "[]" else {part: event}
+    event["type"] = "error" if path[0] == "error" else "assistant"
+    return event
+
+
+class NaiveRules:
+    """Check rules one at a time, every pattern against every field."""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = [(rule, [re.compile(r, re.I) for r in rule.regex]) for rule in rules]
+
+    def match(self, event: Any) -> Optional[str]:
+        for rule, regexes in self.rules:
+            if not rule.applies_to(event):
+                continue
+            if self._matches(rule, regexes, event):
+                return None if rule.action == "ignore" else rule.name
+        return None
+
+    @staticmethod
+    def _matches(rule: Rule, regexes: List["re.Pattern"], event: Any) -> bool:
+        for path in rule.fields:
+            for raw in resolve(event, path):
+                if not isinstance(raw, str):
+                    continue
+                lowered = raw.lower()
+                if (
+                    any(p in lowered for p in rule.contains)
+                    or lowered in rule.equals
+                    or any(rx.search(lowered) for rx in regexes)
+                ):
+                    return True
+        return False
+
+
+def per_event_us(func: Callable[[Any], Any], events: List[Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for event in events:
+            func(event)
+        best = min(best, time.perf_counter() - start)
+    return best / len(events) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--rules", default="1,10,100,1000")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-growth", type=float, default=3.0)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    lines = generate_lines(seed=7, count=args.events, limit_rate=0.01)
+    total_bytes = sum(len(line) for line in lines)
+    background = [json.loads(line) for line in lines]
+
+    print(f"{len(lines)} synthetic lines ({total_bytes / 1e6:.1f} MB) plus crafted hits\n")
+    print(
+        f"{'rules':>6} {'compiled':>12} {'naive':>12} {'check_event':>13} "
+        f"{'prefilter':>10} {'hits':>6}"
+    )
+
+    ok = True
+    costs = []
+    for count in (int(n) for n in args.rules.split(",")):
+        rules = make_rules(count)
+        ruleset = RuleSet(rules)
+        naive = NaiveRules(rules)
+        detector = UsageLimitDetector(rules)
+        crafted = [crafted_event(rng.choice(rules[:count] or rules), rng) for _ in range(200)]
+        events = background + crafted
+
+        def compiled(event: Any) -> Optional[str]:
+            match = ruleset.match(event)
+            return match[0].name if match else None
+
+        mismatches = sum(
+            1 for event in events if compiled(event) != naive.match(event)
+        )
+        hits = sum(1 for event in events if compiled(event))
+        missed = sum(1 for event in crafted if compiled(event) is None)
+        if mismatches or missed:
+            print(f"FAIL: {mismatches} disagreements, {missed} crafted events missed")
+            ok = False
+
+        compiled_us = per_event_us(compiled, events, args.repeat)
+        naive_us = per_event_us(naive.match, events, args.repeat)
+        raw = lines + [json.dumps(event).encode() for event in crafted]
+        check_us = per_event_us(detector.check_event, raw, args.repeat)
+        costs.append(compiled_us)
+        print(
+            f"{count:>6} {compiled_us:>9.2f} us {naive_us:>9.2f} us {check_us:>10.2f} us "
+            f"{'on' if detector._prefilter else 'off':>10} "
+            f"{hits:>6}"
+        )
+
+    growth = costs[-1] / costs[0]
+    print(f"\ncompiled cost growth, smallest to largest rule count: {growth:.2f}x")
+    if growth > args.max_growth:
+        print(f"FAIL: more than {args.max_growth:g}x")
+        ok = False
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
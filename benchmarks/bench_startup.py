@@ -0,0 +1,117 @@
+"""Cold-start cost of the quick CLI commands, with an import budget.
+
+Runs each command under `python -X importtime` in a throwaway HOME and sums
+the cumulative time of every module imported after interpreter startup
+(i.e. everything the command itself pulls in, found by diffing against
+`python -c pass`). Also reports the median wall time of a plain run and
+the heaviest imports. -X importtime adds its own overhead, so the import
+figures run somewhat higher than real startup.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 30] [--repeat 5]
+
+Exits non-zero if any command's imports exceed the budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+COMMANDS = {
+    "status": ["-m", "claude_fallback.cli", "status"],
+    "stop": ["-m", "claude_fallback.cli", "stop"],
+    "clear": ["-m", "claude_fallback.cli", "clear"],
+    "version": ["-m", "claude_fallback.cli", "version"],
+    "help": ["-m", "claude_fallback.cli", "help"],
+    "history": ["-m", "claude_fallback.cli", "history", "--since", "7d"],
+    "state api": ["-m", "claude_fallback.state", "api"],
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int]]:
+    """Return (module, cumulative us) for each top-level import in -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative, name = line[len("import time:") :].split("|")
+        if name.startswith("  "):
+            continue  # Nested import, already counted in its parent
+        imports.append((name.strip(), int(cumulative)))
+    return imports
+
+
+def startup_modules(env: Dict[str, str]) -> Set[str]:
+    """Modules the interpreter imports on its own (plus runpy, used by -m)."""
+    result = run(["-c", "pass"], env, importtime=True)
+    return {module for module, _us in parse_importtime(result.stderr)} | {"runpy"}
+
+
+def run(args: List[str], env: Dict[str, str], importtime: bool) -> subprocess.CompletedProcess:
+    flags = ["-X", "importtime"] if importtime else []
+    return subprocess.run(
+        [sys.executable, *flags, *args], env=env, capture_output=True, text=True
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--budget-ms", type=float, default=30.0, help="Import budget per command")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, HOME=tmp, PYTHONPATH=str(SRC))
+        env.pop("CLAUDE_FALLBACK_API_KEY", None)
+        baseline = startup_modules(env)
+
+        print(f"{'command':<12} {'imports':>10} {'wall':>10}  heaviest")
+        for name, cmd in COMMANDS.items():
+            samples = []
+            for _ in range(args.repeat):
+                imports = parse_importtime(run(cmd, env, importtime=True).stderr)
+                samples.append(
+                    sum(us for module, us in imports if module not in baseline) / 1000
+                )
+            import_ms = statistics.median(samples)
+
+            walls = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run(cmd, env, importtime=False)
+                walls.append((time.perf_counter() - start) * 1000)
+
+            heaviest = sorted(
+                (item for item in imports if item[0] not in baseline),
+                key=lambda item: item[1],
+                reverse=True,
+            )[: args.top]
+            flag = ""
+            if import_ms > args.budget_ms:
+                flag = "  OVER BUDGET"
+                ok = False
+            print(
+                f"{name:<12} {import_ms:>8.1f}ms {statistics.median(walls):>8.1f}ms  "
+                + ", ".join(f"{module} {us / 1000:.1f}ms" for module, us in heaviest)
+                + flag
+            )
+
+    if not ok:
+        print(f"\nFAIL: import budget of {args.budget_ms:g} ms exceeded")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
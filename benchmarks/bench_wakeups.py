@@ -0,0 +1,118 @@
+"""Wakeups per hour and detection delay of the polling schedules.
+
+Replays a simulated day of session activity (idle stretches with bursts of
+streaming writes) against the old fixed 2s poll and the adaptive schedule,
+using a virtual clock so it finishes instantly. Reports wakeups per hour
+overall and while idle, and how long writes waited for the next poll.
+
+Usage:
+    python benchmarks/bench_wakeups.py [--hours 24] [--min 0.5] [--max 30]
+"""
+
+import argparse
+import bisect
+import random
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from claude_fallback.watcher import AdaptiveInterval  # noqa: E402
+
+Burst = Tuple[float, float]
+
+
+def activity_trace(
+    hours: float, sessions_per_hour: float, seed: int = 1
+) -> Tuple[List[float], List[Burst]]:
+    """
+    Generate write times: bursts of writes ~0.2s apart, lasting 1-10 minutes.
+
+    Returns:
+        Sorted write times and the (start, end) of each burst
+    """
+    rng = random.Random(seed)
+    writes: List[float] = []
+    bursts: List[Burst] = []
+    t = 0.0
+    end = hours * 3600
+    while True:
+        t += rng.expovariate(sessions_per_hour / 3600)
+        if t >= end:
+            break
+        start, burst_end = t, min(t + rng.uniform(60, 600), end)
+        while t < burst_end:
+            writes.append(t)
+            t += rng.expovariate(5)
+        bursts.append((start, t))
+    return writes, bursts
+
+
+def simulate(
+    schedule: AdaptiveInterval, writes: List[float], bursts: List[Burst], hours: float
+) -> Dict[str, float]:
+    end = hours * 3600
+    starts = [start for start, _end in bursts]
+    t = 0.0
+    wakeups = idle_wakeups = 0
+    delays = []
+    i = 0
+    while t < end:
+        t += schedule.next_delay()
+        wakeups += 1
+        b = bisect.bisect_right(starts, t) - 1
+        if b < 0 or t > bursts[b][1]:
+            idle_wakeups += 1
+        j = bisect.bisect_right(writes, t)
+        if j > i:
+            delays.extend(t - w for w in writes[i:j])
+            schedule.activity()
+        else:
+            schedule.idle()
+        i = j
+
+    busy_hours = sum(stop - start for start, stop in bursts) / 3600
+    delays.sort()
+    return {
+        "wakeups_per_hour": wakeups / hours,
+        "idle_wakeups_per_hour": idle_wakeups / max(hours - busy_hours, 1e-9),
+        "delay_p50": delays[len(delays) // 2] if delays else 0.0,
+        "delay_p95": delays[int(len(delays) * 0.95)] if delays else 0.0,
+        "delay_max": delays[-1] if delays else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--sessions-per-hour", type=float, default=1.0)
+    parser.add_argument("--min", type=float, default=0.5, help="poll_min_interval")
+    parser.add_argument("--max", type=float, default=30.0, help="poll_max_interval")
+    parser.add_argument("--jitter", type=float, default=0.1, help="poll_jitter")
+    args = parser.parse_args()
+
+    writes, bursts = activity_trace(args.hours, args.sessions_per_hour)
+    schedules = {
+        "fixed 2s": AdaptiveInterval(2.0, 2.0, jitter=0),
+        "adaptive": AdaptiveInterval(args.min, args.max, jitter=args.jitter),
+    }
+
+    print(f"{len(writes)} writes in {len(bursts)} bursts over {args.hours:g}h\n")
+    print(
+        f"{'schedule':<10} {'wakeups/h':>10} {'idle/h':>8} "
+        f"{'delay p50':>10} {'delay p95':>10} {'delay max':>10}"
+    )
+    for name, schedule in schedules.items():
+        r = simulate(schedule, writes, bursts, args.hours)
+        print(
+            f"{name:<10} {r['wakeups_per_hour']:>10.0f} {r['idle_wakeups_per_hour']:>8.0f} "
+            f"{r['delay_p50']:>9.2f}s {r['delay_p95']:>9.2f}s {r['delay_max']:>9.2f}s"
+        )
+    print("\nThe max delay is the first write after an idle stretch (bounded by --max).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""Soak test: the monitor's memory must stay flat over days of simulated time.
+
+Runs an in-process LogMonitor in a throwaway HOME, with notifications
+replaced by a counter, and plays --hours of simulated activity in rounds
+of --round-minutes. Each round every active session appends --lines
+synthetic lines (benchmarks/synth.py, with the occasional usage limit;
+every line gets a fresh uuid), and the monitor does a full rescan.
+Sessions last about --session-hours; then they go idle (their mtime is
+moved back past active_window), and their logs are deleted a while
+later, while new sessions start in their place.
+The monitor's clocks (action scheduler, RSS checks) follow simulated time.
+
+The monitor's bounded caches (handled events, offsets, latency samples)
+get small limits so that they fill up during warm-up; what is left to
+grow after that is a leak. Memory is sampled after every round with
+tracemalloc (live Python objects, after a gc) and as RSS, and the median
+of the last quarter of the run is compared with that of the first
+quarter, after warm-up.
+
+Usage:
+    python benchmarks/soak_memory.py [--hours 48] [--round-minutes 10] [--sessions 8]
+                                     [--lines 200] [--max-growth-kb 256]
+
+Exits non-zero if traced memory grows by more than --max-growth-kb.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BENCHMARKS = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS.parent / "src"))
+sys.path.insert(0, str(BENCHMARKS))
+
+from synth import generate_lines  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_monitor(clock: FakeClock, notified: List[int], max_rss_mb: float):
+    # Deferred until HOME points at the scratch dir
+    from claude_fallback.config import Config
+    from claude_fallback.metrics import LatencyStats
+    from claude_fallback.monitor import LogMonitor
+
+    monitor = LogMonitor(Config(api_key="sk-ant-soak", max_rss_mb=max_rss_mb))
+    monitor.scheduler.clock = clock
+    monitor.memory_budget.clock = clock
+
+    def notify(title: str, message: str, on_delivered=None) -> None:
+        notified[0] += 1
+        if on_delivered is not None:
+            on_delivered()
+
+    monitor.notifier.notify = notify
+    monitor.latency = LatencyStats(window=100)
+    monitor.seen.max_entries = 256
+    monitor.checkpoint.max_entries = 64
+    monitor.checkpoint.flush_interval = 0
+    monitor.checkpoint.load()
+    monitor.seen.load()
+    return monitor
+
+
+class LinePool:
+    """Synthetic lines, generated once and handed out with fresh uuids."""
+
+    def __init__(self, count: int) -> None:
+        self.parts: List[Tuple[bytes, bytes]] = []
+        for line in generate_lines(seed=0, count=count):
+            # Every synthetic event starts with its uuid
+            assert line.startswith(b'{"uuid":"')
+            self.parts.append((line[:9], line[41:]))
+        self.next = 0
+
+    def take(self, count: int) -> bytes:
+        chunks = []
+        for _ in range(count):
+            before, after = self.parts[self.next % len(self.parts)]
+            chunks += (before, b"%032x" % self.next, after)
+            self.next += 1
+        return b"".join(chunks)
+
+
+def sample(traced: "array[int]", rss: "array[int]", i: int) -> None:
+    """Record traced bytes of live objects and RSS bytes, without allocating."""
+    from claude_fallback.memory import rss_bytes
+
+    gc.collect()
+    traced[i] = tracemalloc.get_traced_memory()[0]
+    rss[i] = rss_bytes() or 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--hours", type=float, default=48.0, help="Simulated hours")
+    parser.add_argument("--round-minutes", type=float, default=10.0)
+    parser.add_argument("--sessions", type=int, default=8, help="Sessions active at once")
+    parser.add_argument("--lines", type=int, default=200, help="Lines per session per round")
+    parser.add_argument("--session-hours", type=float, default=2.0)
+    parser.add_argument("--max-rss-mb", type=float, default=256.0)
+    parser.add_argument("--max-growth-kb", type=float, default=256.0)
+    args = parser.parse_args()
+
+    round_seconds = args.round_minutes * 60
+    rounds = int(args.hours * 60 / args.round_minutes)
+    lifetime = max(1, int(args.session_hours * 60 / args.round_minutes))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Module-level paths (state, offsets, seen events) derive from HOME at import time
+        os.environ["HOME"] = tmp
+        projects = Path(tmp) / ".claude" / "projects"
+        project_dirs = []
+        for i in range(4):
+            project_dirs.append(projects / f"-tmp-project-{i}" / "sessions")
+            project_dirs[-1].mkdir(parents=True)
+
+        pool = LinePool(4000)
+        clock = FakeClock()
+        # One-element counter, so the harness itself doesn't grow
+        notified = [0]
+        tracemalloc.start()
+        with contextlib.redirect_stdout(io.StringIO()):
+            monitor = new_monitor(clock, notified, args.max_rss_mb)
+        active_window = monitor.config.active_window
+
+        # Active session log -> round it ends, idle log -> round it ended
+        active: Dict[Path, int] = {}
+        idle: Dict[Path, int] = {}
+        started = 0
+        written = 0
+        traced = array("q", bytes(8 * rounds))
+        rss = array("q", bytes(8 * rounds))
+        start = time.perf_counter()
+        print(f"{'hour':>6} {'logs':>5} {'tracked':>8} {'traced':>10} {'rss':>10}")
+        for r in range(rounds):
+            while len(active) < args.sessions:
+                log = project_dirs[started % len(project_dirs)] / f"session-{started:06d}.jsonl"
+                # Staggered lifetimes, so sessions don't all end in the same round
+                active[log] = r + lifetime // 2 + started * 7 % lifetime
+                started += 1
+            for log, end in list(active.items()):
+                with open(log, "ab") as f:
+                    written += f.write(pool.take(args.lines))
+                if r >= end:
+                    # Last write long enough ago that the monitor stops tailing it
+                    old = time.time() - active_window - 60
+                    os.utime(log, (old, old))
+                    idle[log] = r
+                    del active[log]
+            for log, retired in list(idle.items()):
+                if r - retired >= lifetime:
+                    log.unlink()
+                    del idle[log]
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                monitor.tick(None)
+            clock.now += round_seconds
+            sample(traced, rss, r)
+            hour = (r + 1) * args.round_minutes / 60
+            if (r + 1) % max(1, rounds // 12) == 0 or r == rounds - 1:
+                print(
+                    f"{hour:>6.1f} {len(active) + len(idle):>5} {len(monitor.tailer):>8} "
+                    f"{traced[r] / 1024:>7.0f} KiB {rss[r] / 1048576:>6.1f} MiB"
+                )
+        elapsed = time.perf_counter() - start
+        monitor.close()
+        tracemalloc.stop()
+
+    def growth(samples: "array[int]") -> float:
+        quarter = max(1, rounds // 4)
+        # The first quarter includes warm-up (caches filling); compare its second half
+        early = samples[quarter // 2 : quarter] or samples[:quarter]
+        return statistics.median(samples[-quarter:]) - statistics.median(early)
+
+    traced_growth, rss_growth = growth(traced), growth(rss)
+    ok = traced_growth <= args.max_growth_kb * 1024
+    print(
+        f"\n{args.hours:g} simulated hours in {elapsed:.1f}s: {started} sessions, "
+        f"{written / 1e6:.0f} MB written, {notified[0]} notification(s), "
+        f"caches shed {monitor.metrics.memory_sheds.value():.0f} time(s)"
+    )
+    print(
+        f"growth from first to last quarter: traced {traced_growth / 1024:+.0f} KiB "
+        f"(limit {args.max_growth_kb:.0f}), RSS {rss_growth / 1048576:+.1f} MiB  "
+        f"{'ok' if ok else 'FAIL'}"
+    )
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
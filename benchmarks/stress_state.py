@@ -0,0 +1,135 @@
+"""Stress test for State persistence under many concurrent writers.
+
+Starts --writers processes that each run --iterations read-modify-write
+transactions against one state file in a temp HOME, plus a few shells
+running the claude-api/claude-sub state update from shell_functions.sh,
+while a reader keeps parsing the file.
+
+Each Python transaction increments a counter stored in limit_detected_at,
+so a lost update shows up as a final count below writers * iterations.
+Exits non-zero if the reader ever saw a torn file or an update was lost.
+
+Usage:
+    python benchmarks/stress_state.py [--writers 16] [--iterations 200]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+from claude_fallback.state import State  # noqa: E402
+
+SHELL_FUNCTIONS = SRC / "claude_fallback" / "shell_functions.sh"
+
+
+def use_home(home: Path) -> None:
+    State.STATE_FILE = home / ".claude_fallback_state.json"
+    State.LOCK_FILE = home / ".claude_fallback_state.lock"
+    State.FLAG_FILE = home / ".claude_fallback_active"
+
+
+def writer(home: Path, iterations: int) -> None:
+    use_home(home)
+    for i in range(iterations):
+        with State.transaction() as state:
+            count = int(state.limit_detected_at or 0)
+            # Several transitions per transaction still produce one write
+            state.set_limit_detected()
+            if i % 2:
+                state.switch_to_api()
+            else:
+                state.switch_to_subscription()
+            state.limit_detected_at = str(count + 1)
+
+
+def shell_writer(home: Path, iterations: int) -> None:
+    script = f'source "{SHELL_FUNCTIONS}"; for i in $(seq {iterations}); do ' \
+        "_claude_fallback_set_mode api; _claude_fallback_set_mode subscription; done"
+    env = dict(
+        os.environ, HOME=str(home), PYTHONPATH=str(SRC), CLAUDE_FALLBACK_PYTHON=sys.executable
+    )
+    subprocess.run(["bash", "-c", script], env=env, check=True)
+
+
+def reader(home: Path, stop, result) -> None:
+    path = home / ".claude_fallback_state.json"
+    reads = torn = 0
+    while not stop.is_set():
+        try:
+            data = path.read_text()
+        except FileNotFoundError:
+            continue
+        reads += 1
+        try:
+            json.loads(data)
+        except json.JSONDecodeError:
+            torn += 1
+    result.put((reads, torn))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--shell-writers", type=int, default=2)
+    parser.add_argument("--shell-iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        home = Path(tmp)
+        stop = multiprocessing.Event()
+        result: multiprocessing.Queue = multiprocessing.Queue()
+        read_proc = multiprocessing.Process(target=reader, args=(home, stop, result))
+        read_proc.start()
+
+        start = time.perf_counter()
+        procs = [
+            multiprocessing.Process(target=writer, args=(home, args.iterations))
+            for _ in range(args.writers)
+        ]
+        procs += [
+            multiprocessing.Process(target=shell_writer, args=(home, args.shell_iterations))
+            for _ in range(args.shell_writers)
+        ]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        reads, torn = result.get()
+        read_proc.join()
+
+        use_home(home)
+        final = State.load()
+        leftovers = [p.name for p in home.iterdir() if p.name.endswith(".tmp")]
+
+    expected = args.writers * args.iterations
+    count = int(final.limit_detected_at or 0)
+    transactions = expected + args.shell_writers * args.shell_iterations * 2
+    print(f"transactions:  {transactions} in {elapsed:.2f} s "
+          f"({transactions / elapsed:.0f}/s)")
+    print(f"counter:       {count} (expected {expected})")
+    print(f"reads:         {reads} ({torn} torn)")
+    print(f"temp files:    {len(leftovers)} left behind")
+
+    if count != expected or torn or leftovers:
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Stress test: detection storms and restarts must not repeat actions.
+
+Runs an in-process LogMonitor with auto_restart on, in a throwaway HOME,
+with notifications and restarts replaced by counters, through:
+
+  storm     --burst usage-limit lines (each with its own uuid) in one
+            session, and a tenth as many in each of --sessions - 1 others,
+            all within one coalesce window: exactly one switch
+            (notification) and one restart per session
+  restart   a new monitor re-reads every log from the start, as after a
+            crash: nothing is acted on again (all duplicates)
+  interval  a new error in a session after restart_interval: one more
+            switch and restart, and none for another error right after
+
+Usage:
+    python benchmarks/stress_storm.py [--burst 100] [--sessions 5]
+
+Exits non-zero if any phase takes a different number of actions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+def limit_line(seq: int) -> bytes:
+    event = {
+        "type": "error",
+        "uuid": f"{seq:032x}",
+        "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"},
+    }
+    return json.dumps(event).encode() + b"\n"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_monitor(clock: FakeClock, actions: Dict[str, List[str]]):
+    # Deferred until HOME points at the scratch dir
+    from claude_fallback.config import Config
+    from claude_fallback.monitor import LogMonitor
+
+    monitor = LogMonitor(Config(api_key="sk-ant-stress", auto_restart=True))
+    monitor.scheduler.clock = clock
+    monitor.notifier.notify = lambda title, message, **kwargs: actions["notify"].append(message)
+    monitor._auto_restart_claude = lambda log, on_done: actions["restart"].append(log.path.stem)
+    monitor.seen.load()
+    return monitor
+
+
+def read_all(monitor, logs: List[Path]) -> None:
+    for log in logs:
+        if log not in monitor.tailer.logs:
+            monitor.tailer.track(log, 0)
+    monitor._check_for_updates()
+
+
+def check(phase: str, actions: Dict[str, List[str]], switches: int, restarts: List[str]) -> bool:
+    ok = len(actions["notify"]) == switches and sorted(actions["restart"]) == sorted(restarts)
+    print(
+        f"{phase:<9} {len(actions['notify']):>3} switch(es), {len(actions['restart']):>3} "
+        f"restart(s) (expected {switches} and {len(restarts)})  {'ok' if ok else 'FAIL'}"
+    )
+    actions["notify"].clear()
+    actions["restart"].clear()
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Module-level paths (state, seen events) derive from HOME at import time
+        os.environ["HOME"] = tmp
+        sessions = Path(tmp) / ".claude" / "projects" / "-tmp-project" / "sessions"
+        sessions.mkdir(parents=True)
+        logs = [sessions / f"session-{i}.jsonl" for i in range(args.sessions)]
+
+        seq = 0
+        for i, log in enumerate(logs):
+            with open(log, "wb") as f:
+                for _ in range(args.burst if i == 0 else max(1, args.burst // 10)):
+                    f.write(limit_line(seq))
+                    seq += 1
+
+        clock = FakeClock()
+        actions: Dict[str, List[str]] = {"notify": [], "restart": []}
+        with contextlib.redirect_stdout(io.StringIO()):
+            monitor = new_monitor(clock, actions)
+            start = time.perf_counter()
+            read_all(monitor, logs)
+            elapsed = time.perf_counter() - start
+            monitor.close()
+        ok = check("storm", actions, 1, [log.stem for log in logs])
+        print(
+            f"          {seq} detections in {elapsed * 1000:.0f} ms, "
+            f"{monitor.metrics.coalesced_detections.value():.0f} coalesced"
+        )
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            monitor = new_monitor(clock, actions)
+            read_all(monitor, logs)
+        ok = check("restart", actions, 0, []) and ok
+        duplicates = monitor.metrics.duplicate_detections.value()
+        print(f"          {duplicates:.0f} of {seq} detections skipped as already handled")
+        ok = ok and duplicates == seq
+
+        # One more error in the first session once its restart interval is over
+        clock.now += monitor.scheduler.restart_interval
+        with contextlib.redirect_stdout(io.StringIO()):
+            with open(logs[0], "ab") as f:
+                f.write(limit_line(seq))
+            read_all(monitor, logs)
+            # And another right after it, inside the new window and interval
+            with open(logs[0], "ab") as f:
+                f.write(limit_line(seq + 1))
+            read_all(monitor, logs)
+            monitor.close()
+        ok = check("interval", actions, 1, [logs[0].stem]) and ok
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
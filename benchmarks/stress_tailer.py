@@ -0,0 +1,163 @@
+"""Stress test for MultiTailer on logs written in fragments, truncated and rotated.
+
+A writer appends numbered JSON lines to one log in random-sized fragments,
+so reads often end mid-line, and now and then:
+
+  - truncates the log and starts over
+  - replaces it with a new file (rename + create, like log rotation)
+  - writes a line longer than max_line_bytes
+
+The tailer reads at random points in between. Every normal line must come
+out exactly once, whole and in order; the long lines must be skipped.
+
+Then a single large append (--burst-mb) is tailed with tracemalloc running
+to check that peak memory stays near READ_CHUNK + max_line_bytes rather
+than growing with the size of the append, and its throughput is reported.
+
+Usage:
+    python benchmarks/stress_tailer.py [--lines 20000] [--burst-mb 64]
+
+Exits non-zero on a lost, duplicated, torn or out-of-order line, or if the
+burst's peak memory exceeds its bound.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from claude_fallback.tailer import READ_CHUNK, MultiTailer  # noqa: E402
+
+MAX_LINE_BYTES = 64 * 1024
+
+
+def read_all(tailer: MultiTailer, path: Path, out: List[bytes]) -> None:
+    for batch in tailer.iter_new_lines(tailer.logs[path]):
+        out.extend(batch)
+
+
+def churn(path: Path, args: argparse.Namespace) -> bool:
+    rng = random.Random(args.seed)
+    tailer = MultiTailer(max_line_bytes=MAX_LINE_BYTES)
+    path.write_bytes(b"")
+    tailer.track(path, 0, os.stat(path).st_ino)
+
+    received: List[bytes] = []
+    expected = 0
+    truncations = rotations = long_lines = 0
+    pending = b""
+    f = open(path, "ab")
+
+    for seq in range(args.lines):
+        action = rng.random()
+        if action < 0.002 or action > 0.998:
+            # Let the tailer catch up first, or unread lines would be lost
+            f.write(pending)
+            f.flush()
+            pending = b""
+            read_all(tailer, path, received)
+            f.close()
+            if action < 0.002:
+                truncations += 1
+                f = open(path, "wb")
+            else:
+                rotations += 1
+                os.replace(path, path.with_suffix(".old"))
+                f = open(path, "ab")
+        elif action < 0.004:
+            long_lines += 1
+            pending += b'{"long": "' + b"x" * (MAX_LINE_BYTES * rng.randint(1, 4)) + b'"}\n'
+
+        pending += json.dumps({"seq": seq, "pad": "y" * rng.randint(0, 600)}).encode() + b"\n"
+        expected += 1
+        while len(pending) > rng.randint(0, 4096):
+            cut = rng.randint(1, len(pending))
+            f.write(pending[:cut])
+            f.flush()
+            pending = pending[cut:]
+            if rng.random() < 0.3:
+                read_all(tailer, path, received)
+    f.write(pending)
+    f.close()
+    read_all(tailer, path, received)
+    tailer.close()
+
+    seqs = []
+    torn = 0
+    for line in received:
+        try:
+            seqs.append(json.loads(line)["seq"])
+        except (ValueError, KeyError):
+            torn += 1
+
+    ok = seqs == list(range(expected)) and not torn
+    print(
+        f"churn: {expected} lines, {truncations} truncations, {rotations} rotations, "
+        f"{long_lines} long lines"
+    )
+    print(
+        f"       received {len(seqs)} in order: {seqs == list(range(expected))}, "
+        f"torn {torn}, resets {tailer.resets}, skipped {tailer.skipped_lines}"
+    )
+    if tailer.resets != truncations + rotations or tailer.skipped_lines != long_lines:
+        ok = False
+    return ok
+
+
+def burst(path: Path, args: argparse.Namespace) -> bool:
+    line = json.dumps({"type": "user", "pad": "z" * 2000}).encode() + b"\n"
+    count = args.burst_mb * 1024 * 1024 // len(line)
+    with open(path, "wb") as f:
+        for _ in range(count // 1000):
+            f.write(line * 1000)
+    size = os.path.getsize(path)
+
+    tailer = MultiTailer(max_line_bytes=MAX_LINE_BYTES)
+    log = tailer.track(path, 0)
+    lines = 0
+    tracemalloc.start()
+    start = time.perf_counter()
+    for batch in tailer.iter_new_lines(log):
+        lines += len(batch)
+    elapsed = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tailer.close()
+
+    # The caller's previous batch, the next chunk and its lines, a partial line
+    bound = 4 * READ_CHUNK + MAX_LINE_BYTES
+    print(
+        f"burst: {size / 1e6:.0f} MB in {elapsed:.2f}s ({size / 1e6 / elapsed:.0f} MB/s), "
+        f"{lines} lines, peak traced memory {peak / 1024:.0f} KiB (bound {bound / 1024:.0f} KiB)"
+    )
+    return lines == count // 1000 * 1000 and peak <= bound
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--burst-mb", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = churn(Path(tmp) / "churn.jsonl", args)
+        ok = burst(Path(tmp) / "burst.jsonl", args) and ok
+
+    if not ok:
+        print("FAIL")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
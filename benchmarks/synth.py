@@ -0,0 +1,170 @@
+"""Synthetic Claude Code session logs for benchmarks.
+
+Lines mimic the shapes found in real ~/.claude/projects session JSONL: user
+prompts, assistant text, tool_use calls and (large) tool_result payloads,
+with rare usage-limit events mixed in.
+"""
+
+import json
+import random
+from pathlib import Path
+from typing import Iterator, List
+
+WORDS = (
+    "the function returns a list of files that match pattern config state monitor "
+    "error session log line offset read write test build import "
+    "module class method value key path directory result output input python shell "
+    "cache thread socket buffer stream queue worker token parser schema \u2192 \u2713 \u00e9t\u00e9"
+).split()
+
+LIMIT_EVENTS = [
+    {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}},
+    {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+    {
+        "type": "assistant",
+        "message": {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": "Claude usage limit reached. Your limit resets at 5pm."}
+            ],
+            "stop_reason": "end_turn",
+        },
+    },
+    {
+        "type": "assistant",
+        "message": {"role": "assistant", "content": [], "stop_reason": "rate_limit"},
+    },
+]
+
+
+def _text(rng: random.Random, num_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(num_words))
+
+
+def _tool_output(rng: random.Random, num_lines: int) -> str:
+    """Code-like output: indentation, quotes and newlines that JSON must escape."""
+    out = []
+    for _ in range(num_lines):
+        indent = "    " * rng.randint(0, 3)
+        words = _text(rng, rng.randint(2, 10))
+        if rng.random() < 0.3:
+            words = f'{rng.choice(WORDS)} = "{words}"'
+        out.append(f"{indent}{words}")
+    return "\n".join(out)
+
+
+def _usage(rng: random.Random) -> dict:
+    return {
+        "input_tokens": rng.randint(1, 5000),
+        "cache_creation_input_tokens": rng.randint(0, 20000),
+        "cache_read_input_tokens": rng.randint(0, 200000),
+        "output_tokens": rng.randint(1, 4000),
+        "service_tier": "standard",
+    }
+
+
+def _envelope(rng: random.Random, index: int) -> dict:
+    return {
+        "uuid": f"{rng.getrandbits(128):032x}",
+        "parentUuid": f"{rng.getrandbits(128):032x}",
+        "sessionId": "00000000-0000-0000-0000-000000000000",
+        "timestamp": f"2025-01-01T00:{index // 60 % 60:02d}:{index % 60:02d}.000Z",
+        "cwd": "/home/user/project",
+    }
+
+
+def generate_events(seed: int = 0, count: int = 1000, limit_rate: float = 0.001) -> Iterator[dict]:
+    """
+    Yield synthetic session events.
+
+    Args:
+        seed: Random seed (output is deterministic for a given seed)
+        count: Number of events to generate
+        limit_rate: Probability that an event is a usage-limit event
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        event = _envelope(rng, i)
+        roll = rng.random()
+        if roll < limit_rate:
+            event.update(rng.choice(LIMIT_EVENTS))
+        elif roll < 0.15:
+            event.update({"type": "user", "message": {"role": "user", "content": _text(rng, 30)}})
+        elif roll < 0.45:
+            event.update(
+                {
+                    "type": "assistant",
+                    "message": {
+                        "role": "assistant",
+                        "content": [{"type": "text", "text": _text(rng, rng.randint(20, 400))}],
+                        "stop_reason": "end_turn",
+                        "usage": _usage(rng),
+                    },
+                }
+            )
+        elif roll < 0.65:
+            event.update(
+                {
+                    "type": "assistant",
+                    "message": {
+                        "role": "assistant",
+                        "content": [
+                            {
+                                "type": "tool_use",
+                                "name": "Bash",
+                                "input": {"command": _text(rng, 8)},
+                            }
+                        ],
+                        "stop_reason": "tool_use",
+                        "usage": _usage(rng),
+                    },
+                }
+            )
+        else:
+            # Tool results dominate real logs by volume, and Claude Code
+            # stores the output twice (message content and toolUseResult)
+            output = _tool_output(rng, rng.randint(20, 300))
+            event.update(
+                {
+                    "type": "user",
+                    "message": {
+                        "role": "user",
+                        "content": [{"type": "tool_result", "content": output}],
+                    },
+                    "toolUseResult": {"stdout": output, "stderr": "", "interrupted": False},
+                }
+            )
+        yield event
+
+
+def generate_lines(seed: int = 0, count: int = 1000, limit_rate: float = 0.001) -> List[bytes]:
+    """Return synthetic session log lines as newline-terminated bytes."""
+    return [
+        json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        for event in generate_events(seed, count, limit_rate)
+    ]
+
+
+def write_session_tree(
+    root: Path,
+    num_files: int,
+    events_per_file: int = 100,
+    limit_rate: float = 0.001,
+    seed: int = 0,
+    files_per_project: int = 20,
+) -> List[Path]:
+    """
+    Create a projects tree of synthetic session logs under root.
+
+    Returns:
+        Paths of the created logs
+    """
+    logs = []
+    for i in range(num_files):
+        sessions = root / f"project-{i // files_per_project}" / "sessions"
+        sessions.mkdir(parents=True, exist_ok=True)
+        log = sessions / f"session-{i:05d}.jsonl"
+        with open(log, "wb") as f:
+            f.writelines(generate_lines(seed + i, events_per_file, limit_rate))
+        logs.append(log)
+    return logs
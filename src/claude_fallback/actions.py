@@ -0,0 +1,72 @@
+"""Coalescing and rate limiting of the monitor's responses to detections."""
+
+import time
+from typing import Callable, Dict, Tuple
+
+
+class ActionScheduler:
+    """
+    Decides which detections the monitor acts on.
+
+    Usage limits arrive in bursts: a session retries and logs the same
+    error over and over, and every open session hits the limit at about the
+    same time. Only the first detection in each coalesce_window switches
+    (updates the state and notifies); later ones are coalesced into it.
+    Each session's Claude is restarted at most once per restart_interval,
+    so a burst of errors in one session leads to a single restart, and
+    several sessions hitting the limit together get one restart each.
+    """
+
+    def __init__(
+        self,
+        coalesce_window: float = 30.0,
+        restart_interval: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            coalesce_window: Seconds after a switch during which detections are coalesced
+            restart_interval: Minimum seconds between two restarts of the same session
+            clock: Time source (monotonic seconds)
+        """
+        self.coalesce_window = coalesce_window
+        self.restart_interval = restart_interval
+        self.clock = clock
+        self.coalesced = 0
+        self._last_switch = float("-inf")
+        self._last_restart: Dict[str, float] = {}
+
+    def plan(self, session: str, restart: bool) -> Tuple[bool, bool]:
+        """
+        Decide what to do about a detection, and record it as done.
+
+        Args:
+            session: Session the detection came from (its log's name)
+            restart: Whether the detection calls for restarting the session's Claude
+
+        Returns:
+            (switch, restart): whether to update the state and notify, and
+            whether to restart the session's Claude
+        """
+        now = self.clock()
+        switch = now - self._last_switch >= self.coalesce_window
+        if switch:
+            self._last_switch = now
+
+        if restart:
+            last = self._last_restart.get(session)
+            restart = last is None or now - last >= self.restart_interval
+        if restart:
+            self._last_restart = {
+                s: t for s, t in self._last_restart.items() if now - t < self.restart_interval
+            }
+            self._last_restart[session] = now
+
+        if not switch and not restart:
+            self.coalesced += 1
+        return switch, restart
+
+    def reset(self) -> None:
+        """Forget past actions, so that the next detection is acted on at once."""
+        self._last_switch = float("-inf")
+        self._last_restart.clear()
@@ -0,0 +1,123 @@
+"""Crash-safe persistence of per-log read offsets."""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from claude_fallback.fileutil import Owner, atomic_write
+
+
+class OffsetCheckpoint:
+    """
+    Remembers how far each session log has been read across monitor restarts.
+
+    Offsets are keyed by inode plus path, so a log that was replaced under the
+    same name is not resumed at a stale offset. Updates are kept in memory
+    and written out in batches (at most once per flush_interval) using a
+    temp file and atomic rename, so a crash never leaves a torn file behind.
+    """
+
+    CHECKPOINT_FILE = Path.home() / ".claude_fallback_offsets.json"
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        flush_interval: float = 5.0,
+        max_entries: int = 1000,
+        owner: Optional[Owner] = None,
+    ):
+        """
+        Initialize the checkpoint.
+
+        Args:
+            path: Checkpoint file location (defaults to CHECKPOINT_FILE)
+            flush_interval: Minimum seconds between writes to disk
+            max_entries: Maximum number of logs remembered (oldest dropped first)
+            owner: (uid, gid) to give the file when writing for another user
+        """
+        self.path = path or self.CHECKPOINT_FILE
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.owner = owner
+        # key -> [offset, last update time]
+        self._entries: Dict[str, List[float]] = {}
+        self._dirty = False
+        self._last_flush = 0.0
+
+    @staticmethod
+    def _key(path: Path, inode: int) -> str:
+        return f"{inode}:{path}"
+
+    def load(self) -> None:
+        """Load saved offsets, dropping entries whose log no longer exists."""
+        try:
+            with open(self.path) as f:
+                entries = json.load(f).get("offsets", {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return
+        if not isinstance(entries, dict):
+            return
+
+        for key, value in entries.items():
+            inode, _, path = key.partition(":")
+            try:
+                if os.stat(path).st_ino != int(inode):
+                    continue
+                offset, updated = int(value[0]), float(value[1])
+            except (OSError, ValueError, TypeError, IndexError):
+                continue
+            self._entries[key] = [offset, updated]
+
+    def prune(self) -> int:
+        """
+        Drop the offsets of logs that were deleted or replaced.
+
+        Returns:
+            Number of entries dropped
+        """
+        gone = []
+        for key in self._entries:
+            inode, _, path = key.partition(":")
+            try:
+                if os.stat(path).st_ino == int(inode):
+                    continue
+            except (OSError, ValueError):
+                pass
+            gone.append(key)
+        for key in gone:
+            del self._entries[key]
+        if gone:
+            self._dirty = True
+        return len(gone)
+
+    def get(self, path: Path, inode: int) -> Optional[int]:
+        """Return the saved offset for a log, or None if unknown."""
+        entry = self._entries.get(self._key(path, inode))
+        return int(entry[0]) if entry else None
+
+    def set(self, path: Path, inode: int, offset: int) -> None:
+        """Record a log's offset (written out on the next flush)."""
+        key = self._key(path, inode)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == offset:
+            return
+        self._entries[key] = [offset, time.time()]
+        self._dirty = True
+
+    def maybe_flush(self) -> None:
+        """Flush if there are pending changes and flush_interval has passed."""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomically write all offsets to disk."""
+        if len(self._entries) > self.max_entries:
+            newest = sorted(self._entries.items(), key=lambda item: item[1][1])
+            self._entries = dict(newest[-self.max_entries :])
+
+        data = {"version": 1, "offsets": self._entries}
+        atomic_write(self.path, json.dumps(data, separators=(",", ":")), self.owner)
+        self._dirty = False
+        self._last_flush = time.monotonic()
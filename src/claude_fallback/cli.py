@@ -1,15 +1,17 @@
-"""Command-line interface for Claude Code Fallback."""
+"""Command-line interface for Claude Code Fallback.
+
+Each command imports only what it needs, so quick commands like status and
+stop start fast and never load the monitor.
+"""
 
 import os
-import signal
-import subprocess
 import sys
 from pathlib import Path
+from typing import Any, Dict, Optional
 
 from claude_fallback import __version__ as VERSION
-from claude_fallback.config import Config
-from claude_fallback.monitor import PID_FILE, is_already_running
-from claude_fallback.state import State
+
+MIB = 1024 * 1024
 
 
 def install_shell_functions() -> None:
@@ -27,16 +29,26 @@ def install_shell_functions() -> None:
         return
 
     functions_file = Path(__file__).parent / "shell_functions.sh"
+    python_line = f'export CLAUDE_FALLBACK_PYTHON="{sys.executable}"\n'
 
     # Check if already installed
     if rc_file.exists():
         content = rc_file.read_text()
         if "claude_fallback/shell_functions.sh" in content:
+            if "CLAUDE_FALLBACK_PYTHON=" not in content:
+                # Installed by an older version: the functions need this to
+                # reach the package from pipx/uv installs
+                with open(rc_file, "a") as f:
+                    f.write("\n# Claude Code Fallback: interpreter for claude-api/claude-sub\n")
+                    f.write(python_line)
+                print(f"Added CLAUDE_FALLBACK_PYTHON to {rc_file}")
+                print(f"\nRun 'source {rc_file}' or restart your terminal.")
+                return
             print(f"Shell functions already installed in {rc_file}")
             return
 
     # Add source line to rc file
-    source_line = f'\n# Claude Code Fallback\nsource "{functions_file}"\n'
+    source_line = f'\n# Claude Code Fallback\n{python_line}source "{functions_file}"\n'
 
     with open(rc_file, "a") as f:
         f.write(source_line)
@@ -51,6 +63,8 @@ def install_shell_functions() -> None:
 
 def start_monitor() -> None:
     """Start the background monitor."""
+    from claude_fallback.pidfile import is_already_running
+
     daemon_mode = "--daemon" in sys.argv
 
     if is_already_running():
@@ -59,6 +73,8 @@ def start_monitor() -> None:
         return
 
     if daemon_mode:
+        import subprocess
+
         try:
             # Start as background daemon
             proc = subprocess.Popen(
@@ -75,6 +91,9 @@ def start_monitor() -> None:
             sys.exit(1)
     else:
         # Run in foreground
+        from claude_fallback.config import Config
+        from claude_fallback.monitor import LogMonitor
+
         try:
             config = Config.load()
         except FileNotFoundError as e:
@@ -88,9 +107,6 @@ def start_monitor() -> None:
             print(f"Configuration error: {e}")
             sys.exit(1)
 
-        # Import here to avoid circular import issues
-        from claude_fallback.monitor import LogMonitor
-
         monitor = LogMonitor(config)
         try:
             monitor.start()
@@ -98,8 +114,31 @@ def start_monitor() -> None:
             pass  # Signal handler in monitor takes care of cleanup
 
 
+def _control(command: str, timeout: float = 2.0) -> Any:
+    """Send a command to the running monitor; returns None if it can't be reached."""
+    from claude_fallback.control import ControlError, request
+
+    try:
+        return request(command, timeout=timeout)
+    except ControlError:
+        return None
+
+
 def stop_monitor() -> None:
     """Stop the background monitor."""
+    import signal
+
+    from claude_fallback.pidfile import PID_FILE
+
+    reply = _control("stop", timeout=15)
+    if reply is not None:
+        if reply.get("stopped"):
+            print("Monitor stopped successfully.")
+        else:
+            print("Warning: Monitor is still shutting down...")
+        return
+
+    # No control socket (older monitor or socket unavailable): fall back to the PID file
     if not PID_FILE.exists():
         print("No monitor running (no PID file found)")
         return
@@ -136,24 +175,46 @@ def show_status() -> None:
     """Show current status of monitor and mode."""
     print(f"Claude Code Fallback v{VERSION}\n")
 
-    # Check monitor status
-    if is_already_running():
-        with open(PID_FILE, "r") as f:
-            pid = f.read().strip()
-        print(f"Monitor:  Running (PID: {pid})")
+    from claude_fallback.pidfile import is_already_running, read_pid
+    from claude_fallback.state import State
+
+    live = _control("status")
+    if live is not None:
+        uptime = int(live["uptime"])
+        print(
+            f"Monitor:  Running (PID: {live['pid']}, up {uptime // 3600}h"
+            f"{uptime % 3600 // 60:02d}m, {live['watcher']} watcher)"
+        )
+        mode, limit_detected = live["mode"], live["limit_detected"]
+        limit_detected_at = live["limit_detected_at"]
     else:
-        print("Monitor:  Not running")
-
-    # Check current mode from state
-    state = State.load()
-    print(f"Mode:     {state.mode.capitalize()}")
-
-    if state.limit_detected:
-        print(f"Status:   Limit detected at {state.limit_detected_at}")
+        # Monitor not reachable over its socket: fall back to the PID file and state on disk
+        if is_already_running():
+            print(f"Monitor:  Running (PID: {read_pid()})")
+        elif _fleet_pid() is not None:
+            print(f"Monitor:  Running (fleet monitor, PID: {_fleet_pid()})")
+        else:
+            print("Monitor:  Not running")
+        state = State.load()
+        mode, limit_detected = state.mode, state.limit_detected
+        limit_detected_at = state.limit_detected_at
+
+    print(f"Mode:     {mode.capitalize()}")
+
+    if limit_detected:
+        print(f"Status:   Limit detected at {limit_detected_at}")
         print("\n  Run 'claude-api' to switch to API billing")
     else:
         print("Status:   OK")
 
+    if live is not None and live["sessions"]:
+        print(f"\nSessions: {len(live['sessions'])} tracked")
+        for session in live["sessions"]:
+            flag = "  (limit notified)" if session["notified"] else ""
+            print(f"  {Path(session['path']).name}  {session['offset']} bytes read{flag}")
+
+    _print_latency(_control("stats") if live is not None else None)
+
     # Show environment
     if os.environ.get("ANTHROPIC_API_KEY"):
         print("\nEnvironment: ANTHROPIC_API_KEY is set (API mode active)")
@@ -163,13 +224,330 @@ def show_status() -> None:
         print("\nEnvironment: No API key in environment")
 
 
+def _fleet_pid() -> Optional[int]:
+    """PID of a fleet monitor watching our home, from the stats file it keeps here."""
+    from claude_fallback.metrics import load_stats
+
+    stats = load_stats()
+    if not stats or not stats.get("fleet"):
+        return None
+    pid = stats.get("pid")
+    if not isinstance(pid, int):
+        return None
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        pass  # Alive, but running as another user
+    except OSError:
+        return None
+    return pid
+
+
+def _print_latency(stats: Optional[Dict[str, Any]] = None) -> None:
+    """Print detection latency percentiles, from the stats file unless given live stats."""
+    if stats is None:
+        from claude_fallback.metrics import load_stats
+
+        stats = load_stats()
+    if not stats or not stats.get("detections"):
+        return
+
+    watcher = f" (watcher: {stats['watcher']})" if "watcher" in stats else ""
+    print(f"\nDetections: {stats['detections']}{watcher}")
+    print(f"Latency:  {'':<18}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, summary in stats.get("latency", {}).items():
+        if not summary.get("count"):
+            continue
+        values = "".join(f"{summary[p]:>9.3f}s" for p in ("p50", "p95", "p99"))
+        print(f"  {stage:<26}{values}")
+
+
 def clear_state() -> None:
     """Clear the limit detected state."""
-    state = State.load()
-    state.clear_limit()
+    from claude_fallback.state import State
+
+    if _control("clear") is not None:
+        print("Limit state cleared.")
+        return
+
+    with State.transaction() as state:
+        state.clear_limit()
     print("Limit state cleared.")
 
 
+def reload_config() -> None:
+    """Ask the running monitor to re-read its configuration."""
+    try:
+        from claude_fallback.control import ControlError, request
+
+        reply = request("reload")
+    except ControlError as e:
+        print(f"Could not reload: {e}")
+        sys.exit(1)
+
+    print("Configuration reloaded.")
+    if reply["restart_required"]:
+        print(f"Restart the monitor to apply: {', '.join(reply['restart_required'])}")
+
+
+def show_stats() -> None:
+    """Print the running monitor's live counters."""
+    stats = _control("stats")
+    if stats is None:
+        print("Monitor not running (or not reachable over its control socket)")
+        sys.exit(1)
+
+    if "--json" in sys.argv:
+        import json
+
+        print(json.dumps(stats, indent=2))
+        return
+
+    print(f"Lines read:       {stats['lines_read']:.0f}")
+    print(f"Bytes read:       {stats['bytes_read']:.0f}")
+    print(f"Decode failures:  {stats['decode_failures']:.0f}")
+    print(f"Files tracked:    {stats['files_tracked']:.0f}")
+    print(f"Ticks:            {stats['ticks']}")
+    print(f"Wakeups/hour:     {stats['wakeups_per_hour']:.0f}")
+    if stats["poll_interval"] is not None:
+        print(f"Poll interval:    {stats['poll_interval']:.2f}s")
+    notifications = stats["notifications"]
+    print(
+        f"Notifications:    {notifications['delivered']} delivered, "
+        f"{notifications['coalesced']} coalesced, {notifications['dropped']} dropped"
+    )
+    for reason, count in stats["detections_by_reason"].items():
+        print(f"Detections ({reason}): {count:.0f}")
+    print(
+        f"Detections skipped: {stats['duplicate_detections']:.0f} already handled, "
+        f"{stats['coalesced_detections']:.0f} coalesced"
+    )
+    for outcome, count in stats["auto_restarts"].items():
+        print(f"Auto-restarts ({outcome}): {count:.0f}")
+    if stats.get("rss") is not None:
+        print(
+            f"Memory (RSS):     {stats['rss'] / MIB:.1f} MiB, "
+            f"caches shed {stats['memory_sheds']:.0f} time(s)"
+        )
+    _print_latency(stats)
+
+
+def show_memory() -> None:
+    """Report the running monitor's memory use and take a tracemalloc snapshot."""
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="claude-fallback memory")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites to list")
+    parser.add_argument("--stop", action="store_true", help="Stop tracing allocations")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(sys.argv[2:])
+
+    try:
+        from claude_fallback.control import ControlError, request
+
+        # Snapshots of a large heap take a while to write
+        reply = request("memory", timeout=60, top=args.top, stop=args.stop)
+    except ControlError as e:
+        print(f"Could not reach the monitor: {e}")
+        sys.exit(1)
+
+    if args.json:
+        import json
+
+        print(json.dumps(reply, indent=2))
+        return
+
+    if reply["rss"] is not None:
+        budget = reply["max_rss"] / MIB
+        print(
+            f"Memory (RSS): {reply['rss'] / MIB:.1f} MiB"
+            + (f" of a {budget:.0f} MiB budget" if budget else "")
+            + f", caches shed {reply['sheds']:.0f} time(s)"
+        )
+    if reply.get("stopped"):
+        print("Allocation tracing stopped.")
+    elif reply["started"]:
+        print("Allocation tracing started. Run 'claude-fallback memory' again for a snapshot.")
+    else:
+        print(
+            f"Traced: {reply['traced'] / MIB:.1f} MiB "
+            f"(peak {reply['peak'] / MIB:.1f} MiB), snapshot in {reply['path']}"
+        )
+        print(f"{'change':>12} {'size':>12} {'blocks':>8}  allocated at")
+        for site in reply["top"]:
+            print(
+                f"{site['size_diff'] / 1024:>+9.1f} KiB {site['size'] / 1024:>8.1f} KiB "
+                f"{site['count']:>8}  {site['where']}"
+            )
+
+
+def scan_history() -> None:
+    """Scan existing session logs for past usage limit events."""
+    import argparse
+    import json
+
+    from claude_fallback.scan import scan_logs
+    from claude_fallback.timeutil import parse_since
+
+    parser = argparse.ArgumentParser(
+        prog="claude-fallback scan",
+        description="Report when, where and why usage limits were hit in past sessions.",
+    )
+    parser.add_argument("--since", help="Only events after this time (e.g. 7d, 12h, 2025-01-31)")
+    parser.add_argument("--project", help="Only projects whose directory name contains this")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per line")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--rules", help="Detection rules file (default: built-in rules)")
+    args = parser.parse_args(sys.argv[2:])
+
+    since = None
+    if args.since:
+        try:
+            since = parse_since(args.since)
+        except ValueError:
+            print(f"Invalid --since value: {args.since}")
+            sys.exit(1)
+
+    rules_file = None
+    if args.rules:
+        from claude_fallback.rules import load_rules
+
+        rules_file = os.path.expanduser(args.rules)
+        try:
+            load_rules(rules_file)
+        except (OSError, ValueError) as e:
+            print(f"Invalid rules file: {e}")
+            sys.exit(1)
+
+    base_path = Path.home() / ".claude" / "projects"
+    count = 0
+    hits = scan_logs(
+        base_path, project=args.project, since=since, workers=args.workers, rules_file=rules_file
+    )
+    for hit in hits:
+        count += 1
+        if args.json:
+            print(json.dumps(hit), flush=True)
+            continue
+        log = Path(hit["file"])
+        project = log.relative_to(base_path).parts[0]
+        when = hit["timestamp"] or "unknown time"
+        print(f"{when}  {project}  {log.stem}  {hit['reason']}: {hit['details']}", flush=True)
+
+    if not args.json:
+        print(f"\n{count} usage limit event(s) found")
+
+
+def show_history() -> None:
+    """Print past detections, mode switches, restarts and errors from the event journal."""
+    import argparse
+    import json
+    from datetime import datetime
+
+    from claude_fallback.journal import KINDS, Journal
+    from claude_fallback.timeutil import parse_since
+
+    parser = argparse.ArgumentParser(
+        prog="claude-fallback history",
+        description="Show what the monitor and the shell functions did, from the event journal.",
+    )
+    parser.add_argument("--since", help="Only events after this time (e.g. 7d, 12h, 2025-01-31)")
+    parser.add_argument("--until", help="Only events before this time (same formats)")
+    parser.add_argument(
+        "--kind", action="append", choices=KINDS, help="Only events of this kind, repeatable"
+    )
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per line")
+    args = parser.parse_args(sys.argv[2:])
+
+    bounds = []
+    for name, value in (("--since", args.since), ("--until", args.until)):
+        try:
+            bounds.append(parse_since(value) if value else None)
+        except ValueError:
+            print(f"Invalid {name} value: {value}")
+            sys.exit(1)
+
+    count = 0
+    for event in Journal().read(since=bounds[0], until=bounds[1], kinds=args.kind):
+        count += 1
+        if args.json:
+            print(json.dumps(event), flush=True)
+            continue
+        when = datetime.fromtimestamp(event["t"]).isoformat(sep=" ", timespec="seconds")
+        print(f"{when}  {event.get('k', '?'):<9}  {_describe_event(event)}", flush=True)
+
+    if not args.json:
+        print(f"\n{count} event(s)")
+
+
+def _describe_event(event: Dict[str, Any]) -> str:
+    """One-line summary of a journal event."""
+    kind = event.get("k")
+    if kind == "detection":
+        return (
+            f"{event.get('session')}  {event.get('reason')}: {event.get('details')} "
+            f"({event.get('action')})"
+        )
+    if kind == "restart":
+        pid = f" (PID {event['pid']})" if event.get("pid") else ""
+        downtime = ""
+        if event.get("downtime") is not None:
+            killed = ", killed" if event.get("killed") else ""
+            downtime = f" down {event['downtime']:.2f}s{killed}"
+        error = f": {event['error']}" if event.get("error") else ""
+        return f"{event.get('session')}  {event.get('outcome')}{pid}{downtime}{error}"
+    if kind == "switch":
+        return f"{event.get('previous')} -> {event.get('mode')}"
+    if kind == "error":
+        return str(event.get("message"))
+    return ""
+
+
+def run_fleet() -> None:
+    """Watch many users' home directories from one process (usually run as root)."""
+    import argparse
+
+    from claude_fallback.fleet import (
+        DEFAULT_HOMES,
+        FLEET_CONFIG,
+        REDISCOVER_INTERVAL,
+        FleetMonitor,
+        load_fleet_settings,
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="claude-fallback fleet",
+        description="Monitor the Claude Code sessions of every user on this machine.",
+    )
+    parser.add_argument(
+        "--homes",
+        action="append",
+        metavar="PATTERN",
+        help="Home directory glob, repeatable (default: /home/* and /Users/*)",
+    )
+    parser.add_argument("--workers", type=int, help="Worker threads (default: 4)")
+    parser.add_argument("--watcher", choices=("auto", "inotify", "polling"))
+    parser.add_argument("--config", default=str(FLEET_CONFIG), help="Fleet settings file")
+    args = parser.parse_args(sys.argv[2:])
+
+    try:
+        settings = load_fleet_settings(Path(args.config))
+    except (OSError, ValueError) as e:
+        print(f"Configuration error: {e}")
+        sys.exit(1)
+
+    fleet = FleetMonitor(
+        patterns=args.homes or settings.get("homes", DEFAULT_HOMES),
+        workers=args.workers or settings.get("workers", 4),
+        watcher=args.watcher or settings.get("watcher", "auto"),
+        rediscover_interval=settings.get("rediscover_interval", REDISCOVER_INTERVAL),
+        poll_min_interval=settings.get("poll_min_interval", 0.5),
+        poll_max_interval=settings.get("poll_max_interval", 30.0),
+        poll_jitter=settings.get("poll_jitter", 0.1),
+    )
+    fleet.run()
+
+
 def show_version() -> None:
     """Print the version number."""
     print(f"Claude Code Fallback v{VERSION}")
@@ -191,6 +569,17 @@ Commands:
   stop        Stop the background monitor
   status      Show current status
   clear       Clear limit detected state
+  reload      Make the running monitor re-read its configuration
+  stats       Show the running monitor's live counters [--json]
+  memory      Show the running monitor's memory use; the first run starts
+              allocation tracing, later ones write a tracemalloc snapshot
+              [--top N] [--stop] [--json]
+  scan        Scan past session logs for usage limit events
+              [--since 7d] [--project NAME] [--json] [--workers N] [--rules FILE]
+  history     Show past detections, mode switches, restarts and errors
+              [--since 7d] [--until 1d] [--kind KIND ...] [--json]
+  fleet       Monitor every user's sessions from one process (as root)
+              [--homes PATTERN ...] [--workers N] [--watcher BACKEND]
   version     Show version
   help        Show this help
 
@@ -227,6 +616,12 @@ def main() -> None:
         "stop": stop_monitor,
         "status": show_status,
         "clear": clear_state,
+        "reload": reload_config,
+        "stats": show_stats,
+        "memory": show_memory,
+        "scan": scan_history,
+        "history": show_history,
+        "fleet": run_fleet,
         "version": show_version,
         "v": show_version,
         "help": show_help,
@@ -1,9 +1,28 @@
 """Configuration management for Claude Code Fallback."""
 
-import json
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Mapping, Optional
+
+from claude_fallback.fileutil import read_json
+from claude_fallback.jsonutil import BACKENDS as JSON_BACKENDS
+
+
+def _option(
+    data: Dict[str, Any],
+    key: str,
+    default: Any,
+    cast: Callable[[Any], Any],
+    environ: Mapping[str, str],
+) -> Any:
+    """Read an optional setting from the environment or config.json data."""
+    raw = environ.get(f"CLAUDE_FALLBACK_{key.upper()}")
+    if raw is None:
+        raw = data.get(key, default)
+    try:
+        return cast(raw)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid value for {key}: {raw!r}") from None
 
 
 class Config:
@@ -11,12 +30,58 @@ class Config:
 
     ENV_VAR_NAME = "CLAUDE_FALLBACK_API_KEY"
 
-    def __init__(self, api_key: str, auto_restart: bool = False):
+    WATCHER_BACKENDS = ("auto", "inotify", "polling")
+
+    def __init__(
+        self,
+        api_key: str,
+        auto_restart: bool = False,
+        watcher: str = "auto",
+        active_window: float = 1800,
+        max_open_logs: int = 32,
+        max_resume_bytes: int = 8 * 1024 * 1024,
+        max_line_bytes: int = 4 * 1024 * 1024,
+        max_decode_bytes: int = 256 * 1024,
+        metrics_port: int = 0,
+        notify_timeout: float = 5.0,
+        poll_min_interval: float = 0.5,
+        poll_max_interval: float = 30.0,
+        poll_jitter: float = 0.1,
+        rules_file: str = "",
+        json_backend: str = "auto",
+        coalesce_window: float = 30.0,
+        restart_interval: float = 300.0,
+        restart_timeout: float = 10.0,
+        max_rss_mb: float = 256.0,
+    ):
         self.api_key = api_key
         self.auto_restart = auto_restart
+        self.watcher = watcher
+        self.active_window = active_window
+        self.max_open_logs = max_open_logs
+        self.max_resume_bytes = max_resume_bytes
+        self.max_line_bytes = max_line_bytes
+        self.max_decode_bytes = max_decode_bytes
+        self.metrics_port = metrics_port
+        self.notify_timeout = notify_timeout
+        self.poll_min_interval = poll_min_interval
+        self.poll_max_interval = poll_max_interval
+        self.poll_jitter = poll_jitter
+        self.rules_file = rules_file
+        self.json_backend = json_backend
+        self.coalesce_window = coalesce_window
+        self.restart_interval = restart_interval
+        self.restart_timeout = restart_timeout
+        self.max_rss_mb = max_rss_mb
 
     @classmethod
-    def load(cls, config_path: Optional[str] = None) -> "Config":
+    def load(
+        cls,
+        config_path: Optional[str] = None,
+        environ: Optional[Mapping[str, str]] = None,
+        owner_uid: Optional[int] = None,
+        require_api_key: bool = True,
+    ) -> "Config":
         """
         Load configuration from environment variable or JSON file.
 
@@ -27,41 +92,118 @@ class Config:
         auto_restart can be set via:
         - CLAUDE_FALLBACK_AUTO_RESTART=1 environment variable
         - "auto_restart": true in config.json
+
+        Other optional settings are read from a CLAUDE_FALLBACK_<NAME>
+        environment variable or a "<name>" key in config.json, the
+        environment taking precedence:
+        - watcher: "auto", "inotify" or "polling"
+        - active_window: seconds a session stays tracked after its last write
+        - max_open_logs: maximum number of session logs kept open at once
+        - max_resume_bytes: how far back to catch up on a log after a restart
+        - max_line_bytes: longest log line buffered; longer lines are skipped
+        - max_decode_bytes: longer lines only have the fields the rules read
+          extracted (see claude_fallback.extract)
+        - metrics_port: serve Prometheus metrics on this localhost port (0 = off)
+        - notify_timeout: seconds to wait for a desktop notification to be delivered
+        - poll_min_interval / poll_max_interval: range of the polling watcher's
+          interval, which backs off while idle and snaps back on activity
+        - poll_jitter: random variation of each poll interval (fraction)
+        - rules_file: JSON file of detection rules (see claude_fallback.rules)
+        - json_backend: "auto", "orjson", "msgspec" or "json" (see claude_fallback.jsonutil)
+        - coalesce_window: seconds after a switch during which further detections
+          are coalesced into it (see claude_fallback.actions)
+        - restart_interval: minimum seconds between auto-restarts of one session
+        - restart_timeout: seconds an auto-restarted Claude gets to exit before SIGKILL
+        - max_rss_mb: resident memory above which the monitor sheds its caches (0: no limit)
+
+        Args:
+            config_path: JSON config file (defaults to config.json in the project root)
+            environ: Environment to read settings from (defaults to os.environ;
+                fleet mode passes {} so the daemon's environment never leaks
+                into a user's configuration)
+            owner_uid: Only read config_path if it is a regular file owned by
+                this user (not a symlink)
+            require_api_key: If False, a missing API key is allowed and
+                disables auto_restart (notify-only)
+
+        Raises:
+            FileNotFoundError: If no API key is configured anywhere
+            ValueError: If the configuration is invalid
         """
-        auto_restart = os.environ.get("CLAUDE_FALLBACK_AUTO_RESTART", "").lower() in (
+        if environ is None:
+            environ = os.environ
+        auto_restart = environ.get("CLAUDE_FALLBACK_AUTO_RESTART", "").lower() in (
             "1",
             "true",
             "yes",
         )
 
-        # First, try environment variable for API key
-        api_key = os.environ.get(cls.ENV_VAR_NAME)
-        if api_key:
-            return cls(api_key=api_key, auto_restart=auto_restart)
-
-        # Fall back to config.json
         if config_path is None:
             config_path = Path(__file__).parent.parent.parent / "config.json"
 
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(
-                f"API key not found. Either:\n"
-                f"  1. Set {cls.ENV_VAR_NAME} environment variable, or\n"
-                f"  2. Create config.json with your API key"
-            )
-
-        with open(config_path, "r") as f:
-            data = json.load(f)
+        # Optional settings are read from config.json even when the API key
+        # comes from the environment
+        data: Dict[str, Any] = {}
+        config_exists = os.path.exists(config_path)
+        if config_exists:
+            data = read_json(config_path, owner_uid)
 
-        api_key = data.get("api_key", "")
+        # First, try environment variable for API key
+        api_key = environ.get(cls.ENV_VAR_NAME)
         if not api_key:
-            raise ValueError("No api_key found in config.json")
+            # Fall back to config.json
+            if not config_exists and require_api_key:
+                raise FileNotFoundError(
+                    f"API key not found. Either:\n"
+                    f"  1. Set {cls.ENV_VAR_NAME} environment variable, or\n"
+                    f"  2. Create config.json with your API key"
+                )
+
+            api_key = data.get("api_key", "")
+            if not api_key and require_api_key:
+                raise ValueError("No api_key found in config.json")
 
         # Config file can also set auto_restart
         if not auto_restart:
             auto_restart = data.get("auto_restart", False)
+        if not api_key:
+            auto_restart = False  # Nothing to restart with
+
+        watcher = _option(data, "watcher", "auto", str, environ)
+        if watcher not in cls.WATCHER_BACKENDS:
+            raise ValueError(
+                f"Invalid watcher '{watcher}'. Expected one of: "
+                f"{', '.join(cls.WATCHER_BACKENDS)}"
+            )
 
-        return cls(api_key=api_key, auto_restart=auto_restart)
+        json_backend = _option(data, "json_backend", "auto", str, environ)
+        if json_backend not in JSON_BACKENDS:
+            raise ValueError(
+                f"Invalid json_backend '{json_backend}'. Expected one of: "
+                f"{', '.join(JSON_BACKENDS)}"
+            )
+
+        return cls(
+            api_key=api_key,
+            auto_restart=auto_restart,
+            watcher=watcher,
+            active_window=_option(data, "active_window", 1800, float, environ),
+            max_open_logs=_option(data, "max_open_logs", 32, int, environ),
+            max_resume_bytes=_option(data, "max_resume_bytes", 8 * 1024 * 1024, int, environ),
+            max_line_bytes=_option(data, "max_line_bytes", 4 * 1024 * 1024, int, environ),
+            max_decode_bytes=_option(data, "max_decode_bytes", 256 * 1024, int, environ),
+            metrics_port=_option(data, "metrics_port", 0, int, environ),
+            notify_timeout=_option(data, "notify_timeout", 5.0, float, environ),
+            poll_min_interval=_option(data, "poll_min_interval", 0.5, float, environ),
+            poll_max_interval=_option(data, "poll_max_interval", 30.0, float, environ),
+            poll_jitter=_option(data, "poll_jitter", 0.1, float, environ),
+            rules_file=_option(data, "rules_file", "", str, environ),
+            json_backend=json_backend,
+            coalesce_window=_option(data, "coalesce_window", 30.0, float, environ),
+            restart_interval=_option(data, "restart_interval", 300.0, float, environ),
+            restart_timeout=_option(data, "restart_timeout", 10.0, float, environ),
+            max_rss_mb=_option(data, "max_rss_mb", 256.0, float, environ),
+        )
 
     def validate(self) -> bool:
         """Validate configuration settings."""
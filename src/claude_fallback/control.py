@@ -0,0 +1,183 @@
+"""Unix domain socket control plane for the running monitor.
+
+Messages are JSON objects framed by a 4-byte big-endian length prefix. A
+client sends one request, {"command": name, ...arguments}, and receives
+one reply, {"ok": true, "result": ...} or {"ok": false, "error": message}.
+"""
+
+import json
+import os
+import socket
+import struct
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+SOCKET_PATH = Path.home() / ".claude_fallback.sock"
+
+# Upper bound on a single message, to keep a bad peer from exhausting memory
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+# Seconds a connected client has to send its request
+REQUEST_TIMEOUT = 5.0
+
+_HEADER = struct.Struct(">I")
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+
+class ControlError(Exception):
+    """Raised when a control request fails or the monitor can't be reached."""
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any]) -> None:
+    """Send one length-prefixed JSON message."""
+    data = json.dumps(message, separators=(",", ":")).encode()
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ControlError("Connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Dict[str, Any]:
+    """
+    Receive one length-prefixed JSON message.
+
+    Raises:
+        ControlError: If the peer disconnects or sends a malformed message
+    """
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_MESSAGE_SIZE:
+        raise ControlError(f"Message too large ({size} bytes)")
+    try:
+        message = json.loads(_recv_exact(sock, size))
+    except ValueError as e:
+        raise ControlError(f"Malformed message: {e}") from None
+    if not isinstance(message, dict):
+        raise ControlError("Malformed message: expected a JSON object")
+    return message
+
+
+def request(
+    command: str, timeout: float = 2.0, path: Path = SOCKET_PATH, **arguments: Any
+) -> Any:
+    """
+    Send a command to the running monitor and return its result.
+
+    Args:
+        command: Command name (status, stop, clear, reload, stats)
+        timeout: Seconds to wait for the connection and the reply
+        path: Control socket location
+        **arguments: Extra request fields
+
+    Raises:
+        ControlError: If no monitor is listening or the command failed
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(str(path))
+            send_message(sock, dict(arguments, command=command))
+            reply = recv_message(sock)
+        except OSError as e:
+            raise ControlError(f"Monitor not reachable at {path}: {e}") from None
+    finally:
+        sock.close()
+
+    if not reply.get("ok"):
+        raise ControlError(reply.get("error", "Unknown error"))
+    return reply.get("result")
+
+
+class ControlServer:
+    """Answers control requests on a Unix socket from a background thread."""
+
+    def __init__(self, handlers: Dict[str, Handler], path: Path = SOCKET_PATH):
+        """
+        Bind the control socket.
+
+        A stale socket left behind by a crashed monitor is replaced. The
+        socket is only accessible to the current user.
+
+        Args:
+            handlers: Command name -> callable taking the request and
+                returning a JSON-serializable result
+            path: Socket location
+
+        Raises:
+            ControlError: If another monitor is already listening on path
+        """
+        import socketserver  # Deferred: only the monitor needs it
+
+        self.path = path
+        handlers_ref = handlers
+
+        class RequestHandler(socketserver.BaseRequestHandler):
+            def handle(self) -> None:
+                self.request.settimeout(REQUEST_TIMEOUT)
+                try:
+                    message = recv_message(self.request)
+                except (ControlError, OSError):
+                    return
+                command = message.get("command")
+                handler = handlers_ref.get(command) if isinstance(command, str) else None
+                if handler is None:
+                    reply = {"ok": False, "error": f"Unknown command: {command}"}
+                else:
+                    try:
+                        reply = {"ok": True, "result": handler(message)}
+                    except Exception as e:
+                        reply = {"ok": False, "error": str(e)}
+                try:
+                    send_message(self.request, reply)
+                except OSError:
+                    pass
+
+        self._remove_stale_socket()
+        old_umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(str(path), RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="control-server", daemon=True
+        )
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(self.path))
+        except OSError:
+            os.remove(self.path)  # Nobody listening
+            return
+        finally:
+            probe.close()
+        raise ControlError(f"Another monitor is listening on {self.path}")
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop accepting requests and remove the socket file.
+
+        Waits for requests already being handled, so a client that asked
+        the monitor to stop still gets its reply.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,104 @@
+"""Persistent memory of the events the monitor has already acted on."""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+from claude_fallback.fileutil import Owner, atomic_write
+
+
+def event_key(uuid: Optional[str], line: Union[str, bytes]) -> str:
+    """Key of a log event: its uuid, or a hash of the line for events without one."""
+    if isinstance(uuid, str) and uuid:
+        return uuid
+    if isinstance(line, str):
+        line = line.encode("utf-8", "surrogatepass")
+    return "sha1:" + hashlib.sha1(line).hexdigest()
+
+
+class SeenEvents:
+    """
+    Bounded LRU of event keys, kept across monitor restarts.
+
+    After a restart the monitor re-reads up to max_resume_bytes of each log,
+    and a log can be tailed again after going idle; remembering which
+    events were already handled keeps either from repeating a notification
+    or a restart. Like OffsetCheckpoint, the file is only ever replaced
+    atomically.
+    """
+
+    SEEN_FILE = Path.home() / ".claude_fallback_seen.json"
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_entries: int = 4096,
+        flush_interval: float = 5.0,
+        owner: Optional[Owner] = None,
+    ):
+        """
+        Args:
+            path: File to keep the keys in (defaults to SEEN_FILE)
+            max_entries: Keys remembered; the least recently seen are dropped first
+            flush_interval: Minimum seconds between writes from maybe_flush()
+            owner: (uid, gid) to give the file when writing for another user
+        """
+        self.path = path or self.SEEN_FILE
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.owner = owner
+        self._keys: OrderedDict[str, None] = OrderedDict()
+        self._dirty = False
+        self._last_flush = 0.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def load(self) -> None:
+        """Load the saved keys, oldest first."""
+        try:
+            with open(self.path) as f:
+                keys = json.load(f).get("keys", [])
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return
+        if not isinstance(keys, list):
+            return
+        for key in keys[-self.max_entries :]:
+            if isinstance(key, str):
+                self._keys[key] = None
+
+    def add(self, key: str) -> bool:
+        """
+        Remember a key.
+
+        Returns:
+            True if it is new, False if it was already seen
+        """
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_entries:
+            self._keys.popitem(last=False)
+        self._dirty = True
+        return True
+
+    def maybe_flush(self) -> None:
+        """Flush if there are new keys and flush_interval has passed."""
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Atomically write the keys to disk if any were added."""
+        if not self._dirty:
+            return
+        data = {"version": 1, "keys": list(self._keys)}
+        atomic_write(self.path, json.dumps(data, separators=(",", ":")), self.owner)
+        self._dirty = False
+        self._last_flush = time.monotonic()
@@ -1,84 +1,239 @@
 """Pattern detection for usage limits in Claude Code JSONL logs."""
 
-import json
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Sequence, Set, Tuple, Union
+
+from claude_fallback.extract import FieldExtractor
+from claude_fallback.jsonutil import get_backend
+from claude_fallback.rules import Path_, Rule, RuleSet
+
+# Shortest anchor used by the prefilter; shorter anchors match too often
+ANCHOR_LENGTH = 5
+
+# Beyond this many substring scans per line, decoding every line is cheaper
+MAX_ANCHORS = 8
+MAX_CONFIRM_TOKENS = 16
+
+# Fields reported with every detection, besides those the rules read
+ENVELOPE_PATHS: List[Path_] = [("timestamp",), ("uuid",)]
+
+
+def _cover_anchors(tokens: List[str], limit: int) -> Optional[List[str]]:
+    """
+    Pick a small set of substrings such that every token contains one.
+
+    Greedy set cover over fixed-length substrings, e.g. "usage limit",
+    "rate limit" and "rate_limit" all share the anchor "limit". Ties prefer
+    substrings spanning a word boundary, since plain words like "usage" are
+    also common JSON keys. Returns None if more than limit anchors would
+    be needed.
+    """
+    covers: Dict[str, Set[str]] = {}
+    for token in tokens:
+        length = min(ANCHOR_LENGTH, len(token))
+        for i in range(len(token) - length + 1):
+            covers.setdefault(token[i : i + length], set()).add(token)
+
+    remaining = set(tokens)
+    anchors: List[str] = []
+    while remaining:
+        if len(anchors) == limit:
+            return None
+        best = min(
+            covers, key=lambda c: (-len(covers[c] & remaining), c.isalpha(), c)
+        )
+        anchors.append(best)
+        remaining -= covers.pop(best)
+    return anchors
+
+
+class Detection:
+    """A log event that matched a detection rule (immutable and hashable)."""
+
+    __slots__ = ("reason", "details", "action", "timestamp", "uuid")
+
+    reason: str
+    details: str
+    action: str
+    timestamp: Optional[str]
+    uuid: Optional[str]
+
+    def __init__(
+        self,
+        reason: str,
+        details: str,
+        action: str = "switch",
+        timestamp: Optional[str] = None,
+        uuid: Optional[str] = None,
+    ):
+        """
+        Args:
+            reason: Name of the rule that matched
+            details: Human-readable description for notifications
+            action: What the rule asks for: "switch" or "notify"
+            timestamp: The event's own ISO timestamp, if it had one
+            uuid: The event's uuid, if it had one
+        """
+        # A frozen dataclass can't have both __slots__ and defaults before 3.10
+        set_slot = object.__setattr__
+        set_slot(self, "reason", reason)
+        set_slot(self, "details", details)
+        set_slot(self, "action", action)
+        set_slot(self, "timestamp", timestamp)
+        set_slot(self, "uuid", uuid)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Detection is immutable: can't set {name!r}")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Detection is immutable: can't delete {name!r}")
+
+    def _fields(self) -> Tuple[Optional[str], ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Detection):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self) -> int:
+        return hash(self._fields())
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Copies and pickles go through __init__, not the blocked __setattr__
+        return (Detection, self._fields())
+
+    def __repr__(self) -> str:
+        return (
+            f"Detection(reason={self.reason!r}, details={self.details!r}, "
+            f"action={self.action!r})"
+        )
+
+
+def parse_event_time(timestamp: Any) -> Optional[float]:
+    """Convert an event's ISO timestamp ("2025-01-31T09:00:00.000Z") to Unix time."""
+    if not isinstance(timestamp, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
 
 
 class UsageLimitDetector:
     """Detects usage limit errors in JSONL log events."""
 
-    def __init__(self):
-        """Initialize the detector with known patterns."""
-        self.error_patterns = [
-            "usage limit",
-            "rate limit",
-            "usage resets",
-            "overloaded_error",
-            "rate_limit_error",
-        ]
-
-    def check_event(self, line: str) -> Optional[Dict[str, Any]]:
+    def __init__(
+        self,
+        rules: Optional[Sequence[Rule]] = None,
+        json_backend: str = "auto",
+        max_decode_bytes: int = 256 * 1024,
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            rules: Detection rules in priority order (defaults to the
+                built-in rules, see claude_fallback.rules)
+            json_backend: JSON decoder to use (see claude_fallback.jsonutil)
+            max_decode_bytes: Lines longer than this aren't decoded in full;
+                only the fields the rules read are extracted (see
+                claude_fallback.extract)
+
+        Raises:
+            ValueError: If json_backend is unknown
+            ImportError: If json_backend names a package that isn't installed
+        """
+        self.rules = RuleSet(rules)
+        self.json_backend = get_backend(json_backend)
+        self._loads = self.json_backend.loads
+        self.max_decode_bytes = max_decode_bytes
+        self.extractor = FieldExtractor(self.rules.paths() + ENVELOPE_PATHS)
+        self.decode_failures = 0
+        self._compile_prefilter()
+
+    def _compile_prefilter(self) -> None:
+        """
+        Build the matcher used to reject lines before JSON decoding.
+
+        Every rule needs one of its substrings or values somewhere in the
+        raw line (RuleSet.tokens). Matching is done on the lowercased line
+        because the rules compare lowercased text.
+
+        The tokens are reduced to a few short anchors that together cover all
+        of them, so the common case (no anchor present) costs one lowercase
+        pass plus a handful of C-level substring scans. Lines with an anchor
+        are then checked for a full token, if there are few enough tokens
+        for that to beat decoding the line.
+
+        Each scan of a typical line costs about a tenth of decoding it, so
+        if the rules admit no tokens, or need more than MAX_ANCHORS anchors
+        (e.g. hundreds of unrelated patterns), the prefilter is disabled and
+        every line is decoded; RuleSet keeps the matching itself cheap.
+        """
+        tokens = self.rules.tokens()
+        anchors = None if tokens is None else _cover_anchors(tokens, MAX_ANCHORS)
+        self._prefilter = anchors is not None
+        self._anchors = tuple(a.encode() for a in anchors or ())
+        self._tokens: Tuple[bytes, ...] = ()
+        if tokens is not None and len(tokens) <= MAX_CONFIRM_TOKENS:
+            self._tokens = tuple(t.encode() for t in tokens)
+
+    def might_match(self, line: Union[str, bytes]) -> bool:
+        """Cheaply check whether a raw line could possibly be a detection."""
+        if not self._prefilter:
+            return True
+        if isinstance(line, str):
+            # bytes.lower() is ASCII-only and several times faster than
+            # str.lower() on non-ASCII text; see rules._prefilter_token.
+            line = line.encode("utf-8", "surrogatepass")
+
+        lowered = line.lower()
+        for anchor in self._anchors:
+            if anchor in lowered:
+                break
+        else:
+            return False
+        if not self._tokens:
+            return True
+        for token in self._tokens:
+            if token in lowered:
+                return True
+        return False
+
+    def check_event(self, line: Union[str, bytes]) -> Optional[Detection]:
         """
         Check a JSONL log line for usage limit indicators.
 
         Args:
-            line: A single line from the JSONL log file
+            line: A single line from the JSONL log file, as text or raw bytes
 
         Returns:
-            Dict with detection info if limit found, None otherwise
+            The detection if a rule matched, None otherwise
         """
+        if not self.might_match(line):
+            return None
         try:
-            event = json.loads(line)
-        except json.JSONDecodeError:
+            if len(line) > self.max_decode_bytes:
+                event = self.extractor.extract(line)
+            else:
+                event = self._loads(line)
+        except ValueError:
+            self.decode_failures += 1
             return None
 
-        # Check for explicit error type
-        if event.get("type") == "error":
-            error = event.get("error", {})
-            if self._is_rate_limit_error(error):
-                return {
-                    "detected": True,
-                    "reason": "error_type",
-                    "details": error.get("message", "Rate limit error")
-                }
-
-        # Check assistant message content
-        if event.get("type") == "assistant":
-            message = event.get("message", {})
-            content = message.get("content", [])
-
-            if self._contains_limit_message(content):
-                return {
-                    "detected": True,
-                    "reason": "message_content",
-                    "details": "Usage limit mentioned in response"
-                }
-
-        # Check stop reason
-        message = event.get("message", {})
-        stop_reason = message.get("stop_reason")
-        if stop_reason in ["rate_limit", "overloaded"]:
-            return {
-                "detected": True,
-                "reason": "stop_reason",
-                "details": f"Stop reason: {stop_reason}"
-            }
-
-        return None
-
-    def _is_rate_limit_error(self, error: Dict[str, Any]) -> bool:
-        """Check if error object indicates rate limiting."""
-        error_type = error.get("type", "").lower()
-        error_msg = error.get("message", "").lower()
-
-        return any(pattern in error_type or pattern in error_msg
-                   for pattern in self.error_patterns)
-
-    def _contains_limit_message(self, content: list) -> bool:
-        """Check if message content mentions usage limits."""
-        for item in content:
-            if item.get("type") == "text":
-                text = item.get("text", "").lower()
-                if any(pattern in text for pattern in self.error_patterns):
-                    return True
-        return False
+        match = self.rules.match(event)
+        if match is None:
+            return None
+        rule, value = match
+        envelope = event if isinstance(event, dict) else {}
+        return Detection(
+            rule.name,
+            rule.render_details(event, value),
+            rule.action,
+            envelope.get("timestamp"),
+            envelope.get("uuid"),
+        )
@@ -0,0 +1,203 @@
+"""Selective decoding of the few fields detection needs from huge log lines.
+
+A session log line can hold megabytes of tool output, while the rules only
+read a handful of short fields. FieldExtractor walks the raw JSON and
+builds a pruned event holding only the wanted paths, stepping over
+everything else by searching for quotes and brackets instead of decoding
+it. The pruned event has the same shape as the full one, so rules resolve
+against it unchanged:
+
+    >>> FieldExtractor([("type",), ("error", "message")]).extract(
+    ...     b'{"type": "error", "output": "...", "error": {"message": "Rate limit"}}'
+    ... )
+    {'type': 'error', 'error': {'message': 'Rate limit'}}
+
+Wanted values are decoded whole, so rules see exactly what a full decode
+would give them, while memory use per event only grows with the fields
+the rules read, not with the tool output around them. Skipping is linear
+in the payload: about as fast as a C decoder, slower on output full of
+escaped quotes (one Python step per quote). Skipped parts are only checked
+for balanced brackets and quotes, not fully validated.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Dict, Iterable, List, Pattern, Tuple, Union
+
+from claude_fallback.rules import Path_, item_filter
+
+# A node of the wanted-paths tree: raw key -> subtree, or TAKE for the whole value
+Tree = Dict[bytes, Any]
+TAKE = True
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_SCALAR = re.compile(rb"[^,}\]\s]*")
+
+_MISSING = object()
+
+
+def _match_end(pattern: Pattern[bytes], line: bytes, pos: int) -> int:
+    """Return where pattern, which also matches the empty string, ends at pos."""
+    match = pattern.match(line, pos)
+    assert match is not None
+    return match.end()
+
+
+class FieldExtractor:
+    """Pulls a fixed set of field paths out of raw JSON lines."""
+
+    def __init__(self, paths: Iterable[Path_]):
+        """
+        Args:
+            paths: Field paths to keep, as parsed by rules.parse_path
+        """
+        self.tree: Tree = {}
+        for path in paths:
+            self._add(path)
+
+    def _add(self, path: Path_) -> None:
+        node = self.tree
+        for i, part in enumerate(path):
+            condition = item_filter(part)
+            if condition is not None:
+                # Keep every item, with the key it is filtered on; resolve()
+                # applies the filter to the pruned event
+                self._add(path[:i] + ("[]", condition[0]))
+                part = "[]"
+            key = part.encode()
+            if i == len(path) - 1:
+                node[key] = TAKE
+                return
+            child = node.get(key)
+            if child is TAKE:
+                return  # A shorter path already takes the whole value
+            if child is None:
+                child = node[key] = {}
+            node = child
+
+    def extract(self, line: Union[str, bytes]) -> Any:
+        """
+        Decode only the wanted fields of a JSON line.
+
+        Returns:
+            A dict shaped like the full event but holding only the wanted
+            paths, or None if the line isn't a JSON object
+
+        Raises:
+            ValueError: If the line is malformed
+        """
+        if isinstance(line, str):
+            line = line.encode("utf-8", "surrogatepass")
+        pos = _match_end(_WHITESPACE, line, 3 if line.startswith(codecs.BOM_UTF8) else 0)
+        if line[pos : pos + 1] != b"{":
+            self._skip(line, pos)
+            return None
+        value, _end = self._object(line, pos, self.tree)
+        return value
+
+    def _value(self, line: bytes, pos: int, node: Any) -> Tuple[Any, int]:
+        """Read the value at pos as node asks. Returns (value or _MISSING, end)."""
+        char = line[pos : pos + 1]
+        if node is TAKE:
+            end = self._skip(line, pos)
+            return json.loads(line[pos:end]), end
+        if char == b"{":
+            return self._object(line, pos, node)
+        if char == b"[" and b"[]" in node:
+            return self._array(line, pos, node[b"[]"])
+        return _MISSING, self._skip(line, pos)
+
+    def _object(self, line: bytes, pos: int, node: Tree) -> Tuple[Dict[str, Any], int]:
+        result: Dict[str, Any] = {}
+        pos = _match_end(_WHITESPACE, line, pos + 1)
+        if line[pos : pos + 1] == b"}":
+            return result, pos + 1
+        while True:
+            if line[pos : pos + 1] != b'"':
+                raise ValueError(f"Expected a key at byte {pos}")
+            end = self._string_end(line, pos)
+            raw_key = line[pos + 1 : end - 1]
+            if b"\\" in raw_key:
+                raw_key = json.loads(line[pos:end]).encode("utf-8", "surrogatepass")
+            pos = _match_end(_WHITESPACE, line, end)
+            if line[pos : pos + 1] != b":":
+                raise ValueError(f"Expected ':' at byte {pos}")
+            pos = _match_end(_WHITESPACE, line, pos + 1)
+
+            child = node.get(raw_key)
+            if child is None:
+                pos = self._skip(line, pos)
+            else:
+                value, pos = self._value(line, pos, child)
+                if value is not _MISSING:
+                    result[raw_key.decode("utf-8", "surrogatepass")] = value
+
+            pos = _match_end(_WHITESPACE, line, pos)
+            char = line[pos : pos + 1]
+            if char == b"}":
+                return result, pos + 1
+            if char != b",":
+                raise ValueError(f"Expected ',' or '}}' at byte {pos}")
+            pos = _match_end(_WHITESPACE, line, pos + 1)
+
+    def _array(self, line: bytes, pos: int, node: Any) -> Tuple[List[Any], int]:
+        result: List[Any] = []
+        pos = _match_end(_WHITESPACE, line, pos + 1)
+        if line[pos : pos + 1] == b"]":
+            return result, pos + 1
+        while True:
+            value, pos = self._value(line, pos, node)
+            # Keep list positions meaningful for "when" checks on items
+            result.append(None if value is _MISSING else value)
+            pos = _match_end(_WHITESPACE, line, pos)
+            char = line[pos : pos + 1]
+            if char == b"]":
+                return result, pos + 1
+            if char != b",":
+                raise ValueError(f"Expected ',' or ']' at byte {pos}")
+            pos = _match_end(_WHITESPACE, line, pos + 1)
+
+    @staticmethod
+    def _string_end(line: bytes, pos: int) -> int:
+        """Return the index just past the string starting at pos."""
+        find = line.find
+        quote = find(b'"', pos + 1)
+        while quote >= 0:
+            if line[quote - 1] != 0x5C:  # backslash
+                return quote + 1
+            # Escaped unless preceded by an even run of backslashes
+            start = quote - 1
+            while line[start - 1] == 0x5C:
+                start -= 1
+            if (quote - start) % 2 == 0:
+                return quote + 1
+            quote = find(b'"', quote + 1)
+        raise ValueError(f"Unterminated string at byte {pos}")
+
+    def _skip(self, line: bytes, pos: int) -> int:
+        """Return the index just past the value starting at pos."""
+        char = line[pos : pos + 1]
+        if char == b'"':
+            return self._string_end(line, pos)
+        if char not in (b"{", b"["):
+            end = _match_end(_SCALAR, line, pos)
+            if end == pos:
+                raise ValueError(f"Expected a value at byte {pos}")
+            return end
+
+        depth = 0
+        while True:
+            match = _STRUCTURE.search(line, pos)
+            if match is None:
+                raise ValueError("Unbalanced brackets")
+            pos = match.start()
+            char = line[pos : pos + 1]
+            if char == b'"':
+                pos = self._string_end(line, pos)
+                continue
+            depth += 1 if char in (b"{", b"[") else -1
+            pos += 1
+            if depth == 0:
+                return pos
@@ -0,0 +1,104 @@
+"""Small filesystem helpers shared by the persistence code."""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Tuple
+
+# (uid, gid) to give files written on behalf of another user
+Owner = Tuple[int, int]
+
+
+def atomic_write(path: Path, data: str, owner: Optional[Owner] = None) -> None:
+    """
+    Replace path with data atomically.
+
+    Writes to a temp file in the same directory, fsyncs it and renames it
+    over path, so readers see either the old or the new contents, never a
+    partial write.
+
+    Args:
+        path: File to replace
+        data: New contents
+        owner: (uid, gid) to chown the file to before it is renamed into place
+    """
+    # Same naming as tempfile.mkstemp, without the cost of importing tempfile
+    # (shutil, random, ...) in quick CLI commands
+    tmp_path = str(path.parent / f".{path.name}.{os.urandom(4).hex()}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    try:
+        if owner is not None:
+            os.fchown(fd, *owner)
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(lock_path: Path, owner: Optional[Owner] = None) -> Iterator[None]:
+    """
+    Hold an exclusive fcntl advisory lock on lock_path for the block.
+
+    The lock lives on a separate file rather than on the data file itself,
+    because atomic_write replaces the data file's inode. Locks are per open
+    file, so nesting this in one process deadlocks; callers must not
+    re-enter it.
+
+    Args:
+        lock_path: Lock file, created if missing (symlinks are refused)
+        owner: (uid, gid) to give the lock file
+    """
+    fd = create_file(lock_path, owner)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # Closing the file releases the lock
+
+
+def create_file(path: Path, owner: Optional[Owner] = None) -> int:
+    """
+    Open path for writing, creating it if needed, and return the descriptor.
+
+    Refuses to follow a symlink, so a process writing into another user's
+    home can't be redirected elsewhere.
+    """
+    fd = os.open(str(path), os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+    if owner is not None:
+        try:
+            os.fchown(fd, *owner)
+        except OSError:
+            os.close(fd)
+            raise
+    return fd
+
+
+def read_json(path: Any, owner_uid: Optional[int] = None) -> Any:
+    """
+    Parse a JSON file, optionally insisting it belongs to owner_uid.
+
+    Raises:
+        OSError: If the file can't be read (or is a symlink, with owner_uid)
+        ValueError: If it isn't valid JSON or belongs to someone else
+    """
+    if owner_uid is None:
+        with open(path) as f:
+            return json.load(f)
+
+    # O_NOFOLLOW plus fstat avoids reading a file another user linked in
+    fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW)
+    with os.fdopen(fd, "r") as f:
+        st = os.fstat(f.fileno())
+        if st.st_uid != owner_uid:
+            raise ValueError(f"{path} is not owned by uid {owner_uid}")
+        return json.load(f)
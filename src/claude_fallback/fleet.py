@@ -0,0 +1,332 @@
+"""Fleet mode: one monitor process watching the Claude Code logs of many users.
+
+Meant for shared machines (dev boxes, CI runners) where running a monitor
+per user is wasteful. The fleet monitor, normally run as root, discovers
+home directories from a list of glob patterns and spreads their users
+across a small pool of worker threads ("shards"). Each shard has a single
+watcher covering all of its users' projects trees and routes changes to
+one LogMonitor per user.
+
+Every user keeps their own state, offsets and stats files (owned by them,
+in their home), their own settings from ~/.claude_fallback.json, and
+their own notifications. Settings are never read from the fleet daemon's
+environment, and processes started for a user get a minimal environment
+holding only that user's API key.
+"""
+
+import glob
+import json
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from claude_fallback.config import Config
+from claude_fallback.monitor import RESCAN_INTERVAL, LogMonitor, log_error
+from claude_fallback.userhome import UserHome
+from claude_fallback.watcher import (
+    AdaptiveInterval,
+    InotifyWatcher,
+    PollingWatcher,
+    WatcherError,
+)
+
+FLEET_CONFIG = Path("/etc/claude-fallback/fleet.json")
+
+DEFAULT_HOMES = ["/home/*", "/Users/*"]
+
+# Seconds between looks for new home directories
+REDISCOVER_INTERVAL = 300
+
+
+def discover_homes(patterns: Iterable[str]) -> List[Path]:
+    """
+    Expand home directory glob patterns, keeping homes that use Claude Code.
+
+    Args:
+        patterns: Globs such as "/home/*" (literal paths work too)
+
+    Returns:
+        Sorted home directories that contain a .claude directory
+    """
+    homes: Set[Path] = set()
+    for pattern in patterns:
+        for match in glob.glob(os.path.expanduser(pattern)):
+            home = Path(match)
+            if (home / ".claude").is_dir():
+                homes.add(home)
+    return sorted(homes)
+
+
+def load_user_config(user: UserHome) -> Config:
+    """
+    Load a user's settings from their ~/.claude_fallback.json.
+
+    The file must belong to the user. Users without one (or without an API
+    key in it) are monitored in notify-only mode.
+    """
+    try:
+        return Config.load(
+            str(user.config_file), environ={}, owner_uid=user.uid, require_api_key=False
+        )
+    except (ValueError, OSError) as e:
+        log_error(f"[{user.name}] Ignoring {user.config_file}: {e}")
+        return Config(api_key="")
+
+
+def load_fleet_settings(path: Path = FLEET_CONFIG) -> Dict[str, Any]:
+    """Read the fleet's own settings file, or {} if there is none."""
+    try:
+        with open(path) as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if not isinstance(settings, dict):
+        raise ValueError(f"{path} must hold a JSON object")
+    return settings
+
+
+class _Shard:
+    """Users served by one worker thread, sharing one watcher."""
+
+    def __init__(self, fleet: "FleetMonitor", name: str, first: LogMonitor):
+        self.fleet = fleet
+        self.name = name
+        # Projects tree -> the monitor of the user it belongs to
+        self.monitors: Dict[Path, LogMonitor] = {}
+        self._pending: List[LogMonitor] = [first]
+        self._lock = threading.Lock()
+        self.watcher = fleet._create_watcher(first.base_path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.monitors) + len(self._pending)
+
+    def add(self, monitor: LogMonitor) -> None:
+        """Hand a user to this shard; it is picked up on the next wakeup."""
+        with self._lock:
+            self._pending.append(monitor)
+        self.watcher.wakeup()
+
+    def _adopt_pending(self) -> bool:
+        """Start serving newly added users. Returns True if there were any."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for monitor in pending:
+            monitor.checkpoint.load()
+            monitor.seen.load()
+            if monitor.base_path not in self.monitors and isinstance(
+                self.watcher, InotifyWatcher
+            ):
+                try:
+                    self.watcher.add_root(monitor.base_path)
+                except WatcherError as e:
+                    self._fall_back_to_polling(e)
+            self.monitors[monitor.base_path] = monitor
+            monitor.watcher = self.watcher
+            monitor._save_stats()
+        return bool(pending)
+
+    def _fall_back_to_polling(self, error: WatcherError) -> None:
+        log_error(f"Fleet {self.name}: inotify failed, falling back to polling: {error}")
+        self.watcher.close()
+        self.watcher = self.fleet._create_polling_watcher()
+        for monitor in self.monitors.values():
+            monitor.watcher = self.watcher
+
+    def _monitor_for(self, path: Path) -> Optional[LogMonitor]:
+        for parent in path.parents:
+            monitor = self.monitors.get(parent)
+            if monitor is not None:
+                return monitor
+        return None
+
+    def _wait(self) -> Optional[Set[Path]]:
+        timeout = RESCAN_INTERVAL if isinstance(self.watcher, InotifyWatcher) else None
+        try:
+            return self.watcher.wait(timeout)
+        except WatcherError as e:
+            self._fall_back_to_polling(e)
+            return None
+
+    def run(self) -> None:
+        """Serve this shard's users until the fleet stops."""
+        changed_paths: Optional[Set[Path]] = None
+        error_backoff = AdaptiveInterval(1.0, 60.0)
+
+        while self.fleet.running:
+            try:
+                if self._adopt_pending():
+                    changed_paths = None
+
+                # None asks a monitor for a full rescan of its user's tree
+                batches: Dict[LogMonitor, Optional[Set[Path]]] = {}
+                if changed_paths is None:
+                    batches = dict.fromkeys(self.monitors.values())
+                else:
+                    grouped: Dict[LogMonitor, Set[Path]] = {}
+                    for path in changed_paths:
+                        monitor = self._monitor_for(path)
+                        if monitor is not None:
+                            grouped.setdefault(monitor, set()).add(path)
+                    batches.update(grouped)
+
+                bytes_read = 0
+                for monitor, paths in batches.items():
+                    # One user's broken tree must not stall everyone else
+                    try:
+                        bytes_read += monitor.tick(paths)
+                    except Exception as e:
+                        monitor._log_error(f"Monitor loop error: {e}")
+                self.watcher.report(bytes_read > 0)
+                error_backoff.activity()
+
+                changed_paths = self._wait()
+            except Exception as e:
+                log_error(f"Fleet {self.name} error: {e}")
+                changed_paths = None
+                self.fleet._wake.wait(error_backoff.next_delay())
+                error_backoff.idle()
+
+        self.watcher.close()
+        for monitor in self.monitors.values():
+            monitor.close()
+
+
+class FleetMonitor:
+    """Watches many users' home directories from one process."""
+
+    def __init__(
+        self,
+        patterns: Iterable[str] = DEFAULT_HOMES,
+        workers: int = 4,
+        watcher: str = "auto",
+        rediscover_interval: float = REDISCOVER_INTERVAL,
+        poll_min_interval: float = 0.5,
+        poll_max_interval: float = 30.0,
+        poll_jitter: float = 0.1,
+    ):
+        """
+        Initialize the fleet.
+
+        Args:
+            patterns: Home directory globs to watch
+            workers: Worker threads; users are spread evenly across them
+            watcher: Watcher backend for every shard (auto, inotify, polling)
+            rediscover_interval: Seconds between looks for new home directories
+            poll_min_interval / poll_max_interval / poll_jitter: Polling
+                watcher schedule (see Config)
+        """
+        self.patterns = list(patterns)
+        self.workers = max(1, workers)
+        self.watcher = watcher
+        self.rediscover_interval = rediscover_interval
+        self.poll_min_interval = poll_min_interval
+        self.poll_max_interval = poll_max_interval
+        self.poll_jitter = poll_jitter
+        self.running = False
+        # Home directory -> its user's monitor
+        self.monitors: Dict[Path, LogMonitor] = {}
+        self.shards: List[_Shard] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wake = threading.Event()
+
+    def _create_watcher(self, root: Path) -> Union[InotifyWatcher, PollingWatcher]:
+        if self.watcher != "polling":
+            try:
+                return InotifyWatcher(root)
+            except WatcherError as e:
+                log_error(f"Fleet: inotify watcher unavailable, falling back to polling: {e}")
+        return self._create_polling_watcher()
+
+    def _create_polling_watcher(self) -> PollingWatcher:
+        return PollingWatcher(self.poll_min_interval, self.poll_max_interval, self.poll_jitter)
+
+    def _assign(self, monitor: LogMonitor) -> None:
+        """Give a user to a new shard while under the worker limit, else the smallest."""
+        assert self._executor is not None
+        if len(self.shards) < self.workers:
+            shard = _Shard(self, f"shard-{len(self.shards)}", monitor)
+            self.shards.append(shard)
+            self._executor.submit(shard.run)
+        else:
+            min(self.shards, key=len).add(monitor)
+
+    def discover(self) -> int:
+        """
+        Start monitoring home directories that appeared since the last look.
+
+        Returns:
+            Number of users added
+        """
+        added = 0
+        for home in discover_homes(self.patterns):
+            if home in self.monitors:
+                continue
+            try:
+                user = UserHome.from_path(home)
+            except OSError as e:
+                log_error(f"Fleet: skipping {home}: {e}")
+                continue
+            config = load_user_config(user)
+            try:
+                monitor = LogMonitor(config, user)
+            except (OSError, ValueError) as e:
+                # A broken rules file still leaves the user with the built-in rules
+                log_error(f"[{user.name}] Ignoring rules file {config.rules_file}: {e}")
+                config.rules_file = ""
+                monitor = LogMonitor(config, user)
+            self.monitors[home] = monitor
+            self._assign(monitor)
+            added += 1
+        return added
+
+    def start(self) -> None:
+        """Discover users and start the worker threads (returns immediately)."""
+        self.running = True
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="fleet"
+        )
+        self.discover()
+
+    def stop(self) -> None:
+        """Ask every shard to finish; join() waits for them."""
+        self.running = False
+        self._wake.set()
+        for shard in self.shards:
+            shard.watcher.wakeup()
+
+    def join(self) -> None:
+        """Wait for the shards to close their users' logs and flush state."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def run(self) -> None:
+        """Run in the foreground until SIGTERM/SIGINT, rediscovering users periodically."""
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        self.start()
+        print(
+            f"Watching {len(self.monitors)} user(s) matching {', '.join(self.patterns)} "
+            f"with {len(self.shards)} worker(s)"
+        )
+        while self.running:
+            self._wake.wait(self.rediscover_interval)
+            if self.running:
+                try:
+                    added = self.discover()
+                except Exception as e:
+                    log_error(f"Fleet: discovery failed: {e}")
+                    continue
+                if added:
+                    print(f"Added {added} user(s), now watching {len(self.monitors)}")
+        self.join()
+        print("Fleet monitor stopped.")
+
+    def _handle_signal(self, signum: int, frame: Optional[FrameType]) -> None:
+        print(f"\nReceived {signal.Signals(signum).name}, shutting down...")
+        self.stop()
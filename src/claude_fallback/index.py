@@ -0,0 +1,229 @@
+"""Incremental index of Claude Code session logs."""
+
+import heapq
+import os
+import stat
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Directory listings whose mtime is this recent are not trusted, since a file
+# created within the same timestamp tick would not change it again ("racy"
+# mtimes, as in git's index).
+RACY_WINDOW_NS = 1_000_000_000
+
+
+class _DirEntry:
+    """Cached listing of a single directory."""
+
+    __slots__ = ("mtime_ns", "subdirs", "logs")
+
+    def __init__(self) -> None:
+        self.mtime_ns: Optional[int] = None
+        self.subdirs: List[str] = []
+        self.logs: Set[str] = set()
+
+
+class SessionIndex:
+    """
+    Keeps track of every session log under the projects tree.
+
+    Directories are listed with os.scandir and only re-listed when their
+    mtime changes. Log mtimes are kept in a heap so the most recently
+    modified log can be found without stat'ing every file on every tick.
+
+    Refreshes report which logs changed together with their previously known
+    size, so callers can read exactly the bytes appended since. Logs found on
+    the very first refresh report their current size (nothing to catch up on);
+    logs that appear later report 0.
+    """
+
+    def __init__(
+        self,
+        base_path: Path,
+        hot_window: float = 300,
+        full_rescan_every: int = 30,
+        follow_symlinks: bool = True,
+    ):
+        """
+        Initialize the index.
+
+        Args:
+            base_path: Root of the Claude Code projects tree
+            hot_window: Logs modified within this many seconds are re-stat'ed
+                on every refresh; older logs only on a full rescan
+            full_rescan_every: Re-stat every known log once per this many refreshes
+            follow_symlinks: Index logs that are symlinks (and a projects tree
+                that is one). A fleet monitor reading other users' homes as
+                root turns this off, so a user can't point it at files of
+                their choosing.
+        """
+        self.base_path = base_path
+        self.follow_symlinks = follow_symlinks
+        self.hot_window = hot_window
+        self.full_rescan_every = full_rescan_every
+        self._dirs: Dict[str, _DirEntry] = {}
+        self._mtimes: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._changed: Dict[str, int] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._refreshes = 0
+        self._initialized = False
+
+    def __len__(self) -> int:
+        return len(self._mtimes)
+
+    def _set_stat(self, path: str, st: os.stat_result) -> None:
+        """Record a log's mtime and size, noting it as changed if either moved."""
+        mtime = st.st_mtime
+        old_size = self._sizes.get(path)
+        if self._mtimes.get(path) == mtime and old_size == st.st_size:
+            return
+
+        if path not in self._changed:
+            if old_size is None:
+                old_size = 0 if self._initialized else st.st_size
+            self._changed[path] = old_size
+        self._sizes[path] = st.st_size
+
+        if self._mtimes.get(path) == mtime:
+            return
+        self._mtimes[path] = mtime
+        heapq.heappush(self._heap, (-mtime, path))
+
+        # Stale heap entries are skipped lazily; compact when they pile up
+        if len(self._heap) > 2 * len(self._mtimes) + 64:
+            self._heap = [(-m, p) for p, m in self._mtimes.items()]
+            heapq.heapify(self._heap)
+
+    def _forget(self, path: str) -> None:
+        """Drop a log from the index (its heap entries become stale)."""
+        self._mtimes.pop(path, None)
+        self._sizes.pop(path, None)
+
+    def _forget_dir(self, path: str) -> None:
+        """Drop a directory and everything beneath it."""
+        entry = self._dirs.pop(path, None)
+        if entry is None:
+            return
+        for log in entry.logs:
+            self._forget(log)
+        for subdir in entry.subdirs:
+            self._forget_dir(subdir)
+
+    def _stat_log(self, path: str) -> None:
+        """Refresh a single log's mtime from disk."""
+        try:
+            st = os.stat(path, follow_symlinks=self.follow_symlinks)
+        except OSError:
+            self._forget(path)
+            return
+        if stat.S_ISREG(st.st_mode):
+            self._set_stat(path, st)
+        else:
+            self._forget(path)
+
+    def _scan_dir(self, path: str, now_ns: int) -> None:
+        """Visit a directory, re-listing it only if its mtime changed."""
+        try:
+            st = os.stat(path, follow_symlinks=self.follow_symlinks)
+        except OSError:
+            self._forget_dir(path)
+            return
+        if not stat.S_ISDIR(st.st_mode):
+            self._forget_dir(path)
+            return
+        mtime_ns = st.st_mtime_ns
+
+        entry = self._dirs.get(path)
+        if entry is None:
+            entry = self._dirs[path] = _DirEntry()
+
+        if entry.mtime_ns != mtime_ns:
+            is_sessions = os.path.basename(path) == "sessions"
+            subdirs: List[str] = []
+            logs: Set[str] = set()
+            try:
+                with os.scandir(path) as it:
+                    for dirent in it:
+                        if dirent.is_dir(follow_symlinks=False):
+                            subdirs.append(dirent.path)
+                        elif is_sessions and dirent.name.endswith(".jsonl"):
+                            if dirent.path in self._mtimes:
+                                logs.add(dirent.path)
+                                continue
+                            try:
+                                st = dirent.stat(follow_symlinks=self.follow_symlinks)
+                            except OSError:
+                                continue
+                            if stat.S_ISREG(st.st_mode):
+                                logs.add(dirent.path)
+                                self._set_stat(dirent.path, st)
+            except OSError:
+                self._forget_dir(path)
+                return
+
+            for gone in entry.logs - logs:
+                self._forget(gone)
+            for gone in set(entry.subdirs) - set(subdirs):
+                self._forget_dir(gone)
+
+            entry.subdirs = subdirs
+            entry.logs = logs
+            racy = now_ns - mtime_ns < RACY_WINDOW_NS
+            entry.mtime_ns = None if racy else mtime_ns
+
+        for subdir in entry.subdirs:
+            self._scan_dir(subdir, now_ns)
+
+    def _take_changes(self) -> Dict[Path, int]:
+        changed = {Path(p): size for p, size in self._changed.items()}
+        self._changed = {}
+        return changed
+
+    def refresh(self) -> Dict[Path, int]:
+        """
+        Bring the index up to date with the filesystem.
+
+        Returns:
+            Logs that were added or modified, mapped to their previous size
+        """
+        self._refreshes += 1
+        self._scan_dir(str(self.base_path), time.time_ns())
+
+        # Appends don't change directory mtimes, so re-stat logs that are
+        # likely to be written to, and everything else once in a while.
+        if self._refreshes % self.full_rescan_every == 0:
+            candidates = list(self._mtimes)
+        else:
+            cutoff = time.time() - self.hot_window
+            candidates = [p for p, m in self._mtimes.items() if m >= cutoff]
+        for path in candidates:
+            self._stat_log(path)
+        self._initialized = True
+        return self._take_changes()
+
+    def update(self, paths: Iterable[Path]) -> Dict[Path, int]:
+        """
+        Refresh specific logs, e.g. after watcher events.
+
+        Returns:
+            Logs that were added or modified, mapped to their previous size
+        """
+        for path in paths:
+            self._stat_log(str(path))
+        return self._take_changes()
+
+    def mtime(self, path: Path) -> Optional[float]:
+        """Return the last known mtime of a log, or None if it is not indexed."""
+        return self._mtimes.get(str(path))
+
+    def latest(self) -> Optional[Path]:
+        """Return the most recently modified log, or None if there are none."""
+        heap = self._heap
+        while heap:
+            neg_mtime, path = heap[0]
+            if self._mtimes.get(path) == -neg_mtime:
+                return Path(path)
+            heapq.heappop(heap)
+        return None
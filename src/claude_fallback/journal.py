@@ -0,0 +1,268 @@
+"""Append-only journal of detections, mode switches, restarts and errors.
+
+Unlike the state file, which only holds the latest mode and detection
+time, the journal keeps every event. Records are compact JSON lines:
+
+    {"t":1738314000.123,"k":"detection","session":"abc","reason":"rate_limit",...}
+
+where t is a Unix timestamp and k one of KINDS. They go into the active
+segment, journal.jsonl, which is sealed (renamed to
+journal-<start ms>.jsonl) once it reaches segment_bytes, so no file grows
+without bound and old history is never rewritten.
+
+Each segment has a sidecar index (.idx) of fixed-size (time, offset)
+entries, one per INDEX_INTERVAL bytes of records, so reading a time range
+seeks straight to it instead of scanning every segment from the start.
+Appending is constant time whatever the journal's size: open the active
+segment with O_APPEND, write one line and maybe one index entry, all under
+an fcntl lock shared by the monitor, the CLI and the shell functions.
+
+The index assumes the clock only moves forward; after a backwards jump a
+range query may miss a few records written just before it.
+"""
+
+import bisect
+import json
+import os
+import stat
+import struct
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+from claude_fallback.fileutil import Owner, file_lock
+
+KINDS = ("detection", "switch", "clear", "restart", "error")
+
+# Segments are sealed once they reach this size
+SEGMENT_BYTES = 4 * 1024 * 1024
+
+# One index entry per this many bytes of records
+INDEX_INTERVAL = 4096
+
+# Index entry: time of the first record at or after offset, offset
+INDEX_ENTRY = struct.Struct("<dQ")
+
+ACTIVE_NAME = "journal.jsonl"
+LOCK_NAME = "journal.lock"
+SEALED_PREFIX = "journal-"
+
+
+class Journal:
+    """
+    One user's event journal.
+
+    By default it lives in the current user's home. Fleet mode passes another
+    user's home (and their uid/gid as owner) so the journal is kept, and
+    owned, there.
+    """
+
+    DIRECTORY = Path.home() / ".claude_fallback_journal"
+
+    def __init__(
+        self,
+        home: Optional[Path] = None,
+        owner: Optional[Owner] = None,
+        segment_bytes: int = SEGMENT_BYTES,
+    ):
+        """
+        Args:
+            home: Home directory to keep the journal in (default: the current user's)
+            owner: (uid, gid) to give the journal files
+            segment_bytes: Size at which the active segment is sealed
+        """
+        self.directory = self.DIRECTORY if home is None else home / self.DIRECTORY.name
+        self.owner = owner
+        self.segment_bytes = segment_bytes
+
+    def append(self, kind: str, **fields: Any) -> bool:
+        """
+        Record an event.
+
+        Never raises: the journal is a record of what happened, and failing
+        to write it must not stop the monitor or a mode switch.
+
+        Args:
+            kind: One of KINDS
+            **fields: Details of the event (JSON-serializable, or turned into strings)
+
+        Returns:
+            True if the event was written
+        """
+        t = round(time.time(), 3)
+        record = {"t": t, "k": kind}
+        record.update(fields)
+        data = (json.dumps(record, separators=(",", ":"), default=str) + "\n").encode()
+        try:
+            try:
+                self._append(t, data)
+            except FileNotFoundError:
+                self._create_directory()
+                self._append(t, data)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def _append(self, t: float, data: bytes) -> None:
+        if self.owner is not None:
+            self._check_directory(self.owner[0])
+        active = self.directory / ACTIVE_NAME
+        with file_lock(self.directory / LOCK_NAME, self.owner):
+            offset = self._write(active, data)
+            end = offset + len(data)
+            # An entry for the first record starting after each interval boundary;
+            # that is the next record, so its time is at least t
+            if offset == 0:
+                self._write(active.with_suffix(".idx"), INDEX_ENTRY.pack(t, 0))
+            elif offset // INDEX_INTERVAL != end // INDEX_INTERVAL:
+                self._write(active.with_suffix(".idx"), INDEX_ENTRY.pack(t, end))
+            if end >= self.segment_bytes:
+                self._seal(active)
+
+    def _write(self, path: Path, data: bytes) -> int:
+        """Append data to path, creating it if needed. Returns the offset written at."""
+        fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            offset = os.fstat(fd).st_size
+            if offset == 0 and self.owner is not None:
+                os.fchown(fd, *self.owner)
+            os.write(fd, data)
+            return offset
+        finally:
+            os.close(fd)
+
+    def _seal(self, active: Path) -> None:
+        """Rename the active segment and its index out of the way, named by start time."""
+        with open(active, "rb") as f:
+            try:
+                start = float(json.loads(f.readline())["t"])
+            except (ValueError, KeyError, TypeError):
+                start = time.time()
+        sealed = self.directory / f"{SEALED_PREFIX}{int(start * 1000):013d}.jsonl"
+        # Index first: a crash in between leaves an orphan index (ignored) rather
+        # than a stale index pointing into the next, empty, active segment
+        try:
+            os.replace(active.with_suffix(".idx"), sealed.with_suffix(".idx"))
+        except FileNotFoundError:
+            pass
+        os.replace(active, sealed)
+
+    def _create_directory(self) -> None:
+        try:
+            os.mkdir(self.directory, 0o700)
+        except FileExistsError:
+            return
+        if self.owner is not None:
+            os.chown(self.directory, *self.owner)
+
+    def _check_directory(self, uid: int) -> None:
+        """Refuse a journal directory that is a symlink or doesn't belong to uid."""
+        st = os.lstat(self.directory)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid:
+            raise OSError(f"{self.directory} is not a directory owned by uid {uid}")
+
+    def segments(self) -> List[Path]:
+        """The sealed segments, oldest first, then the active one if it exists."""
+        sealed = []
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        for name in names:
+            if name.startswith(SEALED_PREFIX) and name.endswith(".jsonl"):
+                try:
+                    sealed.append((int(name[len(SEALED_PREFIX) : -len(".jsonl")]), name))
+                except ValueError:
+                    continue
+        paths = [self.directory / name for _start, name in sorted(sealed)]
+        if (self.directory / ACTIVE_NAME).exists():
+            paths.append(self.directory / ACTIVE_NAME)
+        return paths
+
+    def read(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Iterator[dict]:
+        """
+        Yield recorded events, oldest first.
+
+        Only segments that can hold events at or after since are opened, and
+        each is entered at the offset its index gives for since.
+
+        Args:
+            since: Only events at or after this Unix timestamp
+            until: Only events at or before this Unix timestamp
+            kinds: Only events of these kinds
+        """
+        wanted = set(kinds) if kinds is not None else None
+        files = self._open_segments(since)
+        try:
+            for f in files:
+                if since is not None:
+                    f.seek(_index_offset(f.name, since))
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        t = record["t"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Torn by a crash mid-write
+                    if since is not None and t < since:
+                        continue
+                    if until is not None and t > until:
+                        return
+                    if wanted is None or record.get("k") in wanted:
+                        yield record
+        finally:
+            for f in files:
+                f.close()
+
+    def _open_segments(self, since: Optional[float]) -> List[BinaryIO]:
+        """
+        Open the segments to read for since.
+
+        Opened under the lock so that a segment sealed meanwhile can't be
+        missed; the open files stay readable after a rename.
+        """
+        if not self.directory.is_dir():
+            return []
+        files: List[BinaryIO] = []
+        with file_lock(self.directory / LOCK_NAME, self.owner):
+            paths = self.segments()
+            starts = [_start_time(path) for path in paths]
+            for i, path in enumerate(paths):
+                # A segment ends where the next one starts
+                if since is not None and i + 1 < len(paths) and starts[i + 1] <= since:
+                    continue
+                try:
+                    files.append(open(path, "rb"))
+                except FileNotFoundError:
+                    continue
+        return files
+
+
+def _start_time(segment: Path) -> float:
+    """Time of the first record in a segment, or infinity if unknown."""
+    if segment.name.startswith(SEALED_PREFIX):
+        return int(segment.stem[len(SEALED_PREFIX) :]) / 1000
+    try:
+        with open(segment, "rb") as f:
+            return float(json.loads(f.readline())["t"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return float("inf")
+
+
+def _index_offset(segment: str, since: float) -> int:
+    """Offset in segment to start reading from to find the events at or after since."""
+    try:
+        with open(Path(segment).with_suffix(".idx"), "rb") as f:
+            data = f.read()
+    except OSError:
+        return 0
+    # Ignore an entry cut short by a concurrent append
+    entries: List[Tuple[float, int]] = list(
+        INDEX_ENTRY.iter_unpack(data[: len(data) - len(data) % INDEX_ENTRY.size])
+    )
+    i = bisect.bisect_left([t for t, _offset in entries], since)
+    return entries[i - 1][1] if i > 0 else 0
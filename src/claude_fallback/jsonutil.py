@@ -0,0 +1,96 @@
+"""JSON decoding backends for session log lines.
+
+Decoding is most of the cost of checking a log line, so the detector uses
+orjson or msgspec when one is installed (pip install
+claude-code-fallback[orjson]) and the standard library otherwise. Both
+decode raw bytes directly, without a str copy of the line.
+
+Lines a faster backend rejects but json accepts (NaN, a UTF-8 BOM, lone
+surrogate escapes, out-of-range floats) are retried with json, so the same
+lines decode under every backend. The one remaining difference is that
+orjson returns integers wider than 64 bits as floats.
+"""
+
+import json
+from typing import Any, Callable, List, Union
+
+BACKENDS = ("auto", "orjson", "msgspec", "json")
+
+# Tried in this order by "auto"
+_PREFERENCE = ("orjson", "msgspec")
+
+Loads = Callable[[Union[str, bytes]], Any]
+
+
+class JsonBackend:
+    """A named loads() function; decode errors are raised as ValueError."""
+
+    __slots__ = ("name", "loads")
+
+    def __init__(self, name: str, loads: Loads):
+        self.name = name
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JsonBackend({self.name!r})"
+
+
+def _with_fallback(fast: Loads) -> Loads:
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return fast(data)
+        except ValueError:
+            return json.loads(data)
+
+    return loads
+
+
+def _import_backend(name: str) -> JsonBackend:
+    """
+    Raises:
+        ImportError: If the backend's package isn't installed
+    """
+    if name == "orjson":
+        import orjson  # Deferred: optional dependency
+
+        return JsonBackend(name, _with_fallback(orjson.loads))
+    if name == "msgspec":
+        import msgspec  # Deferred: optional dependency
+
+        return JsonBackend(name, _with_fallback(msgspec.json.Decoder().decode))
+    return JsonBackend("json", json.loads)
+
+
+def get_backend(name: str = "auto") -> JsonBackend:
+    """
+    Return a JSON backend by name.
+
+    Args:
+        name: "orjson", "msgspec", "json", or "auto" for the fastest installed
+
+    Raises:
+        ValueError: If name isn't one of BACKENDS
+        ImportError: If a specific backend was asked for but isn't installed
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}'. Expected one of: {', '.join(BACKENDS)}")
+    if name != "auto":
+        return _import_backend(name)
+    for candidate in _PREFERENCE:
+        try:
+            return _import_backend(candidate)
+        except ImportError:
+            continue
+    return _import_backend("json")
+
+
+def available_backends() -> List[str]:
+    """Names of the backends that can be used here, fastest first."""
+    names = []
+    for name in _PREFERENCE + ("json",):
+        try:
+            _import_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
@@ -0,0 +1,184 @@
+"""Memory use of the long-running monitor: RSS budget and tracemalloc snapshots."""
+
+import gc
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
+from claude_fallback.watcher import AdaptiveInterval
+
+SNAPSHOT_DIR = Path.home() / ".claude_fallback_memory"
+
+# Allocation sites listed per snapshot
+TOP_ALLOCATIONS = 10
+
+# Longest wait between RSS checks while staying over budget
+MAX_CHECK_INTERVAL = 3600.0
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of this process, or None without /proc (macOS)."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def release_memory() -> None:
+    """Collect garbage and give freed heap pages back to the OS where possible."""
+    gc.collect()
+    try:
+        # Deferred: only needed when over budget, and only glibc has malloc_trim
+        import ctypes
+
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class MemoryBudget:
+    """
+    Periodic check of the process's RSS against a limit.
+
+    Reading /proc/self/statm is cheap, but a tick happens on every log
+    write, so RSS is only read once per interval. While it stays over
+    budget the checks back off (up to once an hour), since shedding the
+    same caches again and again won't help.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            max_bytes: RSS above which the monitor sheds its caches (0 disables checks)
+            interval: Seconds between two reads of the RSS while under budget
+            clock: Time source (monotonic seconds)
+        """
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.schedule = AdaptiveInterval(interval, MAX_CHECK_INTERVAL, jitter=0)
+        self._next_check = 0.0
+
+    def check(self) -> Optional[int]:
+        """
+        Read the RSS if a check is due.
+
+        Returns:
+            The RSS in bytes if it is over budget, None otherwise (also when
+            no check was due or the RSS can't be read)
+        """
+        if not self.max_bytes:
+            return None
+        now = self.clock()
+        if now < self._next_check:
+            return None
+        rss = rss_bytes()
+        if rss is None or rss <= self.max_bytes:
+            self.schedule.activity()
+            rss = None
+        else:
+            self.schedule.idle()
+        self._next_check = now + self.schedule.next_delay()
+        return rss
+
+
+class MemoryProfiler:
+    """
+    tracemalloc snapshots of the monitor, taken on demand.
+
+    Tracing makes every allocation slower, so it stays off until the first
+    snapshot is asked for (SIGUSR2 or `claude-fallback memory`), which only
+    starts it. Each later request dumps a snapshot to directory, loadable
+    with tracemalloc.Snapshot.load(), and reports the allocation sites that
+    grew most since the previous one.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, frames: int = 1):
+        """
+        Args:
+            directory: Where snapshots are written (defaults to SNAPSHOT_DIR)
+            frames: Stack frames recorded per allocation
+        """
+        self.directory = directory or SNAPSHOT_DIR
+        self.frames = frames
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        # Requests come from both the signal handler and the control socket
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def snapshot(self, top: int = TOP_ALLOCATIONS) -> Dict[str, Any]:
+        """
+        Start tracing, or take a snapshot if already tracing.
+
+        Args:
+            top: Number of allocation sites to report
+
+        Returns:
+            Dict with "started" (True if this call only started tracing),
+            and otherwise the snapshot's "path", the "traced" and "peak"
+            bytes, and the "top" sites (where, size, size_diff, count)
+
+        Raises:
+            OSError: If the snapshot can't be written
+        """
+        with self._lock:
+            return self._snapshot(top)
+
+    def _snapshot(self, top: int) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._previous = None
+            return {"started": True}
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        self.directory.mkdir(mode=0o700, exist_ok=True)
+        path = self.directory / f"snapshot-{datetime.now():%Y%m%d-%H%M%S-%f}.tracemalloc"
+        snapshot.dump(str(path))
+
+        stats: Sequence[Union[tracemalloc.Statistic, tracemalloc.StatisticDiff]]
+        if self._previous is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self._previous, "lineno")
+        self._previous = snapshot
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "started": False,
+            "path": str(path),
+            "traced": traced,
+            "peak": peak,
+            "top": [
+                {
+                    "where": str(stat.traceback),
+                    "size": stat.size,
+                    "size_diff": getattr(stat, "size_diff", stat.size),
+                    "count": stat.count,
+                }
+                for stat in stats[:top]
+            ],
+        }
+
+    def forget(self) -> None:
+        """Drop the previous snapshot kept for comparison."""
+        self._previous = None
+
+    def stop(self) -> None:
+        """Stop tracing and free its bookkeeping."""
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
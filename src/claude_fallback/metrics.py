@@ -0,0 +1,392 @@
+"""Runtime measurements for the log monitor."""
+
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+from claude_fallback.fileutil import Owner, atomic_write
+
+STATS_FILE = Path.home() / ".claude_fallback_stats.json"
+
+
+class LatencyHistogram:
+    """Rolling window of latency samples summarized as percentiles."""
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize the histogram.
+
+        Args:
+            window: Number of most recent samples to keep
+        """
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        """Record a sample (negative values from clock skew count as 0)."""
+        self.samples.append(max(seconds, 0.0))
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile (nearest rank), or None if empty."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        rank = max(int(round(p / 100 * len(ordered))) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+    def summary(self) -> Dict[str, Any]:
+        """Return count, p50, p95, p99 and max in seconds."""
+        return {
+            "count": len(self.samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(self.samples) if self.samples else None,
+        }
+
+
+class LatencyStats:
+    """
+    Per-stage latency from a limit event being written to the user being told.
+
+    Stages:
+        write_to_read: event timestamp -> line read by the monitor
+        read_to_match: line read -> detector match
+        match_to_handled: detector match -> notification delivered or
+            auto-restart finished (on the notifier or restart worker thread)
+        end_to_end: event timestamp -> handled
+
+    Detections are recorded once handled, from whichever thread handled them.
+    """
+
+    STAGES = ("write_to_read", "read_to_match", "match_to_handled", "end_to_end")
+
+    def __init__(self, window: int = 1000):
+        self.histograms = {stage: LatencyHistogram(window) for stage in self.STAGES}
+        self.detections = 0
+        self.last_detection_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        event_time: Optional[float],
+        read_at: float,
+        matched_at: float,
+        handled_at: float,
+    ) -> None:
+        """
+        Record the timings of one detection.
+
+        Args:
+            event_time: The event's own timestamp, if it had one
+            read_at: When the line was read from the log
+            matched_at: When the detector matched it
+            handled_at: When the notification was delivered or the auto-restart finished
+        """
+        with self._lock:
+            self.detections += 1
+            self.last_detection_at = handled_at
+            self.histograms["read_to_match"].add(matched_at - read_at)
+            self.histograms["match_to_handled"].add(handled_at - matched_at)
+            if event_time is not None:
+                self.histograms["write_to_read"].add(read_at - event_time)
+                self.histograms["end_to_end"].add(handled_at - event_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "detections": self.detections,
+                "last_detection_at": self.last_detection_at,
+                "latency": {stage: h.summary() for stage, h in self.histograms.items()},
+            }
+
+
+class RateMeter:
+    """Events per hour over the last hour, counted in one-minute buckets."""
+
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        # [minute, count] pairs, oldest first
+        self._buckets: Deque[List[int]] = deque(maxlen=60)
+
+    def mark(self, now: Optional[float] = None) -> None:
+        minute = int((time.time() if now is None else now) // 60)
+        if self._buckets and self._buckets[-1][0] == minute:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([minute, 1])
+
+    def per_hour(self, now: Optional[float] = None) -> float:
+        """Return the hourly rate, extrapolated if running for less than an hour."""
+        now = time.time() if now is None else now
+        oldest = int(now // 60) - 59
+        count = sum(n for minute, n in list(self._buckets) if minute >= oldest)
+        span = min(max(now - self.started_at, 60.0), 3600.0)
+        return count * 3600.0 / span
+
+
+def save_stats(
+    stats: Dict[str, Any], path: Path = STATS_FILE, owner: Optional[Owner] = None
+) -> None:
+    """Atomically write the monitor's stats file."""
+    stats = dict(stats, updated_at=time.time())
+    atomic_write(path, json.dumps(stats, indent=2), owner)
+
+
+def load_stats(path: Path = STATS_FILE) -> Optional[Dict[str, Any]]:
+    """Read the monitor's stats file, or None if missing or unreadable."""
+    try:
+        with open(path) as f:
+            stats = json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return None
+    return stats if isinstance(stats, dict) else None
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: LabelKey, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """Base class for metrics exposed in Prometheus text format."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """Return (name suffix, formatted labels, value) triples."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value, optionally split by labels.
+
+    Increments are plain dict updates so the monitor loop never waits on the
+    scrape thread.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, func: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            name: Metric name
+            help_text: Description shown in the HELP line
+            func: Read the value from this callable instead of inc() calls
+        """
+        super().__init__(name, help_text)
+        self.func = func
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        if self.func is not None:
+            return self.func()
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def by_label(self, label: str) -> Dict[str, float]:
+        """Return the values keyed by one label's value."""
+        return {dict(key).get(label, ""): value for key, value in list(self._values.items())}
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        if self.func is not None:
+            return [("", "", self.func())]
+        return [("", _format_labels(key), value) for key, value in list(self._values.items())]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, set directly or read from a callable."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram of observed values."""
+
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self._counts[i] += 1
+                break
+        self._sum += value
+        self._count += 1
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        # Bucket counts stay ints; the sum is the only float
+        result: List[Tuple[str, str, float]] = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, list(self._counts)):
+            cumulative += count
+            result.append(("_bucket", _format_labels((), f'le="{bound:g}"'), cumulative))
+        result.append(("_bucket", _format_labels((), 'le="+Inf"'), self._count))
+        result.append(("_sum", "", self._sum))
+        result.append(("_count", "", self._count))
+        return result
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for a scrape."""
+
+    def __init__(self) -> None:
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+
+class MonitorMetrics(MetricsRegistry):
+    """The counters and gauges exported by LogMonitor."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        prefix = "claude_fallback"
+        self.lines_read = self.register(
+            Counter(f"{prefix}_lines_read_total", "Log lines read from session logs")
+        )
+        self.bytes_read = self.register(
+            Counter(f"{prefix}_bytes_read_total", "Bytes read from session logs")
+        )
+        self.decode_failures = self.register(
+            Counter(f"{prefix}_json_decode_failures_total", "Log lines that failed to decode")
+        )
+        self.detections = self.register(
+            Counter(f"{prefix}_detections_total", "Usage limit detections by reason")
+        )
+        self.duplicate_detections = self.register(
+            Counter(
+                f"{prefix}_duplicate_detections_total",
+                "Detections of events already handled (e.g. re-read after a restart)",
+            )
+        )
+        self.coalesced_detections = self.register(
+            Counter(
+                f"{prefix}_coalesced_detections_total",
+                "Detections coalesced into an earlier switch and restart",
+            )
+        )
+        self.log_resets = self.register(
+            Counter(f"{prefix}_log_resets_total", "Session logs truncated or replaced")
+        )
+        self.lines_skipped = self.register(
+            Counter(f"{prefix}_lines_skipped_total", "Log lines longer than max_line_bytes")
+        )
+        self.tick_duration = self.register(
+            Histogram(f"{prefix}_tick_duration_seconds", "Time spent processing one tick")
+        )
+        self.wakeups = self.register(
+            Counter(f"{prefix}_wakeups_total", "Times the monitor loop woke up")
+        )
+        self.files_tracked = self.register(
+            Gauge(f"{prefix}_files_tracked", "Session logs currently being tailed")
+        )
+        self.auto_restarts = self.register(
+            Counter(f"{prefix}_auto_restarts_total", "Auto-restart attempts by outcome")
+        )
+        self.resident_memory = self.register(
+            Gauge(f"{prefix}_resident_memory_bytes", "Resident set size of the monitor")
+        )
+        self.memory_sheds = self.register(
+            Counter(f"{prefix}_memory_sheds_total", "Times caches were shed for max_rss_mb")
+        )
+        self.restart_downtime = self.register(
+            Histogram(
+                f"{prefix}_restart_downtime_seconds",
+                "Time from stopping a Claude process to starting its replacement",
+                buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+            )
+        )
+
+
+class MetricsServer:
+    """Serves a registry at /metrics on localhost from a background thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = "127.0.0.1"):
+        """
+        Args:
+            registry: Metrics to expose
+            port: TCP port to listen on (0 picks a free port)
+            host: Interface to bind, localhost only by default
+        """
+        # Deferred so that reading stats (claude-fallback status) stays fast
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = registry_ref.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass  # Keep scrapes out of the monitor's output
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,24 +1,56 @@
 """JSONL log monitor for Claude Code usage limits."""
 
-import glob
+import functools
 import os
 import signal
 import subprocess
 import sys
+import threading
 import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from types import FrameType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
+from claude_fallback import procscan
+from claude_fallback.actions import ActionScheduler
+from claude_fallback.checkpoint import OffsetCheckpoint
 from claude_fallback.config import Config
-from claude_fallback.detector import UsageLimitDetector
+from claude_fallback.control import ControlError, ControlServer, Handler
+from claude_fallback.dedupe import SeenEvents, event_key
+from claude_fallback.detector import Detection, UsageLimitDetector, parse_event_time
+from claude_fallback.index import SessionIndex
+from claude_fallback.journal import Journal
+from claude_fallback.memory import MemoryBudget, MemoryProfiler, release_memory, rss_bytes
+from claude_fallback.metrics import (
+    STATS_FILE,
+    LatencyStats,
+    MetricsServer,
+    MonitorMetrics,
+    RateMeter,
+    save_stats,
+)
 from claude_fallback.notifier import Notifier
+from claude_fallback.pidfile import is_already_running, remove_pid_file, write_pid_file
+from claude_fallback.restart import RestartOrchestrator
+from claude_fallback.rules import load_rules
 from claude_fallback.state import State
+from claude_fallback.tailer import MultiTailer, TrackedLog
+from claude_fallback.userhome import UserHome
+from claude_fallback.watcher import (
+    AdaptiveInterval,
+    InotifyWatcher,
+    PollingWatcher,
+    WatcherError,
+)
 
-# PID file location
-PID_FILE = Path.home() / ".claude_fallback.pid"
 ERROR_LOG = Path.home() / ".claude_fallback_error.log"
 
+# Seconds between full rescans when event-driven (safety net for missed events)
+RESCAN_INTERVAL = 30
+
+MIB = 1024 * 1024
+
 
 def log_error(message: str) -> None:
     """Log error with timestamp to error log file."""
@@ -30,254 +62,749 @@ def log_error(message: str) -> None:
 class LogMonitor:
     """Monitors Claude Code JSONL logs for usage limit events."""
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, user: Optional[UserHome] = None):
         """
         Initialize the monitor.
 
         Args:
             config: Configuration object
+            user: Home directory to watch on behalf of another user (fleet
+                mode); defaults to the current user's own home
         """
         self.config = config
-        self.detector = UsageLimitDetector()
-        self.notifier = Notifier(enable_sound=True)
-        self.state = State.load()
+        self.user = user
+        self.home = user.path if user else None
+        self.owner = user.owner if user else None
+        self.journal = Journal(self.home, self.owner)
+        self.detector = self._create_detector(config)
+        self.notifier = Notifier(
+            enable_sound=True,
+            background=True,
+            timeout=config.notify_timeout,
+            run_as=user.owner if user and user.is_other_user else None,
+            env=user.environment() if user else None,
+        )
+        self.state = State.load(self.home, self.owner)
         self.running = False
-        self.notified_for_session = False
-        self.base_path = Path.home() / ".claude" / "projects"
-        self.current_log: Optional[Path] = None
-        self.last_pos = 0
-
-        # Set up signal handlers
-        signal.signal(signal.SIGTERM, self._handle_signal)
-        signal.signal(signal.SIGINT, self._handle_signal)
-
-    def _handle_signal(self, signum: int, frame) -> None:
+        self.base_path = (self.home or Path.home()) / ".claude" / "projects"
+        # Fleet mode reads other users' trees, possibly as root: never follow
+        # their symlinks
+        self.index = SessionIndex(self.base_path, follow_symlinks=user is None)
+        self.tailer = MultiTailer(
+            max_open=config.max_open_logs,
+            max_line_bytes=config.max_line_bytes,
+            follow_symlinks=user is None,
+        )
+        if user is None:
+            self.checkpoint = OffsetCheckpoint()
+            self.stats_path = STATS_FILE
+        else:
+            self.checkpoint = OffsetCheckpoint(
+                user.path / OffsetCheckpoint.CHECKPOINT_FILE.name, owner=self.owner
+            )
+            self.stats_path = user.path / STATS_FILE.name
+        self.seen = SeenEvents(
+            user.path / SeenEvents.SEEN_FILE.name if user else None, owner=self.owner
+        )
+        self.scheduler = ActionScheduler(config.coalesce_window, config.restart_interval)
+        self.restarter = RestartOrchestrator(config.restart_timeout)
+        # Restart workers share the metrics, whose updates aren't atomic
+        self._restart_lock = threading.Lock()
+        self.latency = LatencyStats()
+        self.started_at = time.time()
+        self.metrics = MonitorMetrics()
+        self.metrics.decode_failures.func = lambda: self.detector.decode_failures
+        self.metrics.files_tracked.func = lambda: len(self.tailer)
+        self.metrics.log_resets.func = lambda: self.tailer.resets
+        self.metrics.lines_skipped.func = lambda: self.tailer.skipped_lines
+        self.metrics.coalesced_detections.func = lambda: self.scheduler.coalesced
+        self.metrics.resident_memory.func = lambda: rss_bytes() or 0
+        # RSS is per process: a fleet's users share one, so only a monitor
+        # running on its own checks it
+        self.memory_budget = MemoryBudget(0 if user else int(config.max_rss_mb * MIB))
+        self.profiler = MemoryProfiler()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.control_server: Optional[ControlServer] = None
+        self.watcher: Optional[Union[InotifyWatcher, PollingWatcher]] = None
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self.wakeups = RateMeter()
+
+    def _handle_signal(self, signum: int, frame: Optional[FrameType]) -> None:
         """Handle shutdown signals gracefully."""
         sig_name = signal.Signals(signum).name
         print(f"\nReceived {sig_name}, shutting down...")
         self.stop()
 
+    def _handle_memory_signal(self, signum: int, frame: Optional[FrameType]) -> None:
+        """Take a tracemalloc snapshot on SIGUSR2 (the first one starts tracing)."""
+        try:
+            result = self.profiler.snapshot()
+        except OSError as e:
+            self._log_error(f"Failed to write memory snapshot: {e}")
+            return
+        if result["started"]:
+            print("Memory tracing started; send SIGUSR2 again for a snapshot")
+            return
+        print(f"Memory snapshot written to {result['path']}")
+        for site in result["top"]:
+            print(f"  {site['size_diff'] / 1024:+10.1f} KiB  {site['where']}")
+
+    def _create_detector(self, config: Config) -> UsageLimitDetector:
+        """
+        Build a detector from the configured rules file, or the built-in rules.
+
+        In fleet mode "~" and relative paths are taken from the user's home,
+        and the file must belong to the user. A json_backend that isn't
+        installed falls back to the standard library.
+
+        Raises:
+            OSError: If the rules file can't be read
+            ValueError: If the rules file is invalid
+        """
+        rules = None
+        user = self.user
+        if config.rules_file and user is None:
+            rules = load_rules(os.path.expanduser(config.rules_file))
+        elif config.rules_file and user is not None:
+            path = config.rules_file
+            if path.startswith("~/"):
+                path = path[2:]
+            rules = load_rules(str(user.path / path), user.uid)
+        try:
+            return UsageLimitDetector(rules, config.json_backend, config.max_decode_bytes)
+        except ImportError as e:
+            self._log_error(f"JSON backend {config.json_backend} unavailable, using json: {e}")
+            return UsageLimitDetector(rules, "json", config.max_decode_bytes)
+
+    def _log_error(self, message: str) -> None:
+        self.journal.append("error", message=message)
+        if self.user is not None:
+            message = f"[{self.user.name}] {message}"
+        log_error(message)
+
     def find_latest_log(self) -> Optional[Path]:
         """Finds the most recently modified .jsonl file across all projects."""
-        pattern = str(self.base_path / "**" / "sessions" / "*.jsonl")
-        log_files = glob.glob(pattern, recursive=True)
-        if not log_files:
-            return None
-        return Path(max(log_files, key=os.path.getmtime))
+        self.index.refresh()
+        return self.index.latest()
 
-    def _check_for_updates(self) -> None:
-        """Check for new log entries and detect usage limits."""
-        if self.current_log is None:
-            return
+    def _sync_tracked(self, changed: Dict[Path, int]) -> List[TrackedLog]:
+        """
+        Start tailing logs that became active and collect those with new data.
+
+        Args:
+            changed: Logs reported by the index, mapped to their previous size
+
+        Returns:
+            Tracked logs that may have new lines to read
+        """
+        cutoff = time.time() - self.config.active_window
+        updated = []
+        for path, prev_size in changed.items():
+            mtime = self.index.mtime(path)
+            if mtime is None:
+                self.tailer.untrack(path)
+                continue
+            if path not in self.tailer:
+                if mtime < cutoff:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if self.user is not None:
+                    print(f"Monitoring session: {self.user.name}/{path.name}")
+                else:
+                    print(f"Monitoring session: {path.name}")
+                offset = self._resume_offset(path, st, prev_size)
+                self.tailer.track(path, offset, st.st_ino)
+            updated.append(self.tailer.logs[path])
+        return updated
+
+    def _resume_offset(self, path: Path, st: os.stat_result, default: int) -> int:
+        """
+        Decide where to start reading a newly tracked log.
 
+        Resumes from the checkpointed offset when there is one, so lines
+        written while the monitor was down are not skipped, but never looks
+        back more than max_resume_bytes.
+        """
+        saved = self.checkpoint.get(path, st.st_ino)
+        if saved is None or saved > st.st_size:
+            return default
+        return max(saved, st.st_size - self.config.max_resume_bytes)
+
+    def _prune_inactive(self) -> None:
+        """Stop tailing logs that haven't been written within the active window."""
+        cutoff = time.time() - self.config.active_window
+        for log in self.tailer:
+            mtime = self.index.mtime(log.path)
+            if mtime is None or mtime < cutoff:
+                self.tailer.untrack(log.path)
+
+    def _create_watcher(self) -> Union[InotifyWatcher, PollingWatcher]:
+        """Create the configured watcher, falling back to polling if needed."""
+        if self.config.watcher != "polling":
+            try:
+                return InotifyWatcher(self.base_path)
+            except WatcherError as e:
+                self._log_error(f"inotify watcher unavailable, falling back to polling: {e}")
+        return self._create_polling_watcher()
+
+    def _create_polling_watcher(self) -> PollingWatcher:
+        return PollingWatcher(
+            self.config.poll_min_interval, self.config.poll_max_interval, self.config.poll_jitter
+        )
+
+    def _wait_for_changes(self) -> Optional[Set[Path]]:
+        """Wait for the watcher to report changes, degrading to polling on failure."""
+        # Polling rescans on every wakeup; only event-driven waits need a rescan timeout
+        watcher = self.watcher
+        if watcher is None:
+            return None
+        timeout = RESCAN_INTERVAL if isinstance(watcher, InotifyWatcher) else None
         try:
-            # Check if file still exists
-            if not self.current_log.exists():
-                self.current_log = None
-                self.last_pos = 0
-                return
+            return watcher.wait(timeout)
+        except WatcherError as e:
+            self._log_error(f"inotify watcher failed, falling back to polling: {e}")
+            watcher.close()
+            self.watcher = self._create_polling_watcher()
+            return None
 
-            with open(self.current_log, "r") as f:
-                f.seek(self.last_pos)
-                lines = f.readlines()
-                self.last_pos = f.tell()
+    def _check_for_updates(self, logs: Optional[Iterable[TrackedLog]] = None) -> int:
+        """
+        Check for new log entries and detect usage limits.
 
-                for line in lines:
-                    if not line.strip():
-                        continue
+        Args:
+            logs: Tracked logs to read (defaults to every tracked log)
 
-                    detection = self.detector.check_event(line)
-                    if detection and not self.notified_for_session:
-                        self._handle_limit_detected(detection)
+        Returns:
+            Number of bytes read
+        """
+        total = 0
+        for log in self.tailer if logs is None else logs:
+            batches = self.tailer.iter_new_lines(log)
+            while True:
+                try:
+                    lines = next(batches, None)
+                except FileNotFoundError:
+                    self.tailer.untrack(log.path)
+                    break
+                except PermissionError as e:
+                    self._log_error(f"Permission denied reading log: {e}")
+                    self.tailer.untrack(log.path)
+                    break
+                except OSError as e:
+                    self._log_error(f"IO error reading log: {e}")
+                    self.tailer.untrack(log.path)
+                    break
+                if lines is None:
+                    self.checkpoint.set(log.path, log.inode, log.offset)
+                    break
+                total += self._process_lines(log, lines)
+        return total
+
+    def _process_lines(self, log: TrackedLog, lines: List[bytes]) -> int:
+        """Run detection over a batch of complete lines. Returns their size in bytes."""
+        read_at = time.time()
+        # Lines come without their newlines
+        size = sum(len(line) for line in lines) + len(lines)
+        self.metrics.lines_read.inc(len(lines))
+        self.metrics.bytes_read.inc(size)
+        for line in lines:
+            if not line.strip():
+                continue
+
+            detection = self.detector.check_event(line)
+            if not detection:
+                continue
+            self.metrics.detections.inc(reason=detection.reason)
+            if not self.seen.add(event_key(detection.uuid, line)):
+                self.metrics.duplicate_detections.inc()
+                continue
+            if log.notified:
+                continue  # Already acted on for this session
+            on_handled = functools.partial(
+                self._detection_handled,
+                parse_event_time(detection.timestamp),
+                read_at,
+                time.time(),
+            )
+            self._handle_limit_detected(detection, log, on_handled)
+        return size
+
+    def _detection_handled(
+        self, event_time: Optional[float], read_at: float, matched_at: float
+    ) -> None:
+        """Record a detection's latency once its notification or restart is done."""
+        self.latency.record(event_time, read_at, matched_at, time.time())
+        self._save_stats()
+
+    def _save_stats(self) -> None:
+        """Write latency and runtime stats for 'claude-fallback status'."""
+        stats = {
+            "pid": os.getpid(),
+            "fleet": self.user is not None,
+            "started_at": self.started_at,
+            "watcher": self.watcher.name if self.watcher else None,
+            "wakeups_per_hour": self.wakeups.per_hour(),
+            **self.latency.to_dict(),
+        }
+        try:
+            save_stats(stats, self.stats_path, self.owner)
+        except OSError as e:
+            self._log_error(f"Failed to save stats: {e}")
 
-        except PermissionError as e:
-            log_error(f"Permission denied reading log: {e}")
-            self.current_log = None
-        except IOError as e:
-            log_error(f"IO error reading log: {e}")
-            self.current_log = None
+    def _start_metrics_server(self) -> None:
+        """Serve Prometheus metrics on localhost if metrics_port is configured."""
+        if not self.config.metrics_port:
+            return
+        try:
+            self.metrics_server = MetricsServer(self.metrics, self.config.metrics_port)
+        except OSError as e:
+            self._log_error(
+                f"Could not start metrics server on port {self.config.metrics_port}: {e}"
+            )
+            return
+        self.metrics_server.start()
+        print(f"Serving metrics on http://127.0.0.1:{self.metrics_server.port}/metrics")
+
+    def _start_control_server(self) -> None:
+        """Listen for control requests (status, stop, ...) from the CLI."""
+        handlers: Dict[str, Handler] = {
+            "status": self._control_status,
+            "stats": self._control_stats,
+            "stop": self._control_stop,
+            "clear": self._control_clear,
+            "reload": self._control_reload,
+            "memory": self._control_memory,
+        }
+        try:
+            self.control_server = ControlServer(handlers)
+        except (ControlError, OSError) as e:
+            self._log_error(f"Could not start control socket: {e}")
+            return
+        self.control_server.start()
+
+    def _control_status(self, request: dict) -> dict:
+        return {
+            "pid": os.getpid(),
+            "started_at": self.started_at,
+            "uptime": time.time() - self.started_at,
+            "watcher": self.watcher.name if self.watcher else None,
+            "mode": self.state.mode,
+            "limit_detected": self.state.limit_detected,
+            "limit_detected_at": self.state.limit_detected_at,
+            "sessions": [
+                {"path": str(log.path), "offset": log.offset, "notified": log.notified}
+                for log in list(self.tailer.logs.values())
+            ],
+        }
+
+    def _control_stats(self, request: dict) -> dict:
+        metrics = self.metrics
+        return {
+            "lines_read": metrics.lines_read.value(),
+            "bytes_read": metrics.bytes_read.value(),
+            "decode_failures": metrics.decode_failures.value(),
+            "files_tracked": metrics.files_tracked.value(),
+            "ticks": metrics.tick_duration.count,
+            "wakeups_per_hour": self.wakeups.per_hour(),
+            "poll_interval": getattr(self.watcher, "interval", None),
+            "detections_by_reason": metrics.detections.by_label("reason"),
+            "auto_restarts": metrics.auto_restarts.by_label("outcome"),
+            "duplicate_detections": metrics.duplicate_detections.value(),
+            "coalesced_detections": metrics.coalesced_detections.value(),
+            "rss": rss_bytes(),
+            "memory_sheds": metrics.memory_sheds.value(),
+            "notifications": {
+                "delivered": self.notifier.delivered,
+                "coalesced": self.notifier.coalesced,
+                "dropped": self.notifier.dropped,
+            },
+            **self.latency.to_dict(),
+        }
+
+    def _control_memory(self, request: dict) -> dict:
+        """Report memory use, and start tracing or take a snapshot (or stop tracing)."""
+        if request.get("stop"):
+            self.profiler.stop()
+            result: Dict[str, Any] = {"started": False, "stopped": True}
+        else:
+            result = self.profiler.snapshot(int(request.get("top", 10)))
+        return {
+            "rss": rss_bytes(),
+            "max_rss": self.memory_budget.max_bytes,
+            "sheds": self.metrics.memory_sheds.value(),
+            **result,
+        }
+
+    def _control_stop(self, request: dict) -> dict:
+        """Stop the monitor and wait until it has finished shutting down."""
+        self.stop()
+        return {"stopped": self._stopped.wait(float(request.get("timeout", 10)))}
+
+    def _control_clear(self, request: dict) -> dict:
+        """Clear the limit state and re-arm notifications for tracked sessions."""
+        with State.transaction(self.home, self.owner) as state:
+            state.clear_limit()
+        self.state = state
+        for log in list(self.tailer.logs.values()):
+            log.notified = False
+        self.scheduler.reset()
+        return {"cleared": True}
+
+    def _control_reload(self, request: dict) -> dict:
+        """
+        Re-read the configuration.
 
-    def _handle_limit_detected(self, detection: dict) -> None:
-        """Handle a detected usage limit."""
-        self.notified_for_session = True
+        Most options take effect immediately, including the detection
+        rules; changes to watcher and metrics_port are reported as needing
+        a restart. Nothing is applied if the new configuration is invalid.
+        """
+        config = Config.load()
+        detector = self._create_detector(config)
+        detector.decode_failures = self.detector.decode_failures
+        self.detector = detector
+        restart_required = [
+            key
+            for key in ("watcher", "metrics_port")
+            if getattr(config, key) != getattr(self.config, key)
+        ]
+        self.config = config
+        self.tailer.max_open = config.max_open_logs
+        self.tailer.max_line_bytes = config.max_line_bytes
+        if isinstance(self.watcher, PollingWatcher):
+            schedule = self.watcher.schedule
+            schedule.min_interval = config.poll_min_interval
+            schedule.max_interval = max(config.poll_max_interval, config.poll_min_interval)
+            schedule.jitter = config.poll_jitter
+        self.notifier.timeout = config.notify_timeout
+        self.scheduler.coalesce_window = config.coalesce_window
+        self.scheduler.restart_interval = config.restart_interval
+        self.restarter.timeout = config.restart_timeout
+        if self.user is None:
+            self.memory_budget.max_bytes = int(config.max_rss_mb * MIB)
+        return {"reloaded": True, "restart_required": restart_required}
+
+    def _handle_limit_detected(
+        self, detection: Detection, log: TrackedLog, on_handled: Callable[[], None]
+    ) -> None:
+        """
+        Handle a detected usage limit, unless it is coalesced into an earlier one.
 
-        # Update state
-        self.state.set_limit_detected()
+        on_handled is called once the user has been told: when the
+        notification is delivered, or the auto-restart finished.
+        """
+        auto_restart = self.config.auto_restart and detection.action != "notify"
+        switch, restart = self.scheduler.plan(log.path.stem, auto_restart)
 
         # Get details for notification
-        details = detection.get("details", "Usage limit reached")
+        details = detection.details or "Usage limit reached"
+        self.journal.append(
+            "detection",
+            session=log.path.stem,
+            log=str(log.path),
+            reason=detection.reason,
+            details=details,
+            action=detection.action,
+            coalesced=not (switch or restart),
+        )
+        if not (switch or restart):
+            on_handled()
+            return
 
-        if self.config.auto_restart:
-            # Auto-restart mode: kill Claude and restart with API key
-            print(f"\n[LIMIT DETECTED] {details}")
-            print("Auto-restarting Claude in API mode...")
+        log.notified = True
+        # Acting on it: make sure a crash can't make us act on it again
+        self._flush_seen()
 
-            self.notifier.notify(
-                title="Claude Code Usage Limit",
-                message="Auto-switching to API mode...",
-            )
+        if switch:
+            with State.transaction(self.home, self.owner) as state:
+                state.set_limit_detected()
+            self.state = state
 
-            self._auto_restart_claude()
+        if auto_restart:
+            # Auto-restart mode: kill Claude and restart with API key
+            print(f"\n[LIMIT DETECTED] {details}")
+            if switch:
+                self.notifier.notify(
+                    title="Claude Code Usage Limit",
+                    message="Auto-switching to API mode...",
+                    # The restart, if any, finishes after the notification
+                    on_delivered=None if restart else on_handled,
+                )
+            if restart:
+                print("Auto-restarting Claude in API mode...")
+                self._auto_restart_claude(log, on_handled)
         else:
             # Manual mode: just notify
             self.notifier.notify(
                 title="Claude Code Usage Limit",
                 message=f"{details}\nRun 'claude-api' to switch to API mode",
+                on_delivered=on_handled,
             )
 
             print(f"\n[LIMIT DETECTED] {details}")
             print("Run 'claude-api' to switch to API billing mode")
 
-    def _auto_restart_claude(self) -> None:
-        """Kill running Claude process and restart with API key."""
-        try:
-            # Find Claude process and its working directory
-            result = subprocess.run(
-                ["pgrep", "-f", "claude"],
-                capture_output=True,
-                text=True,
-            )
-
-            if result.returncode != 0:
-                print("No Claude process found to restart")
-                return
-
-            pids = result.stdout.strip().split("\n")
-            claude_pid = None
-            working_dir = None
+    def _find_claude_process(self, log_path: Path) -> Tuple[Optional[int], Optional[str]]:
+        """
+        Find the PID and working directory of the Claude process for a session.
 
-            for pid in pids:
-                if not pid:
-                    continue
-                try:
-                    # Get working directory of the process
-                    # On macOS, use lsof; on Linux, use /proc
-                    if sys.platform == "darwin":
-                        lsof_result = subprocess.run(
-                            ["lsof", "-p", pid, "-Fn"],
-                            capture_output=True,
-                            text=True,
-                        )
-                        for line in lsof_result.stdout.split("\n"):
-                            if line.startswith("n") and line.endswith("cwd"):
-                                continue
-                            if line.startswith("n/"):
-                                # This is a file path, check if it's cwd
-                                pass
-                        # Fallback: use pwdx equivalent
-                        cwd_result = subprocess.run(
-                            ["lsof", "-a", "-p", pid, "-d", "cwd", "-Fn"],
-                            capture_output=True,
-                            text=True,
-                        )
-                        for line in cwd_result.stdout.split("\n"):
-                            if line.startswith("n/"):
-                                working_dir = line[1:]
-                                claude_pid = int(pid)
-                                break
-                    else:
-                        # Linux: read from /proc
-                        cwd_link = f"/proc/{pid}/cwd"
-                        if os.path.exists(cwd_link):
-                            working_dir = os.readlink(cwd_link)
-                            claude_pid = int(pid)
-                            break
-                except (ValueError, OSError):
-                    continue
+        Uses an in-process /proc scan where available, matching the exact
+        process writing log_path; otherwise falls back to pgrep and lsof.
+        """
+        if procscan.is_available():
+            process = procscan.find_session_process(
+                log_path,
+                self.base_path,
+                procscan.scan_processes(uid=self.user.uid if self.user else None),
+            )
+            if process is None:
+                return None, None
+            return process.pid, process.cwd
+        return self._find_claude_process_lsof()
+
+    def _find_claude_process_lsof(self) -> Tuple[Optional[int], Optional[str]]:
+        """Find a Claude process with pgrep and lsof (macOS, no /proc)."""
+        pgrep = ["pgrep", "-f", "claude"]
+        if self.user is not None:
+            pgrep[1:1] = ["-U", str(self.user.uid)]
+        result = subprocess.run(
+            pgrep,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            return None, None
+
+        for pid in result.stdout.strip().split("\n"):
+            if not pid or int(pid) == os.getpid():
+                continue
+            try:
+                cwd_result = subprocess.run(
+                    ["lsof", "-a", "-p", pid, "-d", "cwd", "-Fn"],
+                    capture_output=True,
+                    text=True,
+                )
+            except OSError:
+                continue
+            for line in cwd_result.stdout.split("\n"):
+                if line.startswith("n/"):
+                    return int(pid), line[1:]
+        return None, None
+
+    def _auto_restart_claude(
+        self, log: TrackedLog, on_done: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Restart the Claude process for a session with the API key, in the background."""
+        self.restarter.submit(self._restart_session, log.path, on_done)
+
+    def _restart_session(
+        self, log_path: Path, on_done: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Stop the Claude process writing log_path and resume its session in API mode.
 
-            if claude_pid and working_dir:
-                # Kill the Claude process
-                print(f"Stopping Claude (PID: {claude_pid})...")
-                os.kill(claude_pid, signal.SIGTERM)
-                time.sleep(1)
+        Runs on a restart worker thread, so sessions hitting the limit together
+        are all stopped and relaunched at the same time. on_done is called
+        when the restart has finished, whether it succeeded or not.
+        """
+        session = log_path.stem
+        try:
+            claude_pid, working_dir = self._find_claude_process(log_path)
 
-                # Start new Claude with API key
-                print(f"Starting Claude in API mode in {working_dir}...")
-                env = os.environ.copy()
-                env["ANTHROPIC_API_KEY"] = self.config.api_key
+            if claude_pid is None:
+                print(f"No Claude process found to restart for session {session}")
+                self._restart_outcome(session, "no_process")
+                return
 
-                subprocess.Popen(
-                    ["claude"],
-                    cwd=working_dir,
-                    env=env,
-                    start_new_session=True,
+            if working_dir:
+                if self.user is None:
+                    env = os.environ.copy()
+                    env["ANTHROPIC_API_KEY"] = self.config.api_key
+                    run_as: Dict[str, Any] = {}
+                else:
+                    # Only this user's own key, never the fleet daemon's environment
+                    env = self.user.environment(self.config.api_key)
+                    run_as = self.user.popen_kwargs()
+
+                # Stop Claude, then resume the session with the API key in its directory
+                print(f"Restarting Claude (PID: {claude_pid}) in API mode in {working_dir}...")
+                result = self.restarter.restart(
+                    claude_pid,
+                    ["claude", "--resume", session],
+                    working_dir,
+                    env,
+                    **run_as,
                 )
 
                 # Update state
-                self.state.switch_to_api()
-                print("Claude restarted in API mode")
+                with State.transaction(self.home, self.owner) as state:
+                    if state.mode != "api" or state.limit_detected:
+                        state.switch_to_api()
+                self.state = state
+                print(
+                    f"Claude restarted in API mode (PID: {result.new_pid}) after "
+                    f"{result.started_after:.2f}s{' (killed)' if result.killed else ''}"
+                )
+                self.metrics.restart_downtime.observe(result.started_after)
+                self._restart_outcome(
+                    session,
+                    "restarted",
+                    pid=claude_pid,
+                    cwd=working_dir,
+                    new_pid=result.new_pid,
+                    killed=result.killed,
+                    exited_after=round(result.exited_after, 3),
+                    downtime=round(result.started_after, 3),
+                )
             else:
                 print("Could not determine Claude working directory")
                 print("Run 'claude-api' manually to switch")
+                self._restart_outcome(session, "no_cwd", pid=claude_pid)
 
         except Exception as e:
-            log_error(f"Auto-restart failed: {e}")
+            self._restart_outcome(session, "failed", error=str(e))
+            self._log_error(f"Auto-restart failed: {e}")
             print(f"Auto-restart failed: {e}")
             print("Run 'claude-api' manually to switch")
+        finally:
+            if on_done is not None:
+                on_done()
+
+    def _restart_outcome(self, session: str, outcome: str, **fields: Any) -> None:
+        """Count an auto-restart outcome and add it to the journal."""
+        with self._restart_lock:
+            self.metrics.auto_restarts.inc(outcome=outcome)
+        self.journal.append("restart", session=session, outcome=outcome, **fields)
+
+    def tick(self, changed_paths: Optional[Set[Path]] = None) -> int:
+        """
+        Pick up changed session logs and check their new lines.
+
+        Args:
+            changed_paths: Files the watcher reported, or None to rescan everything
+
+        Returns:
+            Number of bytes read
+        """
+        tick_start = time.perf_counter()
+        if changed_paths is None:
+            changed = self.index.refresh()
+            self._prune_inactive()
+        else:
+            changed = self.index.update(changed_paths)
+
+        bytes_read = self._check_for_updates(self._sync_tracked(changed))
+        self.checkpoint.maybe_flush()
+        self.seen.maybe_flush()
+        self._check_memory()
+        self.metrics.tick_duration.observe(time.perf_counter() - tick_start)
+        return bytes_read
+
+    def _check_memory(self) -> None:
+        """Shed caches if the process has grown past max_rss_mb."""
+        rss = self.memory_budget.check()
+        if rss is None:
+            return
+        self.shed_caches()
+        after = rss_bytes() or 0
+        self._log_error(
+            f"Memory use {rss / MIB:.0f} MiB is over max_rss_mb "
+            f"({self.config.max_rss_mb:.0f}); shed caches, now {after / MIB:.0f} MiB"
+        )
+
+    def shed_caches(self) -> None:
+        """
+        Free what can be rebuilt or is no longer needed: open log handles,
+        logs gone idle, offsets of deleted logs and the last memory
+        snapshot, then return freed memory to the OS.
+
+        Offsets of existing logs are kept, so nothing is read twice or
+        skipped; a log that was dropped resumes from its checkpoint if it
+        becomes active again.
+        """
+        self.metrics.memory_sheds.inc()
+        self.tailer.close()
+        self._prune_inactive()
+        self.checkpoint.prune()
+        self.profiler.forget()
+        release_memory()
+
+    def close(self) -> None:
+        """Release open logs, finish restarts, deliver notifications and save offsets."""
+        self.tailer.close()
+        self.restarter.close()
+        self.notifier.close(timeout=self.notifier.timeout)
+        try:
+            self.checkpoint.flush()
+        except OSError as e:
+            self._log_error(f"Failed to save log offsets: {e}")
+        self._flush_seen()
+
+    def _flush_seen(self) -> None:
+        try:
+            self.seen.flush()
+        except OSError as e:
+            self._log_error(f"Failed to save handled events: {e}")
 
     def start(self) -> None:
         """Start the monitoring loop."""
         print(f"Watching {self.base_path} for Claude Code sessions...")
         print("Press Ctrl+C to stop\n")
 
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGUSR2, self._handle_memory_signal)
+
         self.running = True
+        self.checkpoint.load()
+        self.seen.load()
+        self.watcher = self._create_watcher()
+        print(f"Using {self.watcher.name} watcher and {self.detector.json_backend.name} decoder")
+        self._save_stats()
+        self._start_metrics_server()
+        self._start_control_server()
+
+        # None means "anything may have changed" and triggers a full rescan
+        changed_paths: Optional[Set[Path]] = None
+        # Retry delay after loop errors, doubling while they keep happening
+        error_backoff = AdaptiveInterval(1.0, 60.0)
 
         while self.running:
             try:
-                latest = self.find_latest_log()
-
-                # Switch to new session if detected
-                if latest and latest != self.current_log:
-                    print(f"Monitoring session: {latest.name}")
-                    self.current_log = latest
-                    self.last_pos = os.path.getsize(latest)
-                    self.notified_for_session = False  # Reset for new session
+                bytes_read = self.tick(changed_paths)
+                self.watcher.report(bytes_read > 0)
+                error_backoff.activity()
 
-                if self.current_log:
-                    self._check_for_updates()
-
-                time.sleep(2)  # Polling interval
+                changed_paths = self._wait_for_changes()
+                self.wakeups.mark()
+                self.metrics.wakeups.inc()
 
             except Exception as e:
-                log_error(f"Monitor loop error: {e}")
-                time.sleep(5)  # Back off on error
+                self._log_error(f"Monitor loop error: {e}")
+                changed_paths = None
+                self._wake.wait(error_backoff.next_delay())
+                error_backoff.idle()
+
+        self.watcher.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.close()
+        self._stopped.set()
+        if self.control_server is not None:
+            self.control_server.stop()
 
     def stop(self) -> None:
         """Stop monitoring."""
         self.running = False
+        self._wake.set()
+        if self.watcher is not None:
+            self.watcher.wakeup()
         print("Monitor stopped.")
 
 
-def write_pid_file() -> None:
-    """Write current PID to file."""
-    with open(PID_FILE, "w") as f:
-        f.write(str(os.getpid()))
-
-
-def remove_pid_file() -> None:
-    """Remove PID file on exit."""
-    if PID_FILE.exists():
-        os.remove(PID_FILE)
-
-
-def is_already_running() -> bool:
-    """Check if another monitor instance is already running."""
-    if not PID_FILE.exists():
-        return False
-
-    try:
-        with open(PID_FILE, "r") as f:
-            pid = int(f.read().strip())
-
-        # Check if process is actually running
-        os.kill(pid, 0)
-        return True
-    except (ProcessLookupError, ValueError, PermissionError):
-        # Process not running or invalid PID - clean up stale file
-        remove_pid_file()
-        return False
-
-
 def main() -> None:
     """Entry point for the monitor process (foreground or daemon)."""
     # Check for existing instance
@@ -287,6 +814,7 @@ def main() -> None:
 
     try:
         config = Config.load()
+        monitor = LogMonitor(config)
     except FileNotFoundError as e:
         print(f"Error: {e}")
         sys.exit(1)
@@ -298,7 +826,6 @@ def main() -> None:
     write_pid_file()
 
     try:
-        monitor = LogMonitor(config)
         monitor.start()
     except Exception as e:
         log_error(f"Fatal error: {e}")
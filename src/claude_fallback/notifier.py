@@ -3,29 +3,139 @@
 import platform
 import subprocess
 import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
 
 
 class Notifier:
     """Send notifications about usage limits."""
 
-    def __init__(self, enable_sound: bool = True):
+    def __init__(
+        self,
+        enable_sound: bool = True,
+        background: bool = False,
+        timeout: float = 5.0,
+        coalesce_window: float = 30.0,
+        max_backlog: int = 16,
+        run_as: Optional[Tuple[int, int]] = None,
+        env: Optional[Dict[str, str]] = None,
+    ):
         """
         Initialize notifier.
 
         Args:
             enable_sound: Whether to play notification sound
+            background: Deliver notifications from a worker thread so notify()
+                never blocks on osascript/notify-send
+            timeout: Seconds to wait for a single delivery before giving up
+            coalesce_window: Identical notifications within this many seconds
+                are only delivered once (background mode)
+            max_backlog: Maximum queued notifications; the oldest are dropped
+                when it is full (background mode)
+            run_as: (uid, gid) to run osascript/notify-send as, so a fleet
+                monitor can notify another user's desktop session
+            env: Environment for osascript/notify-send (defaults to ours)
         """
         self.enable_sound = enable_sound
         self.system = platform.system()
+        self.background = background
+        self.timeout = timeout
+        self.coalesce_window = coalesce_window
+        self.run_as = run_as
+        self.env = env
 
-    def notify(self, title: str, message: str):
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+        self._queue: Deque[Tuple[str, str, Optional[Callable[[], None]]]] = deque(
+            maxlen=max_backlog
+        )
+        self._recent: Dict[Tuple[str, str], float] = {}
+        self._cond = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._closing = False
+
+    def notify(
+        self, title: str, message: str, on_delivered: Optional[Callable[[], None]] = None
+    ) -> None:
         """
         Send a notification to the user.
 
+        In background mode this only queues the notification and returns
+        immediately.
+
         Args:
             title: Notification title
             message: Notification message
+            on_delivered: Called once the notification has been delivered
+                (right away if an identical one was delivered recently, never
+                if it is dropped from a full backlog)
+        """
+        if not self.background:
+            self._deliver(title, message)
+            if on_delivered is not None:
+                on_delivered()
+            return
+
+        key = (title, message)
+        now = time.monotonic()
+        with self._cond:
+            last = self._recent.get(key)
+            if last is not None and now - last < self.coalesce_window:
+                self.coalesced += 1
+                coalesced = True
+            else:
+                coalesced = False
+                self._recent = {
+                    k: t for k, t in self._recent.items() if now - t < self.coalesce_window
+                }
+                self._recent[key] = now
+
+                if len(self._queue) == self._queue.maxlen:
+                    self.dropped += 1  # deque drops the oldest entry on append
+                self._queue.append((title, message, on_delivered))
+
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="notifier", daemon=True
+                    )
+                    self._worker.start()
+                self._cond.notify()
+        if coalesced and on_delivered is not None:
+            on_delivered()
+
+    def _run(self) -> None:
+        """Worker loop delivering queued notifications."""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                title, message, on_delivered = self._queue.popleft()
+            self._deliver(title, message)
+            if on_delivered is not None:
+                on_delivered()
+
+    def close(self, timeout: Optional[float] = None) -> None:
         """
+        Stop the worker after it delivers what is already queued.
+
+        Args:
+            timeout: Maximum seconds to wait for pending deliveries
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join(timeout)
+
+    def _deliver(self, title: str, message: str) -> None:
+        """Deliver a notification using the platform's mechanism."""
+        self.delivered += 1
         if self.system == "Darwin":
             self._notify_macos(title, message)
         elif self.system == "Linux":
@@ -33,6 +143,19 @@ class Notifier:
         else:
             self._notify_fallback(title, message)
 
+    def _run_kwargs(self) -> Dict[str, Any]:
+        """Extra subprocess.run arguments routing the delivery to our user."""
+        kwargs: Dict[str, Any] = {"timeout": self.timeout}
+        if self.env is not None:
+            kwargs["env"] = self.env
+        if self.run_as is not None:
+            if sys.version_info < (3, 9):
+                # No safe way to drop privileges in a threaded process
+                raise OSError("Notifying as another user requires Python 3.9+")
+            kwargs["user"], kwargs["group"] = self.run_as
+            kwargs["extra_groups"] = []
+        return kwargs
+
     def _notify_macos(self, title: str, message: str):
         """Send notification on macOS using osascript."""
         try:
@@ -41,7 +164,8 @@ class Notifier:
             subprocess.run(
                 ["osascript", "-e", script],
                 check=False,
-                capture_output=True
+                capture_output=True,
+                **self._run_kwargs(),
             )
         except Exception:
             self._notify_fallback(title, message)
@@ -52,7 +176,7 @@ class Notifier:
             cmd = ["notify-send", title, message]
             if self.enable_sound:
                 cmd.extend(["-u", "critical"])
-            subprocess.run(cmd, check=False, capture_output=True)
+            subprocess.run(cmd, check=False, capture_output=True, **self._run_kwargs())
         except Exception:
             self._notify_fallback(title, message)
 
@@ -0,0 +1,51 @@
+"""PID file handling for the background monitor.
+
+Kept free of heavy imports so CLI commands like status and stop can check
+on the monitor without loading it.
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+# PID file location
+PID_FILE = Path.home() / ".claude_fallback.pid"
+
+
+def read_pid() -> Optional[int]:
+    """Return the PID recorded in the PID file, or None if missing or invalid."""
+    try:
+        with open(PID_FILE) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_pid_file() -> None:
+    """Write current PID to file."""
+    with open(PID_FILE, "w") as f:
+        f.write(str(os.getpid()))
+
+
+def remove_pid_file() -> None:
+    """Remove PID file on exit."""
+    if PID_FILE.exists():
+        os.remove(PID_FILE)
+
+
+def is_already_running() -> bool:
+    """Check if another monitor instance is already running."""
+    if not PID_FILE.exists():
+        return False
+
+    try:
+        with open(PID_FILE) as f:
+            pid = int(f.read().strip())
+
+        # Check if process is actually running
+        os.kill(pid, 0)
+        return True
+    except (ProcessLookupError, ValueError, PermissionError):
+        # Process not running or invalid PID - clean up stale file
+        remove_pid_file()
+        return False
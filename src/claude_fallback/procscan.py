@@ -0,0 +1,155 @@
+"""In-process discovery of running Claude Code processes via /proc."""
+
+import os
+from pathlib import Path
+from typing import List, Optional
+
+PROC_ROOT = "/proc"
+
+
+class ClaudeProcess:
+    """A running Claude Code process and the session logs it has open."""
+
+    __slots__ = ("pid", "cwd", "cmdline", "open_logs")
+
+    def __init__(self, pid: int, cwd: Optional[str], cmdline: List[str], open_logs: List[str]):
+        self.pid = pid
+        self.cwd = cwd
+        self.cmdline = cmdline
+        self.open_logs = open_logs
+
+    def __repr__(self) -> str:
+        return f"ClaudeProcess(pid={self.pid}, cwd={self.cwd!r})"
+
+
+def is_available(proc_root: str = PROC_ROOT) -> bool:
+    """Check whether a Linux-style /proc filesystem is mounted."""
+    return os.path.isdir(os.path.join(proc_root, "self", "fd"))
+
+
+def is_claude_cmdline(argv: List[str]) -> bool:
+    """
+    Check whether a command line belongs to Claude Code.
+
+    Matches the native "claude" binary and node running the claude-code
+    package, but not claude-fallback or its monitor.
+    """
+    if not argv:
+        return False
+    joined = " ".join(argv)
+    if "claude_fallback" in joined or "claude-fallback" in joined:
+        return False
+    for arg in argv[:2]:
+        if os.path.basename(arg) == "claude" or "@anthropic-ai/claude-code" in arg:
+            return True
+    return False
+
+
+def encode_project_dir(cwd: str) -> str:
+    """Return the ~/.claude/projects directory name Claude Code uses for cwd."""
+    return "".join("-" if c in "/." else c for c in cwd)
+
+
+def _read_process(
+    pid: int, proc_root: str, with_fds: bool, uid: Optional[int] = None
+) -> Optional[ClaudeProcess]:
+    base = os.path.join(proc_root, str(pid))
+    if uid is not None:
+        try:
+            if os.stat(base).st_uid != uid:
+                return None
+        except OSError:
+            return None
+    try:
+        with open(os.path.join(base, "cmdline"), "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+
+    # Cheap rejection before decoding anything
+    if b"claude" not in raw:
+        return None
+    argv = [os.fsdecode(arg) for arg in raw.split(b"\0") if arg]
+    if not is_claude_cmdline(argv):
+        return None
+
+    try:
+        cwd: Optional[str] = os.readlink(os.path.join(base, "cwd"))
+    except OSError:
+        cwd = None
+
+    open_logs = []
+    if with_fds:
+        fd_dir = os.path.join(base, "fd")
+        try:
+            with os.scandir(fd_dir) as it:
+                for entry in it:
+                    try:
+                        target = os.readlink(entry.path)
+                    except OSError:
+                        continue
+                    if target.endswith(".jsonl"):
+                        open_logs.append(target)
+        except OSError:
+            pass
+
+    return ClaudeProcess(pid, cwd, argv, open_logs)
+
+
+def scan_processes(
+    proc_root: str = PROC_ROOT, with_fds: bool = True, uid: Optional[int] = None
+) -> List[ClaudeProcess]:
+    """
+    List running Claude Code processes without spawning any subprocesses.
+
+    Only each process's cmdline is read up front; cwd and open file
+    descriptors are only inspected for processes that look like Claude.
+    The current process is always excluded.
+
+    Args:
+        proc_root: Mount point of the proc filesystem
+        with_fds: Also collect the .jsonl files each process has open
+        uid: Only include processes owned by this user
+    """
+    own_pid = os.getpid()
+    processes: List[ClaudeProcess] = []
+    try:
+        entries = os.listdir(proc_root)
+    except OSError:
+        return processes
+
+    for name in entries:
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        if pid == own_pid:
+            continue
+        process = _read_process(pid, proc_root, with_fds, uid)
+        if process is not None:
+            processes.append(process)
+    return processes
+
+
+def find_session_process(
+    log_path: Path, base_path: Path, processes: List[ClaudeProcess]
+) -> Optional[ClaudeProcess]:
+    """
+    Find the Claude process writing to a session log.
+
+    Prefers a process that holds the log open. Otherwise falls back to a
+    process whose working directory maps to the log's project directory.
+    Returns None rather than guessing when neither matches.
+    """
+    target = os.path.realpath(log_path)
+    for process in processes:
+        if target in process.open_logs:
+            return process
+
+    try:
+        project_dir = log_path.relative_to(base_path).parts[0]
+    except (ValueError, IndexError):
+        return None
+    candidates = [p for p in processes if p.cwd and encode_project_dir(p.cwd) == project_dir]
+    if len(candidates) == 1:
+        return candidates[0]
+    return None
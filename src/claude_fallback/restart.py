@@ -0,0 +1,175 @@
+"""Stopping and relaunching Claude processes, many at a time."""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Restarts running at the same time; any more wait for a free worker
+MAX_PARALLEL_RESTARTS = 32
+
+# Seconds between checks of whether a stopped process has exited
+POLL_INTERVAL = 0.02
+
+
+class RestartError(Exception):
+    """A process could not be restarted."""
+
+
+class RestartResult:
+    """How one restart went. Times are in seconds from the SIGTERM."""
+
+    __slots__ = ("pid", "new_pid", "killed", "exited_after", "started_after")
+
+    def __init__(
+        self, pid: int, new_pid: int, killed: bool, exited_after: float, started_after: float
+    ):
+        self.pid = pid
+        self.new_pid = new_pid
+        self.killed = killed
+        self.exited_after = exited_after
+        self.started_after = started_after
+
+    def __repr__(self) -> str:
+        return (
+            f"RestartResult(pid={self.pid}, new_pid={self.new_pid}, killed={self.killed}, "
+            f"started_after={self.started_after:.3f})"
+        )
+
+
+def process_exited(pid: int) -> bool:
+    """
+    Check whether pid is gone, reaping it if it is our own child.
+
+    A zombie counts as gone: it has stopped writing, and its parent (usually
+    the user's shell) may take a while to reap it.
+    """
+    try:
+        waited, _status = os.waitpid(pid, os.WNOHANG)
+        if waited == pid:
+            return True
+    except ChildProcessError:
+        pass  # Not our child: its parent reaps it
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            # The state follows the command name, which may itself hold ")"
+            return f.read().rsplit(b")", 1)[1].split()[0] == b"Z"
+    except FileNotFoundError:
+        return True
+    except (OSError, IndexError):
+        pass  # No /proc (macOS)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # Alive, owned by someone else
+    return False
+
+
+class RestartOrchestrator:
+    """
+    Restarts Claude processes in parallel.
+
+    Each restart sends SIGTERM, polls until the process has exited (sending
+    SIGKILL after timeout seconds) and only then starts the new process, so
+    two Claudes never write the same session. Restarts submitted together
+    run in parallel on worker threads, so the downtime of each doesn't
+    depend on how many sessions are restarted, and the caller never waits.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        kill_timeout: float = 5.0,
+        max_workers: int = MAX_PARALLEL_RESTARTS,
+    ):
+        """
+        Args:
+            timeout: Seconds to wait for a process to exit after SIGTERM
+            kill_timeout: Seconds to wait after SIGKILL before giving up
+            max_workers: Maximum restarts running at once
+        """
+        self.timeout = timeout
+        self.kill_timeout = kill_timeout
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._restarting: Set[int] = set()
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> None:
+        """Run func(*args) on a restart worker thread."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="restart"
+                )
+            self._executor.submit(func, *args)
+
+    def restart(
+        self,
+        pid: int,
+        command: List[str],
+        cwd: str,
+        env: Dict[str, str],
+        **popen_kwargs: Any,
+    ) -> RestartResult:
+        """
+        Stop pid and start command in its place.
+
+        Args:
+            pid: Process to stop
+            command: Command line of the new process
+            cwd: Working directory of the new process
+            env: Environment of the new process
+            **popen_kwargs: Extra subprocess.Popen arguments (e.g. user and group)
+
+        Raises:
+            RestartError: If pid is already being restarted or won't exit
+            OSError: If pid can't be signalled or command can't be started
+        """
+        with self._lock:
+            if pid in self._restarting:
+                raise RestartError(f"PID {pid} is already being restarted")
+            self._restarting.add(pid)
+        try:
+            start = time.monotonic()
+            os.kill(pid, signal.SIGTERM)
+            killed = not self._wait_for_exit(pid, self.timeout)
+            if killed:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                if not self._wait_for_exit(pid, self.kill_timeout):
+                    raise RestartError(f"PID {pid} did not exit after SIGKILL")
+            exited_after = time.monotonic() - start
+
+            process = subprocess.Popen(
+                command, cwd=cwd, env=env, start_new_session=True, **popen_kwargs
+            )
+            return RestartResult(
+                pid, process.pid, killed, exited_after, time.monotonic() - start
+            )
+        finally:
+            with self._lock:
+                self._restarting.discard(pid)
+
+    @staticmethod
+    def _wait_for_exit(pid: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not process_exited(pid):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def close(self, wait: bool = True) -> None:
+        """Stop accepting restarts, by default after finishing those in progress."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
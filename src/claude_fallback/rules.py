@@ -0,0 +1,517 @@
+"""Detection rules: which session log events count as usage limits.
+
+Rules come from DEFAULT_RULES or a JSON rules file (the rules_file
+option). Each rule looks at one or more fields of an event, given as dotted
+paths where "[]" steps into every item of a list and "[key=value]" only
+into the items whose key has that value:
+
+    {
+      "rules": [
+        {
+          "name": "quota_fr",
+          "fields": ["message.content[type=text].text"],
+          "contains": ["limite d'utilisation"],
+          "action": "notify",
+          "details": "Limite d'utilisation atteinte"
+        }
+      ],
+      "include_defaults": true
+    }
+
+A rule matches when any of its fields contains one of its "contains"
+substrings, matches one of its "regex" patterns or equals one of its
+"equals" values (all case-insensitive), and every "when" field has the
+given value. Regex rules should list in "requires" some literal text that
+every match contains (e.g. "limit" for "limit of \\d+ reached"); without
+it, every line has to be decoded and the regex tried on every event.
+Rules are tried in file order and the first match wins, with the file's
+rules ahead of the defaults. Actions:
+
+    switch   the default: notify, and auto-restart if auto_restart is on
+    notify   notify only, never auto-restart
+    ignore   not a usage limit; stops later rules from matching
+
+"details" is the notification text. {value} is replaced by the matched
+field and {some.path} by another field of the event; given a list of
+templates, the first whose placeholders all resolve is used.
+
+Rules are compiled per field rather than evaluated one by one: all
+substrings and "requires" texts for a field become one trie-shaped regex,
+regexes only run when their "requires" text was found and "equals"
+values go into a dict, so the cost of checking an event barely grows with
+the number of rules.
+"""
+
+import itertools
+import re
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from claude_fallback.fileutil import read_json
+
+ACTIONS = ("switch", "notify", "ignore")
+
+# Patterns checked by the built-in rules
+LIMIT_PATTERNS = [
+    "usage limit",
+    "rate limit",
+    "usage resets",
+    "overloaded_error",
+    "rate_limit_error",
+]
+
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "name": "error_type",
+        "when": {"type": "error"},
+        "fields": ["error.type", "error.message"],
+        "contains": LIMIT_PATTERNS,
+        "details": ["{error.message}", "Rate limit error"],
+    },
+    {
+        "name": "message_content",
+        "when": {"type": "assistant"},
+        # Only text blocks: tool calls and results quote arbitrary content
+        "fields": ["message.content[type=text].text"],
+        "contains": LIMIT_PATTERNS,
+        "details": "Usage limit mentioned in response",
+    },
+    {
+        "name": "stop_reason",
+        "fields": ["message.stop_reason"],
+        "equals": ["rate_limit", "overloaded"],
+        "details": "Stop reason: {value}",
+    },
+]
+
+# Shortest usable prefilter token; see _prefilter_token
+MIN_TOKEN_LENGTH = 3
+
+Path_ = Tuple[str, ...]
+
+_PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+_PATH_PART = re.compile(r"([^\[\]]*)((?:\[[^\[\]]*\])*)$")
+_PATH_STEP = re.compile(r"\[([^\[\]=]*)(?:=([^\[\]]*))?\]")
+
+
+def parse_path(path: str) -> Path_:
+    """
+    Split "message.content[].text" into ("message", "content", "[]", "text").
+
+    A filtered step such as "[type=text]" is kept as it is written.
+    """
+    parts: List[str] = []
+    for part in path.split("."):
+        match = _PATH_PART.match(part)
+        if not part or match is None:
+            raise ValueError(f"Invalid field path: {path!r}")
+        name, lists = match.groups()
+        if name:
+            parts.append(name)
+        for step in _PATH_STEP.finditer(lists):
+            key, value = step.groups()
+            if bool(key) != (value is not None):
+                raise ValueError(f"Invalid field path: {path!r}")
+            parts.append(step.group())
+    return tuple(parts)
+
+
+def item_filter(part: str) -> Optional[Tuple[str, str]]:
+    """The (key, value) of a "[key=value]" path step, or None for any other step."""
+    if part[:1] != "[" or part == "[]":
+        return None
+    key, _, value = part[1:-1].partition("=")
+    return key, value
+
+
+def resolve(event: Any, path: Path_) -> Iterator[Any]:
+    """Yield every value found at path in a decoded event (nothing if absent)."""
+    if not path:
+        yield event
+        return
+    head, rest = path[0], path[1:]
+    if head[:1] == "[":
+        if isinstance(event, list):
+            condition = item_filter(head)
+            for item in event:
+                if condition is None or (
+                    isinstance(item, dict) and item.get(condition[0]) == condition[1]
+                ):
+                    yield from resolve(item, rest)
+    elif isinstance(event, dict) and head in event:
+        yield from resolve(event[head], rest)
+
+
+def _text(value: Any) -> Optional[str]:
+    """The string form of a scalar field, or None for objects, lists and booleans."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return None
+
+
+def _strings(data: Dict[str, Any], key: str, context: str) -> List[str]:
+    value = data.get(key, [])
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{context}: {key} must be a string or a list of strings")
+    return value
+
+
+class Rule:
+    """One detection rule, validated."""
+
+    def __init__(
+        self,
+        name: str,
+        fields: Sequence[str],
+        contains: Sequence[str] = (),
+        regex: Sequence[str] = (),
+        equals: Sequence[str] = (),
+        when: Optional[Dict[str, Any]] = None,
+        action: str = "switch",
+        details: Sequence[str] = (),
+        requires: Sequence[str] = (),
+    ):
+        """
+        Validate and normalize a rule.
+
+        Args:
+            name: Reported as the detection's reason
+            fields: Dotted paths of the fields to look at
+            contains: Case-insensitive substrings
+            regex: Case-insensitive regular expressions
+            equals: Case-insensitive exact values
+            when: Field path -> value that must also hold (exact match)
+            action: "switch", "notify" or "ignore"
+            details: Notification text templates
+            requires: Text that every match of the regexes contains; lets
+                regex rules be indexed and prefiltered like substrings
+
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        if not fields:
+            raise ValueError(f"Rule {name!r}: at least one field is required")
+        if not (contains or regex or equals):
+            raise ValueError(f"Rule {name!r}: needs contains, regex or equals")
+        if requires and not regex:
+            raise ValueError(f"Rule {name!r}: requires only applies to regex rules")
+        if action not in ACTIONS:
+            raise ValueError(
+                f"Rule {name!r}: invalid action {action!r}, expected one of {', '.join(ACTIONS)}"
+            )
+        for pattern in regex:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Rule {name!r}: invalid regex {pattern!r}: {e}") from None
+        for template in details:
+            for key in _PLACEHOLDER.findall(template):
+                if key != "value":
+                    parse_path(key)
+
+        self.name = name
+        self.fields = [parse_path(field) for field in fields]
+        self.contains = [s.lower() for s in contains if s]
+        self.regex = list(regex)
+        self.equals = [s.lower() for s in equals]
+        self.when = [(parse_path(path), value) for path, value in (when or {}).items()]
+        self.action = action
+        self.details = list(details) or [name]
+        self.requires = [s.lower() for s in requires if s]
+
+    @classmethod
+    def from_dict(cls, data: Any, position: int = 0) -> "Rule":
+        """
+        Build a rule from its JSON form.
+
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"Rule #{position + 1}: expected an object")
+        name = data.get("name") or f"rule_{position + 1}"
+        context = f"Rule {name!r}"
+        when = data.get("when", {})
+        if not isinstance(when, dict):
+            raise ValueError(f"{context}: when must be an object")
+        return cls(
+            name=str(name),
+            fields=_strings(data, "fields", context) + _strings(data, "field", context),
+            contains=_strings(data, "contains", context),
+            regex=_strings(data, "regex", context),
+            equals=_strings(data, "equals", context),
+            when=when,
+            action=data.get("action", "switch"),
+            details=_strings(data, "details", context),
+            requires=_strings(data, "requires", context),
+        )
+
+    def applies_to(self, event: Any) -> bool:
+        """Check the rule's "when" conditions."""
+        return all(
+            any(value == expected for value in resolve(event, path))
+            for path, expected in self.when
+        )
+
+    def paths(self) -> List[Path_]:
+        """Every field path the rule reads: fields, when keys and details placeholders."""
+        paths = list(self.fields) + [path for path, _expected in self.when]
+        for template in self.details:
+            keys = _PLACEHOLDER.findall(template)
+            paths.extend(parse_path(key) for key in keys if key != "value")
+        return paths
+
+    def render_details(self, event: Any, value: str) -> str:
+        """Fill in the first details template whose placeholders all resolve."""
+        for template in self.details:
+            missing = False
+
+            def substitute(match: "re.Match") -> str:
+                nonlocal missing
+                key = match.group(1)
+                if key == "value":
+                    return value
+                for found in resolve(event, parse_path(key)):
+                    text = _text(found)
+                    if text is not None:
+                        return text
+                missing = True
+                return ""
+
+            rendered = _PLACEHOLDER.sub(substitute, template)
+            if not missing:
+                return rendered
+        return self.name
+
+
+def default_rules() -> List[Rule]:
+    return [Rule.from_dict(data, i) for i, data in enumerate(DEFAULT_RULES)]
+
+
+def load_rules(path: str, owner_uid: Optional[int] = None) -> List[Rule]:
+    """
+    Load a rules file, followed by the defaults unless include_defaults is false.
+
+    Args:
+        path: JSON rules file ({"rules": [...]} or a bare list of rules)
+        owner_uid: Only read the file if it belongs to this user (fleet mode)
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it isn't valid JSON or a rule is malformed
+    """
+    data = read_json(path, owner_uid)
+    if isinstance(data, list):
+        data = {"rules": data}
+    if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+        raise ValueError(f"{path}: expected an object with a \"rules\" list")
+    rules = [Rule.from_dict(rule, i) for i, rule in enumerate(data["rules"])]
+    if data.get("include_defaults", True):
+        rules.extend(default_rules())
+    return rules
+
+
+def trie_pattern(literals: Iterable[str]) -> str:
+    """
+    Build a regex matching any of the literals, shaped as a trie.
+
+    A plain alternation tries every literal at every position; the trie form
+    branches on one character at a time, so the work per position is
+    bounded by the alphabet rather than the number of literals. Optional
+    tails are greedy, so the longest literal at a position wins.
+    """
+    trie: Dict[str, Any] = {}
+    for literal in literals:
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            body = f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+def _hidden_owners(literals: Iterable[str], owners: Dict[str, Set[int]]) -> Dict[str, Set[int]]:
+    """
+    Map each literal to the owners of every literal it contains.
+
+    A trie match reports the longest literal at a position, which hides any
+    shorter literal inside it; since the hidden ones are necessarily present
+    too, a match answers for all of them.
+    """
+    result = {}
+    for literal in literals:
+        ids: Set[int] = set()
+        for i in range(len(literal)):
+            for j in range(i + 1, len(literal) + 1):
+                ids.update(owners.get(literal[i:j], ()))
+        result[literal] = ids
+    return result
+
+
+class _FieldMatcher:
+    """Every rule's patterns for one field path, compiled together."""
+
+    def __init__(self, path: Path_, rules: Sequence[Tuple[int, Rule]]):
+        self.path = path
+        self._equals: Dict[str, Set[int]] = {}
+        self._regexes: Dict[int, List[Pattern[str]]] = {}
+        # Regex rules without "requires" text are tried on every value
+        self._ungated: List[int] = []
+
+        contains: Dict[str, Set[int]] = {}
+        gates: Dict[str, Set[int]] = {}
+        for index, rule in rules:
+            for literal in rule.contains:
+                contains.setdefault(literal, set()).add(index)
+            for value in rule.equals:
+                self._equals.setdefault(value, set()).add(index)
+            if rule.regex:
+                self._regexes[index] = [re.compile(p, re.IGNORECASE) for p in rule.regex]
+                for token in rule.requires or ():
+                    gates.setdefault(token, set()).add(index)
+                if not rule.requires:
+                    self._ungated.append(index)
+
+        # One trie over every literal: "contains" substrings, plus the
+        # "requires" text that decides which regex rules are worth running
+        literals = set(contains) | set(gates)
+        self._contains = _hidden_owners(literals, contains)
+        self._gates = _hidden_owners(literals, gates)
+        self._pattern = re.compile(trie_pattern(literals)) if literals else None
+
+    def match(self, event: Any, found: Dict[int, str]) -> None:
+        """Record rule index -> matched value for every rule this field satisfies."""
+        for raw in resolve(event, self.path):
+            value = _text(raw)
+            if value is None:
+                continue
+            lowered = value.lower()
+            for index in self._equals.get(lowered, ()):
+                found.setdefault(index, value)
+
+            gated: Set[int] = set()
+            if self._pattern is not None:
+                # Restart one character after each match start, so literals
+                # overlapping a previous match are found too
+                m = self._pattern.search(lowered)
+                while m is not None:
+                    literal = m.group()
+                    for index in self._contains[literal]:
+                        found.setdefault(index, value)
+                    gated.update(self._gates[literal])
+                    m = self._pattern.search(lowered, m.start() + 1)
+
+            for index in itertools.chain(gated, self._ungated):
+                if index not in found and any(rx.search(value) for rx in self._regexes[index]):
+                    found[index] = value
+
+
+class RuleSet:
+    """A list of rules compiled into one matcher per field."""
+
+    def __init__(self, rules: Optional[Sequence[Rule]] = None):
+        """
+        Compile the rules.
+
+        Args:
+            rules: Rules in priority order (defaults to the built-in rules)
+        """
+        self.rules = list(rules) if rules is not None else default_rules()
+        by_field: Dict[Path_, List[Tuple[int, Rule]]] = {}
+        for index, rule in enumerate(self.rules):
+            for path in rule.fields:
+                by_field.setdefault(path, []).append((index, rule))
+        self._fields = [_FieldMatcher(path, rules) for path, rules in by_field.items()]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def paths(self) -> List[Path_]:
+        """Every field path any rule reads, without duplicates."""
+        return list(dict.fromkeys(path for rule in self.rules for path in rule.paths()))
+
+    def tokens(self) -> Optional[List[str]]:
+        """
+        Return lowercase strings of which every matching raw line contains one.
+
+        Used to reject lines before JSON decoding. Returns None if no such
+        set exists, i.e. a regex rule gives no "requires" text or a pattern
+        has no usable literal text; every line must then be decoded.
+        """
+        tokens: Set[str] = set()
+        for rule in self.rules:
+            if rule.action == "ignore":
+                continue  # Can only suppress a match, never produce one
+            candidates = rule.contains + rule.equals
+            if rule.regex:
+                if not rule.requires:
+                    return None
+                candidates = candidates + rule.requires
+            for candidate in candidates:
+                token = _prefilter_token(candidate)
+                if token is None:
+                    return None
+                tokens.add(token)
+        return sorted(tokens)
+
+    def match(self, event: Any) -> Optional[Tuple[Rule, str]]:
+        """
+        Find the first rule matching a decoded event.
+
+        Returns:
+            (rule, matched value), or None if nothing matched or the first
+            match is an "ignore" rule
+        """
+        found: Dict[int, str] = {}
+        for field in self._fields:
+            field.match(event, found)
+        for index in sorted(found):
+            rule = self.rules[index]
+            if rule.applies_to(event):
+                return None if rule.action == "ignore" else (rule, found[index])
+        return None
+
+
+def _prefilter_token(text: str) -> Optional[str]:
+    """
+    Reduce a pattern to text guaranteed to appear in a raw matching line.
+
+    The raw line is JSON, so quotes, backslashes and control characters may
+    be escaped there; and the prefilter lowercases raw bytes ASCII-only, so
+    characters with a non-ASCII case mapping (é/É, but not 限) can't be
+    compared either. Patterns containing such characters contribute their
+    longest run of safe ones. Assumes other non-ASCII text is written as
+    UTF-8 rather than \\u escapes, as Claude Code does.
+    """
+    safe = "".join(c if _is_raw_safe(c) else "\0" for c in text)
+    best = max(safe.split("\0"), key=len)
+    return best if len(best) >= MIN_TOKEN_LENGTH else None
+
+
+def _is_raw_safe(char: str) -> bool:
+    if char.isascii():
+        return char >= " " and char not in '"\\'
+    return char.lower() == char.upper()
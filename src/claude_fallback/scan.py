@@ -0,0 +1,162 @@
+"""Parallel scan of historical session logs for usage limit events."""
+
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from claude_fallback.detector import UsageLimitDetector, parse_event_time
+from claude_fallback.rules import load_rules
+
+# Files are split into chunks of roughly this many bytes
+CHUNK_SIZE = 32 * 1024 * 1024
+
+_detector: Optional[UsageLimitDetector] = None
+_detector_rules: Optional[str] = None
+
+
+def find_logs(
+    base_path: Path, project: Optional[str] = None, since: Optional[float] = None
+) -> List[Tuple[str, int]]:
+    """
+    List session logs with their sizes.
+
+    Args:
+        base_path: Root of the Claude Code projects tree
+        project: Only include projects whose directory name contains this
+        since: Skip logs not modified since this Unix timestamp
+
+    Returns:
+        (path, size) pairs
+    """
+    pattern = str(base_path / "**" / "sessions" / "*.jsonl")
+    logs = []
+    for path in glob.glob(pattern, recursive=True):
+        if project is not None:
+            relative = Path(path).relative_to(base_path)
+            if project not in relative.parts[0]:
+                continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if since is not None and st.st_mtime < since:
+            continue
+        logs.append((path, st.st_size))
+    return logs
+
+
+def shard(
+    logs: List[Tuple[str, int]], chunk_size: int = CHUNK_SIZE
+) -> List[Tuple[str, int, int]]:
+    """
+    Split logs into (path, start, end) byte ranges, largest first.
+
+    Ranges are cut at arbitrary offsets; scan_chunk moves them to line
+    boundaries. Largest-first ordering keeps workers evenly loaded.
+    """
+    chunks = []
+    for path, size in logs:
+        for start in range(0, max(size, 1), chunk_size):
+            chunks.append((path, start, min(start + chunk_size, size)))
+    chunks.sort(key=lambda chunk: chunk[2] - chunk[1], reverse=True)
+    return chunks
+
+
+def _get_detector(rules_file: Optional[str]) -> UsageLimitDetector:
+    """Return this process's detector, rebuilt if the rules file changed."""
+    global _detector, _detector_rules
+    if _detector is None or _detector_rules != rules_file:
+        _detector = UsageLimitDetector(load_rules(rules_file) if rules_file else None)
+        _detector_rules = rules_file
+    return _detector
+
+
+def scan_chunk(
+    path: str,
+    start: int,
+    end: int,
+    since: Optional[float] = None,
+    rules_file: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run the detector over every line that starts within [start, end).
+
+    Args:
+        rules_file: Detection rules to use instead of the built-in ones
+
+    Returns:
+        One dict per detection with file, offset, timestamp, reason and details
+    """
+    detector = _get_detector(rules_file)
+
+    hits = []
+    with open(path, "rb") as f:
+        pos = start
+        if start > 0:
+            # The line straddling start belongs to the previous chunk
+            f.seek(start - 1)
+            pos = start - 1 + len(f.readline())
+
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            line_start = pos
+            pos += len(line)
+
+            detection = detector.check_event(line)
+            if not detection:
+                continue
+
+            timestamp = detection.timestamp
+            event_time = parse_event_time(timestamp)
+            if since is not None and event_time is not None and event_time < since:
+                continue
+
+            hits.append(
+                {
+                    "file": path,
+                    "offset": line_start,
+                    "timestamp": timestamp,
+                    "reason": detection.reason,
+                    "details": detection.details,
+                }
+            )
+    return hits
+
+
+def scan_logs(
+    base_path: Path,
+    project: Optional[str] = None,
+    since: Optional[float] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+    rules_file: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scan all matching session logs, yielding detections as chunks complete.
+
+    Small histories are scanned in-process; larger ones are spread across a
+    process pool.
+
+    Raises:
+        OSError, ValueError: If rules_file can't be loaded
+    """
+    logs = find_logs(base_path, project, since)
+    chunks = shard(logs, chunk_size)
+    total = sum(size for _path, size in logs)
+
+    if len(chunks) <= 1 or total < 2 * chunk_size or workers == 1:
+        for chunk in chunks:
+            yield from scan_chunk(*chunk, since=since, rules_file=rules_file)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(scan_chunk, *chunk, since=since, rules_file=rules_file)
+            for chunk in chunks
+        ]
+        for future in as_completed(futures):
+            yield from future.result()
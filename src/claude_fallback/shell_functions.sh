@@ -2,10 +2,20 @@
 # Shell functions for Claude Code API fallback
 # This file is sourced by your shell configuration (.zshrc, .bashrc, etc.)
 
-# State and flag files
-_CLAUDE_FALLBACK_STATE="$HOME/.claude_fallback_state.json"
+# Flag file (the state file is only ever written by claude_fallback.state)
 _CLAUDE_FALLBACK_FLAG="$HOME/.claude_fallback_active"
 
+# Record a mode switch in the state file. claude_fallback.state takes the
+# same lock as the monitor and replaces the file atomically.
+# CLAUDE_FALLBACK_PYTHON is set by 'claude-fallback install' to the
+# interpreter the package is installed in.
+_claude_fallback_set_mode() {
+    if ! "${CLAUDE_FALLBACK_PYTHON:-python3}" -m claude_fallback.state "$1" 2>/dev/null; then
+        echo "Warning: could not update the claude-fallback state file" \
+            "(run 'claude-fallback install' again to set CLAUDE_FALLBACK_PYTHON)" >&2
+    fi
+}
+
 # Switch Claude Code to API billing mode
 claude-api() {
     local api_key="${CLAUDE_FALLBACK_API_KEY}"
@@ -19,23 +29,7 @@ claude-api() {
     fi
 
     # Update state file
-    if command -v python3 &> /dev/null; then
-        python3 -c "
-import json
-from pathlib import Path
-from datetime import datetime
-state_file = Path.home() / '.claude_fallback_state.json'
-state = {'mode': 'api', 'limit_detected': False, 'last_switch_at': datetime.now().isoformat()}
-if state_file.exists():
-    try:
-        state.update(json.loads(state_file.read_text()))
-    except: pass
-state['mode'] = 'api'
-state['limit_detected'] = False
-state['last_switch_at'] = datetime.now().isoformat()
-state_file.write_text(json.dumps(state, indent=2))
-" 2>/dev/null
-    fi
+    _claude_fallback_set_mode api
 
     # Clear the flag file
     rm -f "$_CLAUDE_FALLBACK_FLAG"
@@ -49,23 +43,7 @@ state_file.write_text(json.dumps(state, indent=2))
 # Switch Claude Code back to subscription mode
 claude-sub() {
     # Update state file
-    if command -v python3 &> /dev/null; then
-        python3 -c "
-import json
-from pathlib import Path
-from datetime import datetime
-state_file = Path.home() / '.claude_fallback_state.json'
-state = {'mode': 'subscription', 'limit_detected': False, 'last_switch_at': datetime.now().isoformat()}
-if state_file.exists():
-    try:
-        state.update(json.loads(state_file.read_text()))
-    except: pass
-state['mode'] = 'subscription'
-state['limit_detected'] = False
-state['last_switch_at'] = datetime.now().isoformat()
-state_file.write_text(json.dumps(state, indent=2))
-" 2>/dev/null
-    fi
+    _claude_fallback_set_mode subscription
 
     # Clear the flag file
     rm -f "$_CLAUDE_FALLBACK_FLAG"
@@ -2,92 +2,205 @@
 
 import json
 import os
+import sys
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Tuple
+
+from claude_fallback.fileutil import Owner, atomic_write, create_file, file_lock
 
 
 class State:
-    """Manages persistent state for mode tracking and limit detection."""
+    """
+    Manages persistent state for mode tracking and limit detection.
+
+    The state file is always replaced atomically, so readers never see a
+    partial write. Writers (the monitor, the CLI and the shell functions)
+    serialize on an fcntl lock on LOCK_FILE; use State.transaction() for a
+    read-modify-write that must not lose a concurrent update.
+
+    By default the files live in the current user's home. Fleet mode passes
+    another user's home (and their uid/gid as owner) to load()/transaction().
+
+    Mode switches and clears are also added to the event journal, which
+    keeps the history this file overwrites.
+    """
 
     STATE_FILE = Path.home() / ".claude_fallback_state.json"
+    LOCK_FILE = Path.home() / ".claude_fallback_state.lock"
     FLAG_FILE = Path.home() / ".claude_fallback_active"
 
+    __slots__ = (
+        "mode",
+        "limit_detected",
+        "limit_detected_at",
+        "last_switch_at",
+        "home",
+        "owner",
+        "_dirty",
+        "_batch_depth",
+        "_lock_held",
+    )
+
     def __init__(
         self,
         mode: str = "subscription",
         limit_detected: bool = False,
         limit_detected_at: Optional[str] = None,
         last_switch_at: Optional[str] = None,
+        home: Optional[Path] = None,
+        owner: Optional[Owner] = None,
     ):
         self.mode = mode
         self.limit_detected = limit_detected
         self.limit_detected_at = limit_detected_at
         self.last_switch_at = last_switch_at
+        self.home = home
+        self.owner = owner
+        self._dirty = False
+        self._batch_depth = 0
+        self._lock_held = False
 
     @classmethod
-    def load(cls) -> "State":
+    def files(cls, home: Optional[Path] = None) -> Tuple[Path, Path, Path]:
+        """Return the (state, lock, flag) files in home, or the current user's."""
+        if home is None:
+            return cls.STATE_FILE, cls.LOCK_FILE, cls.FLAG_FILE
+        return (
+            home / cls.STATE_FILE.name,
+            home / cls.LOCK_FILE.name,
+            home / cls.FLAG_FILE.name,
+        )
+
+    @classmethod
+    def load(cls, home: Optional[Path] = None, owner: Optional[Owner] = None) -> "State":
         """Load state from file, creating default if not exists."""
-        if not cls.STATE_FILE.exists():
-            return cls()
+        state_file = cls.files(home)[0]
+        if not state_file.exists():
+            return cls(home=home, owner=owner)
 
         try:
-            with open(cls.STATE_FILE, "r") as f:
+            with open(state_file) as f:
                 data = json.load(f)
             return cls(
                 mode=data.get("mode", "subscription"),
                 limit_detected=data.get("limit_detected", False),
                 limit_detected_at=data.get("limit_detected_at"),
                 last_switch_at=data.get("last_switch_at"),
+                home=home,
+                owner=owner,
             )
-        except (json.JSONDecodeError, IOError):
-            return cls()
+        except (OSError, json.JSONDecodeError):
+            return cls(home=home, owner=owner)
 
-    def save(self) -> None:
-        """Save current state to file."""
-        data = {
+    @classmethod
+    @contextmanager
+    def transaction(
+        cls, home: Optional[Path] = None, owner: Optional[Owner] = None
+    ) -> Iterator["State"]:
+        """
+        Load, modify and save the state while holding the state lock.
+
+        Transitions made inside the block are written once, when it exits.
+
+        Example:
+            with State.transaction() as state:
+                state.switch_to_api()
+        """
+        with file_lock(cls.files(home)[1], owner):
+            state = cls.load(home, owner)
+            state._lock_held = True
+            try:
+                with state.batch():
+                    yield state
+            finally:
+                state._lock_held = False
+
+    @contextmanager
+    def batch(self) -> Iterator["State"]:
+        """Coalesce the transitions made inside the block into a single write."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self.save()
+
+    def to_dict(self) -> dict:
+        return {
             "mode": self.mode,
             "limit_detected": self.limit_detected,
             "limit_detected_at": self.limit_detected_at,
             "last_switch_at": self.last_switch_at,
         }
-        with open(self.STATE_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+
+    def save(self) -> None:
+        """Atomically write current state to file."""
+        state_file, lock_file, _flag = self.files(self.home)
+        data = json.dumps(self.to_dict(), indent=2)
+        if self._lock_held:
+            atomic_write(state_file, data, self.owner)
+        else:
+            with file_lock(lock_file, self.owner):
+                atomic_write(state_file, data, self.owner)
+        self._dirty = False
+
+    def _changed(self) -> None:
+        """Mark the state dirty, writing it now unless inside a batch."""
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.save()
 
     def set_limit_detected(self) -> None:
         """Mark that a usage limit was detected."""
         self.limit_detected = True
         self.limit_detected_at = datetime.now().isoformat()
-        self.save()
+        self._changed()
         # Also create flag file for shell functions
-        self.FLAG_FILE.touch()
+        os.close(create_file(self.files(self.home)[2], self.owner))
 
     def switch_to_api(self) -> None:
         """Switch to API mode."""
+        previous = self.mode
         self.mode = "api"
         self.limit_detected = False
         self.last_switch_at = datetime.now().isoformat()
-        self.save()
+        self._changed()
         self._clear_flag()
+        self._record("switch", mode="api", previous=previous)
 
     def switch_to_subscription(self) -> None:
         """Switch to subscription mode."""
+        previous = self.mode
         self.mode = "subscription"
         self.limit_detected = False
         self.last_switch_at = datetime.now().isoformat()
-        self.save()
+        self._changed()
         self._clear_flag()
+        self._record("switch", mode="subscription", previous=previous)
 
     def clear_limit(self) -> None:
         """Clear the limit detected flag without switching modes."""
         self.limit_detected = False
-        self.save()
+        self._changed()
         self._clear_flag()
+        self._record("clear")
 
     def _clear_flag(self) -> None:
         """Remove the flag file."""
-        if self.FLAG_FILE.exists():
-            os.remove(self.FLAG_FILE)
+        try:
+            os.remove(self.files(self.home)[2])
+        except FileNotFoundError:
+            pass
+
+    def _record(self, kind: str, **fields: str) -> None:
+        """Add a transition to the event journal."""
+        # Deferred: status loads State without ever writing it
+        from claude_fallback.journal import Journal
+
+        Journal(self.home, self.owner).append(kind, **fields)
 
     @classmethod
     def is_limit_active(cls) -> bool:
@@ -99,3 +212,29 @@ class State:
             f"State(mode={self.mode!r}, limit_detected={self.limit_detected}, "
             f"limit_detected_at={self.limit_detected_at!r})"
         )
+
+
+# Transitions available from the command line (used by shell_functions.sh)
+TRANSITIONS = {
+    "api": State.switch_to_api,
+    "subscription": State.switch_to_subscription,
+    "clear": State.clear_limit,
+}
+
+
+def main() -> None:
+    """
+    Apply a state transition without loading the rest of the CLI.
+
+    Usage: python3 -m claude_fallback.state {api,subscription,clear}
+    """
+    if len(sys.argv) != 2 or sys.argv[1] not in TRANSITIONS:
+        print(f"Usage: python3 -m claude_fallback.state {{{','.join(TRANSITIONS)}}}")
+        sys.exit(2)
+
+    with State.transaction() as state:
+        TRANSITIONS[sys.argv[1]](state)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Tailing of multiple concurrently active session logs."""
+
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import IO, Dict, Iterator, List
+
+# Bytes requested per read; a tick never holds more than this plus one
+# carried-over partial line per log in memory
+READ_CHUNK = 256 * 1024
+
+# To notice a log being rewritten, each read compares its first line (up to
+# HEAD_BYTES) and the MARK_BYTES that ended the previous read with what they
+# were. Session log lines all start alike, but end with their own uuid and
+# timestamp.
+HEAD_BYTES = 4096
+MARK_BYTES = 64
+
+
+class TrackedLog:
+    """Per-log tailing and detection state."""
+
+    __slots__ = (
+        "path",
+        "inode",
+        "head",
+        "mark",
+        "mark_end",
+        "offset",
+        "partial",
+        "skipping",
+        "notified",
+    )
+
+    def __init__(self, path: Path, offset: int = 0, inode: int = 0):
+        self.path = path
+        self.inode = inode
+        # First line of the log as last seen, and the bytes ending at
+        # mark_end when last read, to notice it being rewritten
+        self.head = b""
+        self.mark = b""
+        self.mark_end = 0
+        # End of the last complete line handed out (what gets checkpointed)
+        self.offset = offset
+        # Start of an incomplete line read past offset, kept until its newline arrives
+        self.partial = b""
+        # True while discarding the rest of a line longer than max_line_bytes
+        self.skipping = False
+        self.notified = False
+
+    def __repr__(self) -> str:
+        return f"TrackedLog(path={str(self.path)!r}, offset={self.offset})"
+
+
+class MultiTailer:
+    """
+    Tails many session logs at once with a bounded number of open files.
+
+    Each tracked log keeps its own offset. File handles are cached in LRU
+    order so logs written to every tick don't have to be reopened, while
+    idle ones are closed once more than max_open logs are in use.
+
+    Logs are read in binary, READ_CHUNK bytes at a time, and only complete
+    lines are returned; a line still being written is carried over to the
+    next read. A log that shrinks or is replaced by a new file is read again
+    from the start.
+    """
+
+    def __init__(
+        self,
+        max_open: int = 32,
+        max_line_bytes: int = 4 * 1024 * 1024,
+        follow_symlinks: bool = True,
+    ):
+        """
+        Initialize the tailer.
+
+        Args:
+            max_open: Maximum number of log files kept open at once
+            max_line_bytes: Longest line carried over between reads; longer
+                lines are skipped, which caps the memory held per log
+            follow_symlinks: Read logs that are symlinks; if False, opening
+                one fails with OSError (ELOOP), as in fleet mode
+        """
+        self.max_open = max_open
+        self.max_line_bytes = max_line_bytes
+        self.follow_symlinks = follow_symlinks
+        self.logs: Dict[Path, TrackedLog] = {}
+        self._handles: OrderedDict[Path, IO[bytes]] = OrderedDict()
+        # Logs found truncated or replaced, and lines skipped for length
+        self.resets = 0
+        self.skipped_lines = 0
+
+    def __contains__(self, path: Path) -> bool:
+        return path in self.logs
+
+    def __len__(self) -> int:
+        return len(self.logs)
+
+    def __iter__(self) -> Iterator[TrackedLog]:
+        return iter(list(self.logs.values()))
+
+    def track(self, path: Path, offset: int, inode: int = 0) -> TrackedLog:
+        """Start tailing path from offset (no-op if already tracked)."""
+        log = self.logs.get(path)
+        if log is None:
+            log = self.logs[path] = TrackedLog(path, offset, inode)
+        return log
+
+    def untrack(self, path: Path) -> None:
+        """Stop tailing path and close its handle."""
+        self.logs.pop(path, None)
+        self._close_handle(path)
+
+    def _close_handle(self, path: Path) -> None:
+        handle = self._handles.pop(path, None)
+        if handle is not None:
+            handle.close()
+
+    def _handle(self, path: Path) -> IO[bytes]:
+        """Return an open handle for path, evicting the least recently used."""
+        handle = self._handles.get(path)
+        if handle is not None:
+            self._handles.move_to_end(path)
+            return handle
+
+        flags = os.O_RDONLY | os.O_CLOEXEC
+        if not self.follow_symlinks:
+            flags |= os.O_NOFOLLOW
+        handle = os.fdopen(os.open(path, flags), "rb")
+        self._handles[path] = handle
+        while len(self._handles) > self.max_open:
+            _old_path, old_handle = self._handles.popitem(last=False)
+            old_handle.close()
+        return handle
+
+    def _open(self, log: TrackedLog) -> IO[bytes]:
+        """
+        Return log's handle, first starting over if the log was truncated or replaced.
+
+        Replacement shows as a new inode, truncation as a size below what was
+        already read. A log truncated and then rewritten past that point
+        between two reads is caught by its first line, or the last bytes
+        read before, no longer matching.
+        """
+        st = os.stat(log.path, follow_symlinks=self.follow_symlinks)
+        replaced = bool(log.inode) and st.st_ino != log.inode
+        if replaced:
+            # The cached handle still points at the old file
+            self._close_handle(log.path)
+        f = self._handle(log.path)
+        fd = f.fileno()
+        head = os.pread(fd, HEAD_BYTES, 0)
+        newline = head.find(b"\n")
+        if newline >= 0:
+            head = head[: newline + 1]
+        if (
+            replaced
+            or st.st_size < log.offset + len(log.partial)
+            or head[: len(log.head)] != log.head
+            or (log.mark and os.pread(fd, len(log.mark), log.mark_end - len(log.mark)) != log.mark)
+        ):
+            log.offset = 0
+            log.partial = b""
+            log.skipping = False
+            log.mark = b""
+            log.mark_end = 0
+            self.resets += 1
+        log.inode = st.st_ino
+        log.head = head
+        return f
+
+    @staticmethod
+    def _remember_mark(f: IO[bytes], log: TrackedLog) -> None:
+        """Keep the bytes ending at log.offset for the next rewrite check."""
+        size = min(MARK_BYTES, log.offset)
+        log.mark = os.pread(f.fileno(), size, log.offset - size)
+        log.mark_end = log.offset
+
+    def iter_new_lines(self, log: TrackedLog) -> Iterator[List[bytes]]:
+        """
+        Read the complete lines appended to log since its last offset.
+
+        Yields them in batches, one per chunk read, so memory use doesn't
+        depend on how much was appended. log.offset is advanced past each
+        batch before it is yielded. Lines are returned without their
+        trailing newline.
+
+        Raises:
+            OSError: If the log can't be opened or read (handle is dropped)
+        """
+        try:
+            f = self._open(log)
+            f.seek(log.offset + len(log.partial))
+        except OSError:
+            self._close_handle(log.path)
+            raise
+
+        while True:
+            try:
+                data = f.read(READ_CHUNK)
+                if not data and log.mark_end != log.offset:
+                    self._remember_mark(f, log)
+            except OSError:
+                self._close_handle(log.path)
+                raise
+            if not data:
+                return
+            lines = self._split(log, data)
+            if lines:
+                yield lines
+
+    def _split(self, log: TrackedLog, data: bytes) -> List[bytes]:
+        """Join data onto log's partial line and cut off the complete lines."""
+        lines = data.split(b"\n")
+        tail = lines.pop()
+        if not lines:
+            # Still inside the same line
+            if log.skipping:
+                log.offset += len(data)
+            else:
+                self._carry(log, data)
+            return []
+
+        log.offset += len(log.partial) + len(data) - len(tail)
+        if log.skipping:
+            del lines[0]
+            log.skipping = False
+        elif log.partial:
+            lines[0] = log.partial + lines[0]
+        log.partial = b""
+        self._carry(log, tail)
+
+        # Only a line joined to a partial one can be longer than a chunk
+        if lines and max(len(data), len(lines[0])) > self.max_line_bytes:
+            kept = [line for line in lines if len(line) <= self.max_line_bytes]
+            self.skipped_lines += len(lines) - len(kept)
+            lines = kept
+        return lines
+
+    def _carry(self, log: TrackedLog, tail: bytes) -> None:
+        """Keep an incomplete line for the next read, or skip it if too long."""
+        if not tail:
+            return
+        if len(log.partial) + len(tail) > self.max_line_bytes:
+            log.offset += len(log.partial) + len(tail)
+            log.partial = b""
+            log.skipping = True
+            self.skipped_lines += 1
+        else:
+            log.partial += tail
+
+    def close(self) -> None:
+        """Close all open handles."""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
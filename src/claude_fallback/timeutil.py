@@ -0,0 +1,24 @@
+"""Parsing of the time arguments taken by the CLI commands."""
+
+import re
+import time
+from datetime import datetime
+
+_SINCE_RE = re.compile(r"^(\d+)([smhdw])$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def parse_since(value: str) -> float:
+    """
+    Parse a --since value into a Unix timestamp.
+
+    Accepts relative durations ("30m", "12h", "7d", "2w") or an ISO date or
+    datetime ("2025-01-31", "2025-01-31T09:00:00").
+
+    Raises:
+        ValueError: If the value can't be parsed
+    """
+    match = _SINCE_RE.match(value.strip())
+    if match:
+        return time.time() - int(match.group(1)) * _UNITS[match.group(2)]
+    return datetime.fromisoformat(value.strip()).timestamp()
@@ -0,0 +1,103 @@
+"""Identity of a user whose home directory a fleet monitor watches."""
+
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from claude_fallback.fileutil import Owner
+
+# Per-user config file read by the fleet monitor (instead of config.json)
+USER_CONFIG_NAME = ".claude_fallback.json"
+
+DEFAULT_PATH = "/usr/local/bin:/usr/bin:/bin"
+
+
+class UserHome:
+    """A home directory together with the uid/gid and name of its owner."""
+
+    def __init__(self, path: Path, uid: int, gid: int, name: str, shell: str = "/bin/sh"):
+        self.path = path
+        self.uid = uid
+        self.gid = gid
+        self.name = name
+        self.shell = shell
+
+    @classmethod
+    def from_path(cls, path: Path) -> "UserHome":
+        """
+        Describe the owner of a home directory.
+
+        Raises:
+            OSError: If path can't be stat'ed
+        """
+        st = os.stat(path)
+        name, shell = str(st.st_uid), "/bin/sh"
+        try:
+            import pwd  # Deferred: Unix-only and unused outside fleet mode
+
+            entry = pwd.getpwuid(st.st_uid)
+            name, shell = entry.pw_name, entry.pw_shell or shell
+        except (ImportError, KeyError):
+            pass
+        return cls(path, st.st_uid, st.st_gid, name, shell)
+
+    @property
+    def owner(self) -> Owner:
+        return self.uid, self.gid
+
+    @property
+    def projects_dir(self) -> Path:
+        return self.path / ".claude" / "projects"
+
+    @property
+    def config_file(self) -> Path:
+        return self.path / USER_CONFIG_NAME
+
+    @property
+    def is_other_user(self) -> bool:
+        """True if acting for this user means dropping our privileges."""
+        return os.geteuid() != self.uid
+
+    def environment(self, api_key: Optional[str] = None) -> Dict[str, str]:
+        """
+        Build a minimal environment for processes started on the user's behalf.
+
+        Nothing is inherited from the monitor's own environment, so one
+        user's API key (or anything else) can never leak to another.
+
+        Args:
+            api_key: ANTHROPIC_API_KEY to include
+        """
+        env = {
+            "HOME": str(self.path),
+            "USER": self.name,
+            "LOGNAME": self.name,
+            "SHELL": self.shell,
+            "PATH": DEFAULT_PATH,
+        }
+        runtime_dir = Path("/run/user") / str(self.uid)
+        if runtime_dir.is_dir():
+            env["XDG_RUNTIME_DIR"] = str(runtime_dir)
+            # notify-send reaches the user's desktop through their session bus
+            env["DBUS_SESSION_BUS_ADDRESS"] = f"unix:path={runtime_dir / 'bus'}"
+        if api_key:
+            env["ANTHROPIC_API_KEY"] = api_key
+        return env
+
+    def popen_kwargs(self) -> Dict[str, Any]:
+        """
+        subprocess arguments that run a child as this user.
+
+        Raises:
+            OSError: If we'd have to switch users on Python < 3.9, which has
+                no safe way to do it from a threaded process
+        """
+        if not self.is_other_user:
+            return {}
+        if sys.version_info < (3, 9):
+            raise OSError(f"Acting as user {self.name} requires Python 3.9+")
+        return {"user": self.uid, "group": self.gid, "extra_groups": []}
+
+    def __repr__(self) -> str:
+        return f"UserHome({str(self.path)!r}, uid={self.uid}, name={self.name!r})"
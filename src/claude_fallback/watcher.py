@@ -0,0 +1,355 @@
+"""Filesystem watcher backends for the log monitor.
+
+On Linux the monitor subscribes to inotify events for the projects tree so it
+wakes up as soon as a session log is written. Everywhere else (or when inotify
+is unavailable or out of watch descriptors) it falls back to plain polling.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import random
+import selectors
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_MODIFY | IN_CREATE | IN_MOVED_TO | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+class WatcherError(Exception):
+    """Raised when a watcher backend cannot (or can no longer) be used."""
+
+
+def is_session_log(path: Path) -> bool:
+    """Check whether a path looks like a Claude Code session log."""
+    return path.suffix == ".jsonl" and path.parent.name == "sessions"
+
+
+class AdaptiveInterval:
+    """
+    Poll interval that backs off while idle and snaps back on activity.
+
+    Each idle poll multiplies the interval by factor, up to max_interval;
+    any activity resets it to min_interval. Delays are jittered by up to
+    +/- jitter (a fraction) so that many pollers don't wake in lockstep.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.5,
+        max_interval: float = 30.0,
+        factor: float = 2.0,
+        jitter: float = 0.1,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.factor = factor
+        self.jitter = jitter
+        self.interval = min_interval
+
+    def activity(self) -> None:
+        """Something changed: poll again soon."""
+        self.interval = self.min_interval
+
+    def idle(self) -> None:
+        """Nothing changed: back off."""
+        self.interval = min(self.interval * self.factor, self.max_interval)
+
+    def next_delay(self) -> float:
+        """Return the current interval with jitter applied."""
+        if not self.jitter:
+            return self.interval
+        return self.interval * (1 + self.jitter * (2 * random.random() - 1))
+
+
+class PollingWatcher:
+    """
+    Fallback watcher that polls on an adaptive interval.
+
+    The monitor calls report() after each poll; idle polls back off
+    exponentially and a poll that read new data snaps back to min_interval.
+    """
+
+    name = "polling"
+
+    def __init__(
+        self, min_interval: float = 0.5, max_interval: float = 30.0, jitter: float = 0.1
+    ):
+        """
+        Initialize the polling watcher.
+
+        Args:
+            min_interval: Seconds between polls while sessions are active
+            max_interval: Longest interval reached by idle backoff
+            jitter: Random variation applied to each interval (fraction)
+        """
+        self.schedule = AdaptiveInterval(min_interval, max_interval, jitter=jitter)
+        self._wakeup = threading.Event()
+
+    @property
+    def interval(self) -> float:
+        return self.schedule.interval
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        """
+        Sleep until the next poll is due or wakeup() is called.
+
+        Returns:
+            Always None, meaning any file may have changed
+        """
+        delay = self.schedule.next_delay()
+        self._wakeup.wait(delay if timeout is None else min(timeout, delay))
+        self._wakeup.clear()
+        return None
+
+    def report(self, active: bool) -> None:
+        """Adjust the interval after a poll that did (or didn't) find new data."""
+        if active:
+            self.schedule.activity()
+        else:
+            self.schedule.idle()
+
+    def wakeup(self) -> None:
+        """Interrupt a pending wait."""
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """Release resources (nothing to do for polling)."""
+
+
+class InotifyWatcher:
+    """Event-driven watcher backed by Linux inotify via ctypes."""
+
+    name = "inotify"
+
+    def __init__(self, base_path: Path):
+        """
+        Initialize inotify and watch every directory under base_path.
+
+        Args:
+            base_path: Root of the Claude Code projects tree
+
+        Raises:
+            WatcherError: If inotify is unavailable or watches cannot be added
+        """
+        if not sys.platform.startswith("linux"):
+            raise WatcherError("inotify is only available on Linux")
+
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            self._libc.inotify_init1.argtypes = [ctypes.c_int]
+            self._libc.inotify_add_watch.argtypes = [
+                ctypes.c_int,
+                ctypes.c_char_p,
+                ctypes.c_uint32,
+            ]
+        except (OSError, AttributeError) as e:
+            raise WatcherError(f"inotify not available: {e}") from e
+
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise WatcherError(f"inotify_init1 failed: {os.strerror(err)}")
+
+        self.fd = fd
+        self.base_path = base_path
+        # Further trees added with add_root() (fleet mode shares one instance)
+        self.roots: List[Path] = [base_path]
+        self._watches: Dict[int, Path] = {}
+        self._watched_dirs: Set[Path] = set()
+        # mtime (ns) of each watched directory when it was last listed
+        self._listed_mtimes: Dict[Path, int] = {}
+        # Self-pipe so stop() can interrupt a blocking wait
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.fd, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+
+        try:
+            self.sync()
+        except WatcherError:
+            self.close()
+            raise
+
+    def _add_watch(self, path: Path) -> None:
+        """Add a watch for a single directory."""
+        if path in self._watched_dirs:
+            return
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # Directory vanished or is unreadable, skip it
+            if err == errno.ENOSPC:
+                raise WatcherError("Out of inotify watch descriptors")
+            raise WatcherError(f"inotify_add_watch failed for {path}: {os.strerror(err)}")
+        self._watches[wd] = path
+        self._watched_dirs.add(path)
+
+    def _add_tree(self, root: Path) -> None:
+        """
+        Watch root and every directory beneath it.
+
+        Directories already listed whose mtime hasn't changed since are not
+        listed again: their subdirectories are already known. A directory's
+        watch is added before it is listed, so a subdirectory created after
+        the listing still shows up as an IN_CREATE event.
+        """
+        stack = [root]
+        while stack:
+            path = stack.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if self._listed_mtimes.get(path) == mtime:
+                    continue
+                self._add_watch(path)
+                if path not in self._watched_dirs:
+                    continue
+                with os.scandir(path) as entries:
+                    subdirs = [Path(e.path) for e in entries if e.is_dir(follow_symlinks=False)]
+            except (FileNotFoundError, NotADirectoryError, PermissionError):
+                continue
+            self._listed_mtimes[path] = mtime
+            stack.extend(subdirs)
+
+    def add_root(self, root: Path) -> None:
+        """
+        Also watch another projects tree.
+
+        Raises:
+            WatcherError: If watches cannot be added
+        """
+        self.roots.append(root)
+        if root.is_dir():
+            self._add_tree(root)
+
+    def sync(self) -> None:
+        """
+        Add watches for any directories not yet being watched.
+
+        Only roots and directories whose mtime changed since they were last
+        listed are read, so a sync of an unchanged tree costs one stat() per
+        directory.
+        """
+        for path in [*self.roots, *self._listed_mtimes]:
+            self._add_tree(path)
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[Set[Path]]:
+        """
+        Block until session logs change or the timeout expires.
+
+        Args:
+            timeout: Maximum seconds to wait, or None to wait indefinitely
+
+        Returns:
+            Set of session log paths that were modified or created, or None
+            if the caller should rescan everything (timeout or queue overflow)
+
+        Raises:
+            WatcherError: If new directories can no longer be watched
+        """
+        ready = self._selector.select(timeout)
+        if not ready:
+            # Periodic safety net: pick up directories created before their
+            # parent was watched, then let the caller do a full rescan.
+            self.sync()
+            return None
+
+        changed: Set[Path] = set()
+        if any(key.fd == self._wake_r for key, _events in ready):
+            try:
+                os.read(self._wake_r, _READ_SIZE)
+            except BlockingIOError:
+                pass
+        overflow = False
+
+        while True:
+            try:
+                buf = os.read(self.fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(buf):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+                offset += _EVENT_HEADER.size
+                raw_name = buf[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+
+                parent = self._watches.get(wd)
+                if parent is None:
+                    continue
+
+                if mask & IN_IGNORED:
+                    del self._watches[wd]
+                    self._watched_dirs.discard(parent)
+                    self._listed_mtimes.pop(parent, None)
+                    continue
+
+                if not raw_name:
+                    continue
+
+                path = parent / os.fsdecode(raw_name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # Files may appear before the watch is in place
+                        self._add_tree(path)
+                        for child in path.rglob("*.jsonl"):
+                            if is_session_log(child):
+                                changed.add(child)
+                elif is_session_log(path):
+                    changed.add(path)
+
+        if overflow:
+            self.sync()
+            return None
+        return changed
+
+    def report(self, active: bool) -> None:
+        """Event-driven: wakeups follow writes, so there is no interval to adapt."""
+
+    def wakeup(self) -> None:
+        """Interrupt a pending wait. Safe to call from a signal handler."""
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Close the inotify file descriptor."""
+        if self.fd < 0:
+            return
+        self._selector.close()
+        os.close(self.fd)
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self.fd = -1
+        self._watches.clear()
+        self._watched_dirs.clear()
+        self._listed_mtimes.clear()
+
@@ -0,0 +1,42 @@
+"""Tests for OffsetCheckpoint."""
+
+import os
+
+import pytest
+
+from claude_fallback.checkpoint import OffsetCheckpoint
+
+
+def test_offsets_survive_a_reload(tmp_path):
+    log = tmp_path / "session.jsonl"
+    log.write_bytes(b"{}\n")
+    inode = os.stat(log).st_ino
+    checkpoint = OffsetCheckpoint(tmp_path / "offsets.json")
+    checkpoint.set(log, inode, 3)
+    checkpoint.flush()
+
+    reloaded = OffsetCheckpoint(tmp_path / "offsets.json")
+    reloaded.load()
+    assert reloaded.get(log, inode) == 3
+    assert reloaded.get(log, inode + 1) is None
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "",
+        "{",
+        "[]",
+        '"offsets"',
+        '{"offsets": ["x"]}',
+        '{"offsets": "x"}',
+        '{"offsets": null}',
+        '{"offsets": {"1:/nonexistent": "x", "nope": [1, 2]}}',
+    ],
+)
+def test_malformed_checkpoint_is_ignored(tmp_path, content):
+    path = tmp_path / "offsets.json"
+    path.write_text(content)
+    checkpoint = OffsetCheckpoint(path)
+    checkpoint.load()
+    assert checkpoint.get(tmp_path / "session.jsonl", 1) is None
@@ -0,0 +1,30 @@
+"""Tests for the claude-fallback command line."""
+
+import sys
+
+from claude_fallback.cli import install_shell_functions
+
+
+def test_install_adds_python_to_an_older_install(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("SHELL", "/bin/bash")
+    rc_file = tmp_path / ".bashrc"
+    # What versions before CLAUDE_FALLBACK_PYTHON wrote
+    rc_file.write_text('\n# Claude Code Fallback\nsource "/x/claude_fallback/shell_functions.sh"\n')
+
+    install_shell_functions()
+    content = rc_file.read_text()
+    assert f'export CLAUDE_FALLBACK_PYTHON="{sys.executable}"' in content
+    assert content.count("shell_functions.sh") == 1
+
+    install_shell_functions()
+    assert rc_file.read_text() == content
+    assert "already installed" in capsys.readouterr().out
+
+
+def test_install_from_scratch(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("SHELL", "/usr/bin/zsh")
+    install_shell_functions()
+    content = (tmp_path / ".zshrc").read_text()
+    assert content.index("CLAUDE_FALLBACK_PYTHON=") < content.index("shell_functions.sh")
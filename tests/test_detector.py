@@ -0,0 +1,103 @@
+"""Tests for UsageLimitDetector."""
+
+import copy
+import json
+import pickle
+import random
+
+import pytest
+
+from claude_fallback.detector import Detection, UsageLimitDetector
+from claude_fallback.rules import LIMIT_PATTERNS
+
+WORDS = "the limit usage resets rate overloaded error session log → été LIMIT".split()
+
+
+def _text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+
+
+def _random_event(rng: random.Random) -> dict:
+    """An event of a random shape, with text that sometimes spells out a pattern."""
+    text = _text(rng)
+    if rng.random() < 0.2:
+        pattern = rng.choice(LIMIT_PATTERNS)
+        text += " " + rng.choice([pattern, pattern.upper(), pattern.title()])
+    kind = rng.choice(["error", "assistant", "user", "system"])
+    if kind == "error":
+        return {"type": "error", "error": {rng.choice(["type", "message"]): text}}
+    return {
+        "type": kind,
+        "uuid": f"{rng.getrandbits(128):032x}",
+        "message": {
+            "content": [{"type": rng.choice(["text", "tool_use"]), "text": text}],
+            "stop_reason": rng.choice(["end_turn", "rate_limit", "overloaded", "Overloaded"]),
+        },
+    }
+
+
+def _lines(count: int = 2000) -> list:
+    rng = random.Random(4)
+    lines = [json.dumps(_random_event(rng), ensure_ascii=rng.random() < 0.5) for _ in range(count)]
+    return [line.encode() for line in lines]
+
+
+def test_prefilter_keeps_every_detection():
+    filtered = UsageLimitDetector()
+    unfiltered = UsageLimitDetector()
+    unfiltered.might_match = lambda line: True
+
+    lines = _lines()
+    expected = [unfiltered.check_event(line) for line in lines]
+    assert sum(1 for d in expected if d) > 100
+    assert [filtered.check_event(line) for line in lines] == expected
+    assert [filtered.check_event(line.decode()) for line in lines] == expected
+
+
+def test_prefilter_rejects_lines_without_tokens():
+    detector = UsageLimitDetector()
+    line = b'{"type":"assistant","message":{"content":[{"type":"text","text":"all good"}]}}'
+    assert not detector.might_match(line)
+    assert detector.might_match(line.replace(b"all good", b"Usage Limit"))
+
+
+@pytest.mark.parametrize("pattern", LIMIT_PATTERNS)
+def test_prefilter_passes_every_pattern(pattern):
+    detector = UsageLimitDetector()
+    for variant in (pattern, pattern.upper()):
+        line = json.dumps({"type": "error", "error": {"message": f"x {variant} y"}})
+        assert detector.might_match(line)
+        assert detector.check_event(line).reason == "error_type"
+
+
+def test_huge_lines_are_scanned_whole():
+    detector = UsageLimitDetector()
+    text = "x" * (1024 * 1024) + " usage limit reached"
+    event = {"type": "assistant", "message": {"content": [{"type": "text", "text": text}]}}
+    detection = detector.check_event(json.dumps(event).encode())
+    assert detection is not None
+    assert detection.reason == "message_content"
+
+
+def test_huge_lines_are_prefiltered(monkeypatch):
+    detector = UsageLimitDetector()
+
+    def extract(line):
+        raise AssertionError("extracted a line the prefilter rejects")
+
+    monkeypatch.setattr(detector.extractor, "extract", extract)
+    line = json.dumps({"type": "user", "toolUseResult": {"stdout": "ok " * 200_000}})
+    assert detector.check_event(line.encode()) is None
+
+
+def test_detections_are_immutable_values():
+    detection = Detection("error_type", "Rate limit", uuid="u1")
+    assert detection == Detection("error_type", "Rate limit", uuid="u1")
+    assert detection != Detection("error_type", "Rate limit", uuid="u2")
+    assert len({detection, Detection("error_type", "Rate limit", uuid="u1")}) == 1
+    with pytest.raises(AttributeError):
+        detection.details = "changed"
+    with pytest.raises(AttributeError):
+        del detection.uuid
+    assert copy.copy(detection) == detection
+    assert pickle.loads(pickle.dumps(detection)) == detection
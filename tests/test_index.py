@@ -0,0 +1,37 @@
+"""Tests for SessionIndex."""
+
+from claude_fallback.index import SessionIndex
+
+
+def _tree(tmp_path):
+    """A projects tree with one session log, and a file outside it."""
+    sessions = tmp_path / "projects" / "-tmp-x" / "sessions"
+    sessions.mkdir(parents=True)
+    (sessions / "real.jsonl").write_bytes(b"{}\n")
+    secret = tmp_path / "secret"
+    secret.write_bytes(b"not a log\n")
+    (sessions / "link.jsonl").symlink_to(secret)
+    return tmp_path / "projects", sessions
+
+
+def test_follows_symlinked_logs_by_default(tmp_path):
+    projects, sessions = _tree(tmp_path)
+    index = SessionIndex(projects)
+    assert set(index.refresh()) == {sessions / "real.jsonl", sessions / "link.jsonl"}
+
+
+def test_ignores_symlinks_when_not_following(tmp_path):
+    projects, sessions = _tree(tmp_path)
+    index = SessionIndex(projects, follow_symlinks=False)
+    assert set(index.refresh()) == {sessions / "real.jsonl"}
+    # Watcher events for the link are ignored too
+    assert index.update([sessions / "link.jsonl"]) == {}
+    assert index.mtime(sessions / "link.jsonl") is None
+
+
+def test_ignores_symlinked_projects_tree_when_not_following(tmp_path):
+    projects, sessions = _tree(tmp_path)
+    linked = tmp_path / "linked"
+    linked.symlink_to(projects)
+    assert len(SessionIndex(linked).refresh()) == 2
+    assert SessionIndex(linked, follow_symlinks=False).refresh() == {}
@@ -0,0 +1,78 @@
+"""Tests for the JSON backends: every installed one must decode like json."""
+
+import json
+import random
+
+import pytest
+
+from claude_fallback.detector import UsageLimitDetector
+from claude_fallback.jsonutil import BACKENDS, available_backends, get_backend
+
+# Lines the fast decoders reject or read differently from json
+EDGE_LINES = [
+    b'{"type": "error", "error": {"type": "rate_limit_error", "message": NaN}}',
+    b'{"type": "error", "value": Infinity, "error": {"message": "Rate limit reached"}}',
+    b'\xef\xbb\xbf{"type": "error", "error": {"message": "usage limit reached"}}',
+    b'{"type": "assistant", "message": {"content": [{"text": "\\ud800 usage limit"}]}}',
+    b'{"type": "error", "big": 1e400, "error": {"message": "rate limit"}}',
+    b'{"type": "error", "error": {"message": "rate limit \xff\xfe"}}',
+    b'{"type": "error", "error": {"message": "rate limit',
+    b'{"type": "error", "error": {"message": "overloaded"}} trailing',
+    b'{"type": "error", "type": "assistant", "message": {"stop_reason": "rate_limit"}}',
+    '{"type": "error", "error": {"message": "Límite: usage limit reached ✓"}}'.encode(),
+    b"",
+    b"[]",
+    b'"rate limit"',
+    b"null",
+]
+
+
+def _lines() -> list:
+    rng = random.Random(19)
+    lines = []
+    for _ in range(300):
+        event = {
+            "type": rng.choice(["error", "assistant", "user"]),
+            "uuid": f"{rng.getrandbits(128):032x}",
+            "message": {
+                "content": [{"type": "text", "text": rng.choice(["ok", "usage limit reached"])}],
+                "usage": {"input_tokens": rng.randint(0, 2**40), "cost": rng.random()},
+            },
+        }
+        lines.append(json.dumps(event, ensure_ascii=rng.random() < 0.5).encode())
+    return lines + EDGE_LINES
+
+
+def _decoded(loads, line) -> str:
+    """A comparable form of loads(line) (repr keeps NaN equal to itself)."""
+    try:
+        return repr(loads(line))
+    except ValueError:
+        return "<error>"
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_backend_decodes_like_json(name):
+    loads = get_backend(name).loads
+    for line in _lines():
+        assert _decoded(loads, line) == _decoded(json.loads, line), line
+        text = line.decode("utf-8", "replace")
+        assert _decoded(loads, text) == _decoded(json.loads, text), line
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_backend_detects_like_json(name):
+    reference = UsageLimitDetector(json_backend="json")
+    detector = UsageLimitDetector(json_backend=name)
+    for line in _lines():
+        assert detector.check_event(line) == reference.check_event(line), line
+
+
+def test_auto_picks_the_fastest_installed():
+    assert get_backend().name == available_backends()[0]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        get_backend("simdjson")
+    assert "simdjson" not in BACKENDS
@@ -0,0 +1,76 @@
+"""Tests for the Prometheus metrics endpoint and latency stats."""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from claude_fallback.metrics import LatencyStats, MetricsServer, MonitorMetrics
+
+
+@pytest.fixture
+def server():
+    metrics = MonitorMetrics()
+    server = MetricsServer(metrics, port=0)
+    server.start()
+    yield metrics, f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+
+def _scrape(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=5) as response:
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = response.read().decode()
+    samples = {}
+    for line in body.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_scrape_counters_and_histograms(server):
+    metrics, url = server
+    metrics.lines_read.inc(3)
+    metrics.detections.inc(reason="error_type")
+    metrics.detections.inc(reason="stop_reason")
+    metrics.detections.inc(reason="stop_reason")
+    metrics.files_tracked.set(2)
+    for seconds in (0.2, 0.3, 7.0, 60.0):
+        metrics.restart_downtime.observe(seconds)
+
+    samples = _scrape(url + "/metrics")
+    assert samples["claude_fallback_lines_read_total"] == 3
+    assert samples['claude_fallback_detections_total{reason="error_type"}'] == 1
+    assert samples['claude_fallback_detections_total{reason="stop_reason"}'] == 2
+    assert samples["claude_fallback_files_tracked"] == 2
+
+    downtime = "claude_fallback_restart_downtime_seconds"
+    assert samples[downtime + '_bucket{le="0.25"}'] == 1
+    assert samples[downtime + '_bucket{le="0.5"}'] == 2
+    assert samples[downtime + '_bucket{le="10"}'] == 3
+    assert samples[downtime + '_bucket{le="+Inf"}'] == 4
+    assert samples[downtime + "_count"] == 4
+    assert samples[downtime + "_sum"] == pytest.approx(67.5)
+
+
+def test_scrape_unknown_path(server):
+    _metrics, url = server
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        urllib.request.urlopen(url + "/other", timeout=5)
+    assert excinfo.value.code == 404
+
+
+def test_latency_stats():
+    latency = LatencyStats()
+    latency.record(100.0, 101.0, 101.5, 103.0)
+    latency.record(None, 200.0, 200.0, 200.5)
+
+    stats = latency.to_dict()
+    assert stats["detections"] == 2
+    assert stats["last_detection_at"] == 200.5
+    assert stats["latency"]["match_to_handled"]["count"] == 2
+    assert stats["latency"]["match_to_handled"]["max"] == 1.5
+    # Without the event's own timestamp only the monitor's stages are known
+    assert stats["latency"]["end_to_end"]["count"] == 1
+    assert stats["latency"]["end_to_end"]["p50"] == 3.0
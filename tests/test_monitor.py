@@ -0,0 +1,82 @@
+"""Tests for LogMonitor."""
+
+import contextlib
+import gc
+import io
+import json
+import os
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from claude_fallback.config import Config
+from claude_fallback.metrics import LatencyStats
+from claude_fallback.monitor import LogMonitor
+from claude_fallback.userhome import UserHome
+
+LIMIT_EVENT = {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit"}}
+
+
+def _lines(count: int, limit_every: int = 50) -> bytes:
+    lines = []
+    for i in range(count):
+        if i % limit_every == limit_every - 1:
+            event = dict(LIMIT_EVENT)
+        else:
+            event = {"type": "assistant", "message": {"content": [{"type": "text", "text": "ok"}]}}
+        event["uuid"] = str(uuid.uuid4())
+        event["timestamp"] = "2025-01-31T09:00:00.000Z"
+        lines.append(json.dumps(event))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_memory_stays_flat_over_many_sessions(tmp_path):
+    """A scaled-down benchmarks/soak_memory.py: sessions come, go idle and are deleted."""
+    sessions = tmp_path / ".claude" / "projects" / "-tmp-project" / "sessions"
+    sessions.mkdir(parents=True)
+    notified = []
+    # A home of our own keeps every state file under tmp_path
+    monitor = LogMonitor(
+        Config(api_key="sk-ant-test", coalesce_window=0), UserHome.from_path(tmp_path)
+    )
+    monitor.notifier.notify = lambda title, message, on_delivered=None: notified.append(title)
+    # Small cache limits, so they fill up during warm-up
+    monitor.latency = LatencyStats(window=50)
+    monitor.seen.max_entries = 64
+    monitor.checkpoint.max_entries = 16
+    monitor.checkpoint.flush_interval = 0
+    monitor.seen.load()
+    monitor.checkpoint.load()
+
+    rounds, lifetime = 60, 6
+    idle_mtime = time.time() - monitor.config.active_window - 60
+    traced = []
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for r in range(rounds):
+                # Three sessions at a time, each active for lifetime rounds
+                for s in range(r // lifetime * 3, r // lifetime * 3 + 3):
+                    with open(sessions / f"session-{s:04d}.jsonl", "ab") as f:
+                        f.write(_lines(100))
+                if r % lifetime == lifetime - 1:
+                    for path in sessions.iterdir():
+                        if int(path.stem[-4:]) < r // lifetime * 3:
+                            # Idle: stops being tailed, deleted a round later
+                            if os.stat(path).st_mtime <= idle_mtime:
+                                path.unlink()
+                            else:
+                                os.utime(path, (idle_mtime, idle_mtime))
+                monitor.tick(None)
+                gc.collect()
+                traced.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+        monitor.close()
+
+    assert len(notified) == rounds // lifetime * 3
+    assert len(monitor.tailer) <= 6
+    quarter = rounds // 4
+    growth = statistics.median(traced[-quarter:]) - statistics.median(traced[quarter : 2 * quarter])
+    assert growth < 64 * 1024, f"traced memory grew by {growth / 1024:.0f} KiB"
@@ -0,0 +1,65 @@
+"""Tests for the background notification worker."""
+
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from claude_fallback.notifier import Notifier
+
+
+@pytest.fixture
+def slow_notify_send(tmp_path, monkeypatch):
+    """A notify-send on PATH that takes 2 seconds and records each call."""
+    calls = tmp_path / "calls"
+    script = tmp_path / "notify-send"
+    script.write_text(f'#!/bin/sh\necho "$1" >> {calls}\nsleep 2\n')
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ.get('PATH', '')}")
+    return calls
+
+
+def _notifier(**kwargs) -> Notifier:
+    notifier = Notifier(enable_sound=False, background=True, **kwargs)
+    notifier.system = "Linux"
+    return notifier
+
+
+def test_slow_notify_send_does_not_block(slow_notify_send):
+    notifier = _notifier(timeout=0.5, max_backlog=2)
+    timed_out = []
+    notifier._notify_fallback = lambda title, message: timed_out.append(title)
+
+    start = time.perf_counter()
+    for i in range(50):
+        notifier.notify(f"Limit {i % 5}", "Usage limit reached")
+    assert time.perf_counter() - start < 0.5
+
+    close_start = time.perf_counter()
+    notifier.close(timeout=10)
+    # Repeats are coalesced and a full backlog drops its oldest entries
+    assert notifier.coalesced == 45
+    assert notifier.delivered + notifier.dropped == 5
+    assert notifier.delivered <= 3
+    # Each delivery gave up after the timeout and fell back to the terminal
+    assert len(timed_out) == notifier.delivered
+    assert timed_out[-1] == "Limit 4"
+    assert time.perf_counter() - close_start < notifier.delivered * 0.5 + 1
+
+
+def test_on_delivered_runs_after_delivery(slow_notify_send):
+    notifier = _notifier(timeout=5)
+    delivered = threading.Event()
+    notifier.notify("Claude Code Usage Limit", "Usage limit reached", delivered.set)
+
+    assert not delivered.is_set()
+    assert delivered.wait(10)
+    assert slow_notify_send.read_text() == "Claude Code Usage Limit\n"
+
+    # An identical notification is coalesced and counts as delivered at once
+    again = threading.Event()
+    notifier.notify("Claude Code Usage Limit", "Usage limit reached", again.set)
+    assert again.is_set()
+    notifier.close(timeout=10)
@@ -0,0 +1,141 @@
+"""Tests for detection rules, including parity with the original detector."""
+
+import json
+import random
+from typing import Any, Optional
+
+import pytest
+
+from claude_fallback.detector import UsageLimitDetector
+from claude_fallback.rules import (
+    LIMIT_PATTERNS,
+    Rule,
+    RuleSet,
+    default_rules,
+    parse_path,
+    resolve,
+)
+
+
+def baseline_check(event: Any) -> Optional[dict]:
+    """The detection logic the built-in rules replaced, kept as the reference."""
+    patterns = ["usage limit", "rate limit", "usage resets", "overloaded_error", "rate_limit_error"]
+    if event.get("type") == "error":
+        error = event.get("error", {})
+        error_type = error.get("type", "").lower()
+        error_msg = error.get("message", "").lower()
+        if any(p in error_type or p in error_msg for p in patterns):
+            return {"reason": "error_type", "details": error.get("message", "Rate limit error")}
+
+    if event.get("type") == "assistant":
+        for item in event.get("message", {}).get("content", []):
+            if item.get("type") == "text":
+                text = item.get("text", "").lower()
+                if any(p in text for p in patterns):
+                    details = "Usage limit mentioned in response"
+                    return {"reason": "message_content", "details": details}
+
+    stop_reason = event.get("message", {}).get("stop_reason")
+    if stop_reason in ["rate_limit", "overloaded"]:
+        return {"reason": "stop_reason", "details": f"Stop reason: {stop_reason}"}
+    return None
+
+
+BASELINE_CASES = [
+    {"type": "error", "error": {"type": "rate_limit_error", "message": "Too many requests"}},
+    {"type": "error", "error": {"type": "overloaded_error"}},
+    {"type": "error", "error": {"type": "api_error", "message": "Usage limit reached"}},
+    {"type": "error", "error": {"type": "api_error", "message": "Internal error"}},
+    {"type": "system", "error": {"type": "rate_limit_error", "message": "not an error event"}},
+    {
+        "type": "assistant",
+        "message": {"content": [{"type": "text", "text": "Claude usage limit reached."}]},
+    },
+    {
+        "type": "assistant",
+        "message": {"content": [{"type": "tool_use", "text": "grep 'usage limit' *.py"}]},
+    },
+    {
+        "type": "assistant",
+        "message": {
+            "content": [
+                {"type": "tool_result", "text": "rate limit docs"},
+                {"type": "text", "text": "Your usage resets at 5pm"},
+            ]
+        },
+    },
+    {"type": "user", "message": {"content": [{"type": "text", "text": "what is a rate limit?"}]}},
+    {"type": "assistant", "message": {"content": [], "stop_reason": "rate_limit"}},
+    {"type": "user", "message": {"stop_reason": "overloaded"}},
+    {"type": "assistant", "message": {"content": [], "stop_reason": "end_turn"}},
+]
+
+
+def _random_event(rng: random.Random) -> dict:
+    words = "the limit usage resets rate overloaded error é LIMIT".split()
+    text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+    if rng.random() < 0.3:
+        text += " " + rng.choice(LIMIT_PATTERNS).upper()
+    kind = rng.choice(["error", "assistant", "user"])
+    if kind == "error":
+        return {"type": "error", "error": {rng.choice(["type", "message"]): text}}
+    content = [
+        {"type": rng.choice(["text", "tool_use", "tool_result", "thinking"]), "text": text}
+        for _ in range(rng.randint(0, 3))
+    ]
+    stop_reason = rng.choice(["end_turn", "tool_use", "rate_limit", "overloaded", None])
+    return {"type": kind, "message": {"content": content, "stop_reason": stop_reason}}
+
+
+def _detect(detector: UsageLimitDetector, event: dict) -> Optional[dict]:
+    detection = detector.check_event(json.dumps(event))
+    if detection is None:
+        return None
+    return {"reason": detection.reason, "details": detection.details}
+
+
+@pytest.mark.parametrize("event", BASELINE_CASES)
+def test_default_rules_match_baseline_cases(event):
+    assert _detect(UsageLimitDetector(), event) == baseline_check(event)
+
+
+def test_default_rules_match_baseline_on_random_events():
+    rng = random.Random(17)
+    detector = UsageLimitDetector()
+    events = [_random_event(rng) for _ in range(3000)]
+    expected = [baseline_check(event) for event in events]
+    assert sum(1 for e in expected if e) > 500
+    assert [_detect(detector, event) for event in events] == expected
+
+
+def test_huge_lines_match_baseline():
+    # Lines past max_decode_bytes only have the rules' fields extracted
+    detector = UsageLimitDetector(max_decode_bytes=64)
+    for event in BASELINE_CASES:
+        padded = dict(event, output="x" * 200)
+        assert _detect(detector, padded) == baseline_check(event)
+
+
+def test_item_filter_paths():
+    assert parse_path("message.content[type=text].text") == (
+        "message",
+        "content",
+        "[type=text]",
+        "text",
+    )
+    event = {"content": [{"type": "text", "text": "a"}, {"type": "tool_use", "text": "b"}, "c"]}
+    assert list(resolve(event, parse_path("content[type=text].text"))) == ["a"]
+    assert list(resolve(event, parse_path("content[].text"))) == ["a", "b"]
+    for path in ("content[type].text", "content[=text].text", "content[type=text"):
+        with pytest.raises(ValueError):
+            parse_path(path)
+
+
+def test_ignore_rule_suppresses_defaults():
+    rules = RuleSet(
+        [Rule("noise", ["error.message"], contains=["rate limit test"], action="ignore")]
+        + default_rules()
+    )
+    assert rules.match({"type": "error", "error": {"message": "Rate limit test"}}) is None
+    rule, value = rules.match({"type": "error", "error": {"message": "Rate limit hit"}})
+    assert (rule.name, value) == ("error_type", "Rate limit hit")
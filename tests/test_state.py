@@ -0,0 +1,78 @@
+"""Tests for State persistence."""
+
+import json
+import multiprocessing
+import threading
+
+from claude_fallback import state as state_module
+from claude_fallback.state import State
+
+WRITERS = 8
+ITERATIONS = 50
+
+
+def _writer(home, iterations):
+    for i in range(iterations):
+        with State.transaction(home) as state:
+            count = int(state.limit_detected_at or 0)
+            state.set_limit_detected()
+            if i % 2:
+                state.switch_to_api()
+            else:
+                state.switch_to_subscription()
+            state.limit_detected_at = str(count + 1)
+
+
+def test_concurrent_transactions_lose_no_update(tmp_path):
+    state_file = State.files(tmp_path)[0]
+    stop = threading.Event()
+    torn = []
+
+    def read() -> None:
+        while not stop.is_set():
+            try:
+                data = state_file.read_text()
+            except FileNotFoundError:
+                continue
+            try:
+                json.loads(data)
+            except json.JSONDecodeError:
+                torn.append(data)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(target=_writer, args=(tmp_path, ITERATIONS)) for _ in range(WRITERS)
+    ]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join(60)
+    stop.set()
+    reader.join()
+
+    assert all(process.exitcode == 0 for process in writers)
+    assert State.load(tmp_path).limit_detected_at == str(WRITERS * ITERATIONS)
+    assert not torn
+    assert not [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")]
+
+
+def test_transaction_writes_once(tmp_path, monkeypatch):
+    writes = []
+    atomic_write = state_module.atomic_write
+
+    def counting_write(path, data, owner=None):
+        writes.append(json.loads(data))
+        atomic_write(path, data, owner)
+
+    monkeypatch.setattr(state_module, "atomic_write", counting_write)
+    with State.transaction(tmp_path) as state:
+        state.set_limit_detected()
+        state.switch_to_api()
+        state.clear_limit()
+
+    assert len(writes) == 1
+    assert writes[0]["mode"] == "api"
+    assert State.load(tmp_path).mode == "api"
+    assert not State.files(tmp_path)[2].exists()
@@ -0,0 +1,92 @@
+"""Tests for MultiTailer."""
+
+import pytest
+
+from claude_fallback.tailer import MultiTailer
+
+
+def _read(tailer, log):
+    return [line for batch in tailer.iter_new_lines(log) for line in batch]
+
+
+def test_reads_complete_lines_only(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_bytes(b'{"a": 1}\n{"b"')
+    tailer = MultiTailer()
+    log = tailer.track(path, 0)
+    assert _read(tailer, log) == [b'{"a": 1}']
+
+    with open(path, "ab") as f:
+        f.write(b': 2}\n')
+    assert _read(tailer, log) == [b'{"b": 2}']
+
+
+def test_refuses_symlinks_when_not_following(tmp_path):
+    secret = tmp_path / "secret"
+    secret.write_bytes(b'{"secret": true}\n')
+    path = tmp_path / "session.jsonl"
+    path.symlink_to(secret)
+
+    tailer = MultiTailer()
+    assert _read(tailer, tailer.track(path, 0)) == [b'{"secret": true}']
+    tailer = MultiTailer(follow_symlinks=False)
+    with pytest.raises(OSError):
+        _read(tailer, tailer.track(path, 0))
+
+
+def _line(uuid: str, text: str) -> bytes:
+    # Same shape as Claude Code's: every line starts with the same keys
+    return (
+        '{"parentUuid":null,"isSidechain":false,"userType":"external","cwd":"/tmp/x",'
+        f'"type":"user","message":{{"content":"{text}"}},"uuid":"{uuid}"}}\n'
+    ).encode()
+
+
+def _rewrite(path, data: bytes) -> None:
+    """Truncate and rewrite path in place, keeping its inode."""
+    with open(path, "r+b") as f:
+        f.truncate(0)
+        f.write(data)
+
+
+def test_notices_rewrite_with_a_different_first_line(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_bytes(_line("1", "first") + _line("2", "second"))
+    tailer = MultiTailer()
+    log = tailer.track(path, 0)
+    assert len(_read(tailer, log)) == 2
+
+    # Same first 64 bytes and a larger size, but a different first line
+    rewritten = _line("3", "first") + _line("4", "second") + _line("5", "third")
+    _rewrite(path, rewritten)
+    assert _read(tailer, log) == rewritten.splitlines()
+    assert tailer.resets == 1
+
+
+def test_notices_rewrite_behind_the_same_first_line(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_bytes(_line("1", "first") + _line("2", "second"))
+    tailer = MultiTailer()
+    log = tailer.track(path, 0)
+    _read(tailer, log)
+
+    rewritten = _line("1", "first") + _line("6", "other") + _line("7", "more")
+    _rewrite(path, rewritten)
+    assert _read(tailer, log) == rewritten.splitlines()
+    assert tailer.resets == 1
+
+
+def test_appends_are_not_rewrites(tmp_path):
+    path = tmp_path / "session.jsonl"
+    path.write_bytes(_line("1", "first")[:20])
+    tailer = MultiTailer()
+    log = tailer.track(path, 0)
+    assert _read(tailer, log) == []
+
+    with open(path, "ab") as f:
+        f.write(_line("1", "first")[20:] + _line("2", "second"))
+    assert len(_read(tailer, log)) == 2
+    with open(path, "ab") as f:
+        f.write(_line("3", "third"))
+    assert _read(tailer, log) == [_line("3", "third").rstrip(b"\n")]
+    assert tailer.resets == 0